@@ -0,0 +1 @@
+default_app_config = 'card_api.apps.CardApiConfig'
@@ -0,0 +1,44 @@
+import threading
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+
+
+class CardApiConfig(AppConfig):
+    name = 'card_api'
+
+    def ready(self):
+        from card_api.issuers import check_issuer_snapshot, issuers_changed
+        from common.bin_table import (
+            configure_bin_table,
+            install_reload_signal,
+        )
+        from common.blocklist import configure_blocklist
+        from common.entropy import configure_entropy
+        configure_entropy(
+            secure=getattr(settings, 'SECURE_CARD_NUMBER_GENERATION', False)
+        )
+        configure_bin_table(
+            getattr(settings, 'BIN_TABLE_PATH', None),
+            reload_interval=getattr(
+                settings, 'BIN_TABLE_RELOAD_INTERVAL', None
+            ),
+        )
+        reload_signal = getattr(settings, 'BIN_TABLE_RELOAD_SIGNAL', None)
+        # Signal handlers can only be installed from the main thread
+        is_main_thread = threading.current_thread() is threading.main_thread()
+        if reload_signal and is_main_thread:
+            install_reload_signal(reload_signal)
+        configure_blocklist(getattr(settings, 'BLOCKLIST_PATH', None))
+
+        request_started.connect(
+            check_issuer_snapshot, dispatch_uid='card_api.issuers'
+        )
+        for model_name in ('Issuer', 'BinRange'):
+            model = self.get_model(model_name)
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    issuers_changed, sender=model,
+                    dispatch_uid=f'card_api.issuers.{model_name}',
+                )
@@ -0,0 +1,122 @@
+"""
+    Keeps each process's `common.issuers` snapshot in step with the Issuer
+    model, so resolving an issuer never queries the database.
+
+    Every transaction that changes the issuers bumps a version counter kept
+    in the database (so all the workers share it) once, as part of the same
+    transaction. The worker that made the change rebuilds its snapshot as
+    soon as it's committed; the others compare their snapshot's version with
+    the counter when a request starts (at most once every
+    ISSUER_SNAPSHOT_CHECK_INTERVAL seconds) and rebuild when it moved.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from card_api.models import Issuer, IssuersVersion
+from common.issuers import (
+    IssuerSnapshot,
+    get_issuer_snapshot,
+    set_issuer_snapshot,
+)
+
+
+# The primary key of the one IssuersVersion row
+VERSION_ID = 1
+
+# Default for the ISSUER_SNAPSHOT_CHECK_INTERVAL setting
+CHECK_INTERVAL = 1
+
+logger = logging.getLogger(__name__)
+
+# Only taken by writers, so two refreshes don't both query the database
+_refresh_lock = threading.Lock()
+# When (on the monotonic clock) the shared version is next checked
+_next_check = 0
+
+
+def get_issuers_version():
+    '''
+    The shared version of the issuers (0 before they first change)
+    '''
+    versions = IssuersVersion.objects.filter(pk=VERSION_ID)
+    return versions.values_list('version', flat=True).first() or 0
+
+
+def bump_issuers_version():
+    '''
+    Tell every worker the issuers changed, once the current transaction (if
+    any) commits
+    '''
+    _, created = IssuersVersion.objects.get_or_create(
+        pk=VERSION_ID, defaults={'version': 1}
+    )
+    if not created:
+        IssuersVersion.objects.filter(pk=VERSION_ID).update(
+            version=F('version') + 1
+        )
+
+
+def load_issuer_snapshot(version):
+    '''
+    A new IssuerSnapshot of every Issuer in the database
+    '''
+    issuers = Issuer.objects.prefetch_related('bin_ranges')
+    return IssuerSnapshot(
+        (issuer.to_record() for issuer in issuers), version=version
+    )
+
+
+def refresh_issuer_snapshot(*, force=False):
+    '''
+    Rebuild this process's snapshot if the shared version moved since it was
+    built (or always, with `force`). Lookups carry on with the old snapshot
+    while the new one is built. Returns whether it was replaced
+    '''
+    global _next_check
+    with _refresh_lock:
+        _next_check = time.monotonic() + getattr(
+            settings, 'ISSUER_SNAPSHOT_CHECK_INTERVAL', CHECK_INTERVAL
+        )
+        version = get_issuers_version()
+        if not force and version == get_issuer_snapshot().version:
+            return False
+        set_issuer_snapshot(load_issuer_snapshot(version))
+    return True
+
+
+def check_issuer_snapshot(**kwargs):
+    '''
+    `request_started` receiver: refresh the snapshot if it's time to check
+    the shared version again. A failed refresh is logged and the old snapshot
+    kept, so requests are still served
+    '''
+    if time.monotonic() < _next_check:
+        return
+    try:
+        if refresh_issuer_snapshot():
+            logger.info("Reloaded the issuers")
+    except Exception:
+        logger.exception("Couldn't reload the issuers, keeping the old ones")
+
+
+def issuers_changed(**kwargs):
+    '''
+    `post_save`/`post_delete` receiver for the Issuer models. The version is
+    bumped in the same transaction as the change, and the snapshot rebuilt
+    once it's committed, so it never sees half of a write. Saving an issuer
+    and all its BIN ranges in one transaction does both only once
+    '''
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(
+        hook[1] is _publish for hook in connection.run_on_commit
+    ):
+        return
+    bump_issuers_version()
+    transaction.on_commit(_publish)
+
+
+def _publish():
+    refresh_issuer_snapshot(force=True)
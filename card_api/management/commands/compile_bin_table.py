@@ -0,0 +1,116 @@
+import csv
+import os
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from common.bin_index import split_bin_range
+from common.bin_table import BinRecord, write_bin_table
+from common.constants import (
+    MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
+    MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
+)
+
+
+REQUIRED_COLUMNS = ['start', 'issuer']
+OPTIONAL_COLUMNS = ['end', 'network', 'lengths', 'country']
+
+
+def _parse_lengths(value):
+    '''
+    Allowed card number lengths written as e.g. "16", "13,16,19" or "12-19"
+    '''
+    lengths = set()
+    for part in filter(None, value.replace(' ', '').split(',')):
+        low, _, high = part.partition('-')
+        lengths.update(range(int(low), int(high or low) + 1))
+    if any(not MIN_LENGTH <= length <= MAX_LENGTH for length in lengths):
+        raise ValueError(
+            f"lengths must be between [{MIN_LENGTH}, {MAX_LENGTH}]. "
+            f"Got: {value!r}"
+        )
+    return tuple(sorted(lengths))
+
+
+def _parse_row(row):
+    start = row['start'].strip()
+    end = (row.get('end') or '').strip() or start
+    bin_range = split_bin_range((start, end))
+    issuer = row['issuer'].strip()
+    if not issuer:
+        raise ValueError("issuer can't be blank.")
+    country = (row.get('country') or '').strip().upper()
+    if len(country) not in (0, 2) or not country.isascii():
+        raise ValueError(
+            f"country must be a 2 letter ISO 3166 code. Got: {country!r}"
+        )
+    return bin_range, BinRecord(
+        issuer=issuer,
+        network=(row.get('network') or '').strip(),
+        lengths=_parse_lengths(row.get('lengths') or ''),
+        country=country,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile a CSV of BIN ranges into the memory-mapped table that issuer "
+        "lookups read (see the BIN_TABLE_PATH setting)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'csv_path', metavar='csv',
+            help="CSV with a header row. Columns: start and issuer, and "
+            "optionally end (defaults to start), network, lengths (e.g. "
+            "16, 13,16,19 or 12-19) and country"
+        )
+        parser.add_argument(
+            'output', nargs='?',
+            help="File to write (defaults to the BIN_TABLE_PATH setting)"
+        )
+
+    def handle(self, *args, csv_path, output, **options):
+        output = output or getattr(settings, 'BIN_TABLE_PATH', None)
+        if not output:
+            raise CommandError("Give an output file or set BIN_TABLE_PATH.")
+        entries = self._read(csv_path)
+
+        # Written next to the output and moved over it in one step, so
+        # processes that have the old table mapped keep a complete file
+        directory = os.path.dirname(os.path.abspath(output))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            try:
+                count = write_bin_table(entries, file)
+            except ValueError as e:
+                file.close()
+                os.unlink(file.name)
+                raise CommandError(str(e))
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, output)
+        self.stdout.write(
+            f"Wrote {count} intervals from {len(entries)} BIN ranges to "
+            f"{output}"
+        )
+
+    def _read(self, csv_path):
+        try:
+            file = open(csv_path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(str(e))
+        with file:
+            reader = csv.DictReader(file)
+            columns = reader.fieldnames or []
+            missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+            if missing:
+                raise CommandError(
+                    f"{csv_path} is missing the column(s): {', '.join(missing)}"
+                )
+            entries = []
+            for row in reader:
+                try:
+                    entries.append(_parse_row(row))
+                except ValueError as e:
+                    raise CommandError(
+                        f"{csv_path}, line {reader.line_num}: {e}"
+                    )
+        return entries
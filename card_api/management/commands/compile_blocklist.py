@@ -0,0 +1,88 @@
+import os
+import tempfile
+from functools import partial
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from common.batch import LINES_BLOCK_SIZE, luhn_check_lines
+from common.blocklist import DEFAULT_BITS_PER_NUMBER, write_blocklist
+from common.constants import (
+    MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
+    MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
+)
+from common.enums import CardNumberError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compile a list of card numbers into the memory-mapped blocklist "
+        "that validation checks (see the BLOCKLIST_PATH setting)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            help="Text file with one card number per line. Separators and "
+            "blank lines are ignored"
+        )
+        parser.add_argument(
+            'output', nargs='?',
+            help="File to write (defaults to the BLOCKLIST_PATH setting)"
+        )
+        parser.add_argument(
+            '--bits-per-number', type=int, default=DEFAULT_BITS_PER_NUMBER,
+            help="Size of the Bloom filter. Each extra bit cuts its false "
+            "positives by about a third (default: %(default)s)"
+        )
+
+    def handle(self, *args, input, output, bits_per_number, **options):
+        output = output or getattr(settings, 'BLOCKLIST_PATH', None)
+        if not output:
+            raise CommandError("Give an output file or set BLOCKLIST_PATH.")
+        if bits_per_number < 1:
+            raise CommandError("--bits-per-number must be at least 1.")
+        values, lengths = self._read(input)
+
+        # Written next to the output and moved over it, as in
+        # compile_bin_table, so the numbers and their filter are replaced
+        # together and a running process never opens half a file
+        directory = os.path.dirname(os.path.abspath(output))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            count = write_blocklist(
+                values, lengths, file, bits_per_number=bits_per_number
+            )
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, output)
+        self.stdout.write(f"Wrote {count} card numbers to {output}")
+
+    def _read(self, path):
+        try:
+            file = open(path, 'rb')
+        except OSError as e:
+            raise CommandError(str(e))
+        values, lengths = [], []
+        line = 0
+        with file:
+            blocks = iter(partial(file.read, LINES_BLOCK_SIZE), b'')
+            for _, block_values, block_lengths, errors in luhn_check_lines(
+                blocks
+            ):
+                bad = np.flatnonzero(
+                    (errors == CardNumberError.INVALID_CHARACTERS)
+                    | ((errors == CardNumberError.NONE) & (
+                        (block_lengths < MIN_LENGTH)
+                        | (block_lengths > MAX_LENGTH)
+                    ))
+                )
+                if len(bad):
+                    raise CommandError(
+                        f"{path}, line {line + bad[0] + 1}: expected a card "
+                        f"number of {MIN_LENGTH} to {MAX_LENGTH} digits."
+                    )
+                kept = errors == CardNumberError.NONE
+                values.append(block_values[kept])
+                lengths.append(block_lengths[kept])
+                line += len(errors)
+        if not values:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint8)
+        return np.concatenate(values), np.concatenate(lengths)
@@ -0,0 +1,188 @@
+import io
+import multiprocessing
+import os
+import sys
+from collections import deque
+from django.core.management.base import BaseCommand, CommandError
+from common.algorithms import IssuerMix
+from common.batch import generate_many, generate_many_from_mix
+from common.entropy import get_entropy_pool
+from common.enums import CardIssuer, UnknownIssuerError
+
+
+FORMATS = ['csv', 'ndjson']
+
+# Output files are written through a buffer this big, so each write call
+# hands the OS a large block
+WRITE_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Chunks generated ahead of the writer, per worker process. Bounds how much
+# memory finished chunks take up when the output is slower than the workers
+CHUNKS_AHEAD_PER_PROCESS = 2
+
+
+def _generate_chunk(task):
+    '''
+    Worker: generate one chunk and render it as the bytes of its output rows.
+    Each chunk has its own seed, so the output doesn't depend on which worker
+    runs it
+    '''
+    source, count, seed, fmt = task
+    if isinstance(source, IssuerMix):
+        numbers = generate_many_from_mix(count, source, rng=seed,
+                                         as_bytes=True)
+    else:
+        prefixes, num_digits = source
+        numbers = generate_many(count, prefixes, num_digits=num_digits,
+                                rng=seed, as_bytes=True)
+    if not count:
+        return b''
+    encoded = numbers.tolist()
+    if fmt == 'csv':
+        return b'\n'.join(encoded) + b'\n'
+    return b'{"number":"' + b'"}\n{"number":"'.join(encoded) + b'"}\n'
+
+
+class Command(BaseCommand):
+    help = (
+        "Write a dataset of random valid card numbers as CSV or NDJSON, "
+        "generated across a pool of processes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int,
+                            help="How many card numbers to write")
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument('--issuer', help="Only generate this issuer's BINs")
+        source.add_argument('--prefix', default='',
+                            help="The digits every number begins with")
+        source.add_argument(
+            '--mix',
+            help="Issuer weights, e.g. visa:55,mastercard:25,amex:15,discover:5"
+        )
+        parser.add_argument('--length', type=int,
+                            help="Digits per number when using --prefix "
+                            "(defaults to 16)")
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument(
+            '--output', default='-',
+            help="File to write to, or - for stdout. With --shards, a "
+            "'{shard}' placeholder in the name is replaced by the shard "
+            "number, otherwise it's appended"
+        )
+        parser.add_argument('--shards', type=int, default=1,
+                            help="Split the rows evenly across this many files")
+        parser.add_argument('--processes', type=int,
+                            help="Worker processes (defaults to the CPU count)")
+        parser.add_argument('--chunk-size', type=int, default=1000000,
+                            help="Rows generated per task")
+        parser.add_argument(
+            '--seed', type=int,
+            help="Makes the output repeatable. The seed used is printed when "
+            "this is left out"
+        )
+
+    def handle(self, *args, count, issuer, prefix, mix, length, format,
+               output, shards, processes, chunk_size, seed, **options):
+        if count < 0 or shards < 1 or chunk_size < 1:
+            raise CommandError(
+                "count must not be negative, and --shards and --chunk-size "
+                "must be positive."
+            )
+        if length is not None and (issuer or mix):
+            raise CommandError("--length can only be used with --prefix.")
+        if shards > 1 and output == '-':
+            raise CommandError("--shards needs an --output file name.")
+
+        try:
+            source = self._get_source(issuer, prefix, mix, length)
+        except ValueError as e:
+            raise CommandError(str(e))
+        if seed is None:
+            seed = int.from_bytes(get_entropy_pool().read(8), 'big')
+            self.stderr.write(f"Using --seed {seed}")
+
+        tasks = [
+            (source, rows, [seed, shard, chunk], format)
+            for shard, shard_rows in enumerate(self._split(count, shards))
+            for chunk, rows in enumerate(self._split_chunks(shard_rows,
+                                                            chunk_size))
+        ]
+        files = [self._open(output, shard, shards) for shard in range(shards)]
+        ahead = CHUNKS_AHEAD_PER_PROCESS * (processes or os.cpu_count() or 1)
+        try:
+            # Spawned workers start clean, rather than inheriting locks held
+            # by this process's threads at the time of a fork
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(processes) as pool:
+                # Chunks are written in task order, so the output only depends
+                # on the seed, not on how the work was scheduled. Only a few
+                # are queued ahead, so a slow writer holds the workers back
+                pending = deque()
+                for task in tasks:
+                    if len(pending) >= ahead:
+                        self._write(files, *pending.popleft())
+                    result = pool.apply_async(_generate_chunk, (task,))
+                    pending.append((task[2][1], result))
+                while pending:
+                    self._write(files, *pending.popleft())
+        finally:
+            for file in files:
+                if file is not sys.stdout.buffer:
+                    file.close()
+                else:
+                    file.flush()
+
+    def _get_source(self, issuer, prefix, mix, length):
+        '''
+        What each chunk is generated from: an IssuerMix or the
+        `generate_many` prefix(es) and length
+        '''
+        if mix:
+            return IssuerMix.from_string(mix)
+        if issuer:
+            card_issuer = CardIssuer.from_string(issuer)
+            if not card_issuer:
+                raise UnknownIssuerError(issuer)
+            return card_issuer, card_issuer.num_digits
+        num_digits = 16 if length is None else length
+        # Fail before starting any workers if the prefix or length is bad
+        generate_many(1, prefix, num_digits=num_digits)
+        return prefix, num_digits
+
+    @staticmethod
+    def _split(count, parts):
+        base, extra = divmod(count, parts)
+        return [base + (part < extra) for part in range(parts)]
+
+    @staticmethod
+    def _split_chunks(count, chunk_size):
+        full, rest = divmod(count, chunk_size)
+        return [chunk_size] * full + ([rest] if rest or not full else [])
+
+    @staticmethod
+    def _write(files, shard, result):
+        files[shard].write(result.get())
+
+    def _open(self, output, shard, shards):
+        if output == '-':
+            return self._open_stdout()
+        if shards > 1:
+            if '{shard}' in output:
+                output = output.replace('{shard}', f'{shard:05d}')
+            else:
+                output = f'{output}.{shard:05d}'
+        return open(output, 'wb', buffering=WRITE_BUFFER_SIZE)
+
+    @staticmethod
+    def _open_stdout():
+        '''
+        Standard output, with the same large buffer as the output files
+        '''
+        sys.stdout.flush()
+        try:
+            fd = sys.stdout.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            # Replaced by something without a descriptor, e.g. a capture
+            return sys.stdout.buffer
+        return open(fd, 'wb', buffering=WRITE_BUFFER_SIZE, closefd=False)
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.5 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('card_api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IssuersVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models
+from common.constants import (
+    MAX_IIN_LENGTH,
+    MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
+    MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
+)
+from common.issuers import IssuerRecord
+
+
+class Issuer(models.Model):
+    '''
+    A card issuer on top of the ones built into `CardIssuer`. Its BIN ranges
+    take precedence over the built-in ones
+    '''
+    name = models.CharField(max_length=64, unique=True)
+    num_digits = models.PositiveSmallIntegerField(
+        default=16,
+        validators=[
+            MinValueValidator(MIN_LENGTH), MaxValueValidator(MAX_LENGTH)
+        ]
+    )
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return self.name
+
+    def to_record(self):
+        '''
+        The IssuerRecord the issuer snapshot holds for this issuer
+        '''
+        return IssuerRecord(
+            self.id,
+            self.name,
+            self.num_digits,
+            tuple(
+                bin_range.as_bin_range() for bin_range in self.bin_ranges.all()
+            ),
+        )
+
+
+class BinRange(models.Model):
+    '''
+    One of an Issuer's BIN prefixes, or a (start, end) range of them
+    '''
+    issuer = models.ForeignKey(
+        Issuer, related_name='bin_ranges', on_delete=models.CASCADE
+    )
+    start = models.CharField(max_length=MAX_IIN_LENGTH)
+    # Blank for a single prefix
+    end = models.CharField(max_length=MAX_IIN_LENGTH, blank=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def as_bin_range(self):
+        '''
+        In the form of a `CardIssuer.bin_ranges` entry
+        '''
+        if not self.end or self.end == self.start:
+            return self.start
+        return (self.start, self.end)
+
+
+class IssuersVersion(models.Model):
+    '''
+    A single row counting the committed changes to the issuers, which every
+    worker compares with its snapshot's version
+    '''
+    version = models.PositiveIntegerField(default=0)
@@ -0,0 +1,15 @@
+from rest_framework.parsers import FileUploadParser
+
+
+class OctetStreamParser(FileUploadParser):
+    '''
+    Takes a raw `application/octet-stream` body as an uploaded file, so it's
+    spooled to disk like any other upload once it gets large. Unlike
+    FileUploadParser, no filename is needed
+    '''
+    media_type = 'application/octet-stream'
+
+    def get_filename(self, stream, media_type, parser_context):
+        return super().get_filename(
+            stream, media_type, parser_context
+        ) or 'upload'
@@ -1,5 +1,10 @@
 from rest_framework.schemas.openapi import AutoSchema
+from common.check_digits import (
+    CHECK_DIGIT_ALGORITHMS,
+    DEFAULT_CHECK_DIGIT_ALGORITHM,
+)
 from common.constants import (
+    MASK_CHARACTERS,
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
     MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
 )
@@ -31,6 +36,22 @@ NUMBER_DETAIL_RESPONSE_SCHEMA = {
             "type": "string",
             "pattern": r"\d",
             "example": "8"
+        },
+        "isBlocked": {
+            "type": "bool",
+            "description": "Whether the number is on the blocklist. Only "
+            "set when BLOCKLIST_PATH is",
+            "example": False,
+        },
+        "suggestions": {
+            "type": "array",
+            "items": {
+                "type": "string",
+                "pattern": r"\d{8,19}",
+            },
+            "description": "Only set when `suggest` was requested and the "
+            "number is invalid",
+            "example": ["4444444444444448"]
         }
     }
 }
@@ -41,9 +62,9 @@ class _Schema(AutoSchema):
     responses = None
     parameters = None
 
-    def get_operation(self, *args, **kwargs):
-        retval = super().get_operation(*args, **kwargs)
-        if self.request_body:
+    def get_operation(self, path, method):
+        retval = super().get_operation(path, method)
+        if self.request_body and method in ('POST', 'PUT', 'PATCH'):
             retval['requestBody'] = self.request_body
         if self.responses:
             retval['responses'] = self.responses
@@ -69,7 +90,26 @@ class ValidateCardSchema(_Schema):
                                 "between digits."
                             ),
                             "example": "0000 0000 0000 0000",
-                        }
+                        },
+                        "algorithm": {
+                            "type": "string",
+                            "enum": list(CHECK_DIGIT_ALGORITHMS),
+                            "default": DEFAULT_CHECK_DIGIT_ALGORITHM,
+                            "description": (
+                                "The check digit algorithm to validate "
+                                "`number` with."
+                            ),
+                        },
+                        "suggest": {
+                            "type": "bool",
+                            "default": False,
+                            "description": (
+                                "When `number` is invalid, also return the "
+                                "valid numbers from a known issuer that are "
+                                "one mistyped digit or one swapped pair of "
+                                "digits away."
+                            ),
+                        },
                     },
                     "required": ["number"]
                 }
@@ -99,28 +139,119 @@ class ValidateCardSchema(_Schema):
     }
 
 
-class GenerateCardSchema(_Schema):
+class BulkValidateCardSchema(_Schema):
+    request_body = {
+        "content": {
+            "application/octet-stream": {
+                "schema": {
+                    "type": "string",
+                    "format": "binary",
+                    "description": (
+                        "ASCII payment card numbers, one per line. Common "
+                        "separators are allowed between digits."
+                    ),
+                    "example": "4111 1111 1111 1111\n4111-1111-1111-1112\n",
+                }
+            },
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {
+                            "type": "string",
+                            "format": "binary",
+                            "description": (
+                                "A file of card numbers, one per line."
+                            ),
+                        },
+                    },
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+
     responses = {
         "200": {
-            "description": "A payment card number object",
+            "description": (
+                "One object per line of the input (NDJSON), in the same "
+                "order. Lines that /card-number/validate would reject get its "
+                "error object instead"
+            ),
             "content": {
-                "application/json": {
+                "application/x-ndjson": {
                     "schema": {
                         "type": "object",
                         "properties": {
-                            "number": {
+                            "isValid": {
+                                "type": "bool",
+                                "example": True,
+                            },
+                            "issuer": {
                                 "type": "string",
-                                "pattern": r"\d{8,19}",
-                                "example": "4024007168211802"
+                                "description": "Only set for valid numbers",
+                                "example": "Visa",
+                            },
+                            "isBlocked": {
+                                "type": "bool",
+                                "description": (
+                                    "Whether the number is on the blocklist. "
+                                    "Only set when BLOCKLIST_PATH is"
+                                ),
+                                "example": False,
                             },
-                            "details": NUMBER_DETAIL_RESPONSE_SCHEMA,
                         }
                     }
                 }
             }
         },
         "400": {
-            "description": "`issuer`, `prefix`, or `length` is an invalid value"
+            "description": "No file was submitted"
+        },
+        "415": {
+            "description": (
+                "The body isn't application/octet-stream or "
+                "multipart/form-data"
+            )
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
+
+
+GENERATED_NUMBER_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "number": {
+            "type": "string",
+            "pattern": r"\d{8,19}",
+            "example": "4024007168211802"
+        },
+        "details": NUMBER_DETAIL_RESPONSE_SCHEMA,
+    }
+}
+
+
+class GenerateCardSchema(_Schema):
+    responses = {
+        "200": {
+            "description": "A payment card number object. With `count`, one "
+            "object per line (NDJSON), streamed as they're generated",
+            "content": {
+                "application/json": {
+                    "schema": GENERATED_NUMBER_RESPONSE_SCHEMA
+                },
+                "application/x-ndjson": {
+                    "schema": GENERATED_NUMBER_RESPONSE_SCHEMA
+                },
+            }
+        },
+        "400": {
+            "description": (
+                "`issuer`, `prefix`, `length`, `algorithm`, `mix`, `count`, "
+                "`key`, or `offset` is an invalid value"
+            )
         },
         "default": {
             "description": "Unexpected error"
@@ -134,7 +265,8 @@ class GenerateCardSchema(_Schema):
             "type": "string"
         },
         "description": "The CardIssuer for the generated card to have the BIN "
-        "and length of. May not be used with `length` or `prefix`."
+        "and length of. May not be used with `length`, `prefix`, or "
+        "`algorithm`."
     }, {
         "in": "query",
         "name": "length",
@@ -150,4 +282,403 @@ class GenerateCardSchema(_Schema):
             "type": "string"
         },
         "description": "The digits for the generated card to begin with."
+    }, {
+        "in": "query",
+        "name": "algorithm",
+        "schema": {
+            "type": "string",
+            "enum": list(CHECK_DIGIT_ALGORITHMS),
+            "default": DEFAULT_CHECK_DIGIT_ALGORITHM,
+        },
+        "description": "The check digit algorithm the generated number must "
+        "pass."
+    }, {
+        "in": "query",
+        "name": "mix",
+        "schema": {
+            "type": "string"
+        },
+        "example": "visa:55,mastercard:25,amex:15,discover:5",
+        "description": "Pick each number's issuer at random by weight, "
+        "written as comma separated `issuer:weight` pairs. Can be combined "
+        "with `count` (numbers may repeat), but with no other parameter."
+    }, {
+        "in": "query",
+        "name": "count",
+        "schema": {
+            "type": "integer"
+        },
+        "description": "Generate this many numbers (up to a million by "
+        "default) and stream them back as NDJSON. They're distinct, except "
+        "with an `algorithm` other than luhn, where they may repeat."
+    }, {
+        "in": "query",
+        "name": "key",
+        "schema": {
+            "type": "string"
+        },
+        "description": "Seeds a keyed shuffle of every valid number under "
+        "the prefix or issuer. The same `key` and `offset` always return the "
+        "same numbers, and numbers from non-overlapping offsets never repeat. "
+        "May not be used with `algorithm`."
+    }, {
+        "in": "query",
+        "name": "offset",
+        "schema": {
+            "type": "integer",
+            "default": 0,
+        },
+        "description": "The position in the keyed shuffle to start from."
     }]
+
+
+class CompleteCardSchema(_Schema):
+    request_body = {
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "pattern": {
+                            "type": "string",
+                            "description": (
+                                "A partially known payment card number. "
+                                "Unknown digits are written as any of "
+                                f"{', '.join(MASK_CHARACTERS)}. Common "
+                                "separators are allowed between digits."
+                            ),
+                            "example": "4111 11** **** 1111",
+                        },
+                        "issuer": {
+                            "type": "string",
+                            "description": (
+                                "Only return numbers with a BIN belonging to "
+                                "this CardIssuer."
+                            ),
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "default": 100,
+                            "description": (
+                                "The most completions to list in `numbers`."
+                            ),
+                        },
+                    },
+                    "required": ["pattern"]
+                }
+            }
+        }
+    }
+
+    responses = {
+        "200": {
+            "description": "The completions of the pattern that pass Luhn",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "count": {
+                                "type": "integer",
+                                "description": "Total number of completions",
+                                "example": 100000,
+                            },
+                            "numbers": {
+                                "type": "array",
+                                "items": {
+                                    "type": "string",
+                                    "pattern": r"\d{8,19}",
+                                },
+                                "example": ["4111110000091111"],
+                            },
+                            "truncated": {
+                                "type": "bool",
+                                "description": (
+                                    "Whether `numbers` was cut off at `limit`"
+                                ),
+                                "example": True,
+                            },
+                        }
+                    }
+                }
+            }
+        },
+        "400": {
+            "description": (
+                "`pattern` has the wrong length or invalid characters, or "
+                "`issuer` or `limit` is an invalid value"
+            )
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
+
+
+class EnumerateCardSchema(_Schema):
+    responses = {
+        "200": {
+            "description": "One page of the valid numbers under a prefix",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "count": {
+                                "type": "integer",
+                                "description": (
+                                    "Total number of valid card numbers under "
+                                    "`prefix`"
+                                ),
+                                "example": 1000,
+                            },
+                            "numbers": {
+                                "type": "array",
+                                "items": {
+                                    "type": "string",
+                                    "pattern": r"\d{8,19}",
+                                },
+                                "example": ["4111111111110009"],
+                            },
+                            "next": {
+                                "type": "string",
+                                "nullable": True,
+                                "description": (
+                                    "Pass as `cursor` to get the next page. "
+                                    "Null on the last page."
+                                ),
+                            },
+                        }
+                    }
+                }
+            }
+        },
+        "400": {
+            "description": (
+                "`prefix`, `length`, `limit`, or `cursor` is an invalid value"
+            )
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
+
+    parameters = [{
+        "in": "query",
+        "name": "prefix",
+        "schema": {
+            "type": "string"
+        },
+        "description": "The digits every enumerated number begins with."
+    }, {
+        "in": "query",
+        "name": "length",
+        "schema": {
+            "type": "integer",
+            "default": 16,
+        },
+        "description": "The number of digits in each enumerated number."
+    }, {
+        "in": "query",
+        "name": "limit",
+        "schema": {
+            "type": "integer",
+            "default": 100,
+        },
+        "description": "The most numbers to return in one page."
+    }, {
+        "in": "query",
+        "name": "cursor",
+        "schema": {
+            "type": "string"
+        },
+        "description": "The `next` value from the previous page."
+    }]
+
+
+class NumberPoolsSchema(_Schema):
+    responses = {
+        "200": {
+            "description": "The state of each issuer's pool of pre-generated "
+            "numbers used by `/card-number/generate?issuer=...`",
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "issuer": {
+                                    "type": "string",
+                                    "example": "Visa",
+                                },
+                                "size": {
+                                    "type": "integer",
+                                    "description": "Numbers ready to serve",
+                                    "example": 9000,
+                                },
+                                "capacity": {
+                                    "type": "integer",
+                                    "example": 10000,
+                                },
+                                "hits": {
+                                    "type": "integer",
+                                    "description": (
+                                        "Requests served from the pool"
+                                    ),
+                                },
+                                "starved": {
+                                    "type": "integer",
+                                    "description": (
+                                        "Requests that found the pool empty "
+                                        "and generated their own number"
+                                    ),
+                                },
+                                "hitRate": {
+                                    "type": "number",
+                                    "nullable": True,
+                                    "description": (
+                                        "hits / (hits + starved). Null until "
+                                        "the first request"
+                                    ),
+                                },
+                                "refills": {
+                                    "type": "integer",
+                                    "description": (
+                                        "Batches added by the refill thread"
+                                    ),
+                                },
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
+
+
+ISSUER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {
+            "type": "integer",
+            "readOnly": True,
+            "example": 1,
+        },
+        "name": {
+            "type": "string",
+            "description": (
+                "Must not be the name of a built-in CardIssuer, and is "
+                "matched ignoring case, spaces and underscores"
+            ),
+            "example": "Acme Bank",
+        },
+        "numDigits": {
+            "type": "integer",
+            "default": 16,
+            "description": "The length of the issuer's card numbers (8-19)",
+        },
+        "binRanges": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "start": {
+                        "type": "string",
+                        "pattern": r"\d{1,8}",
+                        "example": "41111100",
+                    },
+                    "end": {
+                        "type": "string",
+                        "pattern": r"\d{1,8}",
+                        "description": (
+                            "The last prefix of the range, as long as `start`."
+                            " Defaults to `start`"
+                        ),
+                        "example": "41111199",
+                    },
+                },
+                "required": ["start"]
+            },
+            "description": (
+                "Takes precedence over the built-in issuers' BIN ranges"
+            ),
+        },
+    },
+    "required": ["name", "binRanges"]
+}
+
+
+class IssuersSchema(_Schema):
+    request_body = {
+        "content": {
+            "application/json": {
+                "schema": ISSUER_SCHEMA
+            }
+        }
+    }
+
+    responses = {
+        "200": {
+            "description": (
+                "Every issuer added on top of the built-in ones. The ETag "
+                "header changes whenever they do, and can be sent back as "
+                "If-None-Match"
+            ),
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": ISSUER_SCHEMA,
+                    }
+                }
+            }
+        },
+        "201": {
+            "description": "The created issuer",
+            "content": {
+                "application/json": {
+                    "schema": ISSUER_SCHEMA
+                }
+            }
+        },
+        "304": {
+            "description": "The issuers match the If-None-Match ETag"
+        },
+        "400": {
+            "description": "Invalid or duplicate name, length or BIN ranges"
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
+
+
+class IssuerSchema(_Schema):
+    request_body = IssuersSchema.request_body
+
+    responses = {
+        "200": {
+            "description": "The issuer",
+            "content": {
+                "application/json": {
+                    "schema": ISSUER_SCHEMA
+                }
+            }
+        },
+        "204": {
+            "description": "The issuer was deleted"
+        },
+        "400": {
+            "description": "Invalid or duplicate name, length or BIN ranges"
+        },
+        "404": {
+            "description": "No issuer has this id"
+        },
+        "default": {
+            "description": "Unexpected error"
+        }
+    }
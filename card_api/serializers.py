@@ -1,26 +1,89 @@
+import string
+from collections.abc import Mapping
+from django.db import transaction
 from rest_framework import serializers
+from common.bin_index import split_bin_range
+from common.blocklist import get_blocklist
 from common.constants import (
+    MASK_CHARACTERS,
+    MAX_IIN_LENGTH,
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
     MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
 )
+from common.enums import CardIssuer, UnknownIssuerError
+from common.check_digits import (
+    CHECK_DIGIT_ALGORITHMS,
+    DEFAULT_CHECK_DIGIT_ALGORITHM,
+    get_check_digit_algorithm,
+)
+from common.issuers import normalize_issuer_name
 from common.objects import PaymentCardNumber
+from common.parsing import parse_card_number
+from card_api.models import BinRange, Issuer
 from card_api.validators import (
     validate_contains_only_digits_and_separators,
+    validate_contains_only_alphabet_and_separators,
     LengthWithoutSeparatorsValidator
 )
 
 
+class CardNumberField(serializers.CharField):
+    '''
+    A CharField that parses its value into a `ParsedCardNumber`, so the
+    validators and `PaymentCardNumber` never strip the separators themselves
+    '''
+
+    def to_internal_value(self, data):
+        return parse_card_number(super().to_internal_value(data))
+
+
 class PaymentCardNumberSerializer(serializers.Serializer):
-    number = serializers.CharField(
+    number = CardNumberField(
         validators=[
-            validate_contains_only_digits_and_separators,
             LengthWithoutSeparatorsValidator(min=MIN_LENGTH, max=MAX_LENGTH)
         ]
     )
     private = serializers.BooleanField(default=True)
+    suggest = serializers.BooleanField(default=False)
+    algorithm = serializers.ChoiceField(
+        choices=list(CHECK_DIGIT_ALGORITHMS),
+        default=DEFAULT_CHECK_DIGIT_ALGORITHM,
+    )
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Checked alongside the length, so both errors are reported at once
+        number = fields['number']
+        number.validators = [self._validate_characters] + number.validators
+        return fields
+
+    def _validate_characters(self, value):
+        '''
+        Digits and separators, or for an alphanumeric check digit algorithm,
+        its alphabet and separators. The fields are validated one at a time,
+        so the algorithm is read from the input
+        '''
+        data = getattr(self, 'initial_data', None)
+        try:
+            check_digits = get_check_digit_algorithm(
+                data.get('algorithm') if isinstance(data, Mapping) else None
+            )
+        except ValueError:
+            # Reported by the algorithm field
+            check_digits = get_check_digit_algorithm(None)
+        if check_digits.is_numeric:
+            validate_contains_only_digits_and_separators(value)
+        else:
+            alphabet = check_digits.alphabet
+            if not check_digits.case_sensitive:
+                alphabet += alphabet.lower()
+            validate_contains_only_alphabet_and_separators(value, alphabet)
 
     def create(self, validated_data):
-        return PaymentCardNumber(validated_data['number'])
+        return PaymentCardNumber(
+            validated_data['number'],
+            algorithm=validated_data['algorithm'],
+        )
 
     def to_representation(self, instance):
         retval = {
@@ -33,9 +96,133 @@ class PaymentCardNumberSerializer(serializers.Serializer):
         }
         if instance.is_valid and instance.issuer:
             retval['issuer'] = instance.issuer
+        if get_blocklist() is not None:
+            retval['isBlocked'] = instance.is_blocked
+        if self.validated_data.get('suggest') and not instance.is_valid:
+            retval['suggestions'] = instance.suggest_corrections()
         if not self.validated_data.get('private'):
             retval = {
                 "number": instance.value,
                 "details": retval
             }
         return retval
+
+
+# Upper bound on how many completions a single response lists
+MAX_COMPLETIONS = 1000
+
+
+def _validate_masked_number(value):
+    validate_contains_only_alphabet_and_separators(
+        value, string.digits + ''.join(MASK_CHARACTERS),
+        name='digits, mask characters'
+    )
+
+
+class CompleteCardNumberSerializer(serializers.Serializer):
+    pattern = CardNumberField(
+        validators=[
+            _validate_masked_number,
+            LengthWithoutSeparatorsValidator(min=MIN_LENGTH, max=MAX_LENGTH)
+        ]
+    )
+    issuer = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_COMPLETIONS, default=100
+    )
+
+    def validate_issuer(self, value):
+        if not CardIssuer.from_string(value):
+            raise serializers.ValidationError(
+                str(UnknownIssuerError(value))
+            )
+        return value
+
+
+class BinRangeSerializer(serializers.Serializer):
+    '''
+    A BIN prefix (just `start`) or an inclusive range of equal-length
+    prefixes, represented from an IssuerRecord's `bin_ranges` entries
+    '''
+    start = serializers.CharField(max_length=MAX_IIN_LENGTH)
+    end = serializers.CharField(max_length=MAX_IIN_LENGTH, required=False)
+
+    def validate(self, data):
+        try:
+            start, end = split_bin_range(
+                (data['start'], data.get('end', data['start']))
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return {'start': start, 'end': end}
+
+    def to_representation(self, instance):
+        start, end = split_bin_range(instance)
+        return {'start': start, 'end': end}
+
+
+class IssuerSerializer(serializers.Serializer):
+    '''
+    Creates and updates the Issuer model, and represents the IssuerRecords
+    the issuer snapshot holds
+    '''
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(max_length=64)
+    numDigits = serializers.IntegerField(
+        source='num_digits', min_value=MIN_LENGTH, max_value=MAX_LENGTH,
+        default=16,
+    )
+    binRanges = BinRangeSerializer(
+        source='bin_ranges', many=True, allow_empty=False
+    )
+
+    def validate_name(self, value):
+        if isinstance(CardIssuer.from_string(value), CardIssuer):
+            raise serializers.ValidationError(
+                f"'{value}' is the name of a built-in issuer."
+            )
+        # Names are looked up normalized, so they have to be unique that way
+        others = Issuer.objects.all()
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        if any(
+            normalize_issuer_name(name) == normalize_issuer_name(value)
+            for name in others.values_list('name', flat=True)
+        ):
+            raise serializers.ValidationError(
+                f"An issuer named like '{value}' already exists."
+            )
+        return value
+
+    def _set_bin_ranges(self, issuer, bin_ranges):
+        issuer.bin_ranges.all().delete()
+        BinRange.objects.bulk_create([
+            BinRange(
+                issuer=issuer, start=bin_range['start'],
+                end=bin_range['end'] if bin_range['end'] != bin_range['start']
+                else '',
+            )
+            for bin_range in bin_ranges
+        ])
+
+    @transaction.atomic
+    def create(self, validated_data):
+        bin_ranges = validated_data.pop('bin_ranges')
+        issuer = Issuer.objects.create(**validated_data)
+        self._set_bin_ranges(issuer, bin_ranges)
+        return issuer
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        bin_ranges = validated_data.pop('bin_ranges', None)
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save()
+        if bin_ranges is not None:
+            self._set_bin_ranges(instance, bin_ranges)
+        return instance
+
+    def to_representation(self, instance):
+        if isinstance(instance, Issuer):
+            instance = instance.to_record()
+        return super().to_representation(instance)
@@ -1,10 +1,18 @@
 from django.urls import path
 from card_api.views import (
     ValidateCardView,
+    BulkValidateCardView,
     GenerateCardView,
+    CompleteCardView,
+    EnumerateCardView,
+    NumberPoolsView,
 )
 
 urlpatterns = [
     path('validate', ValidateCardView.as_view()),
+    path('validate/bulk', BulkValidateCardView.as_view()),
     path('generate', GenerateCardView.as_view()),
+    path('complete', CompleteCardView.as_view()),
+    path('enumerate', EnumerateCardView.as_view()),
+    path('generate/pools', NumberPoolsView.as_view()),
 ]
@@ -1,16 +1,38 @@
-import re
 import string
+from functools import lru_cache
 from rest_framework import serializers
 from common.constants import COMMON_SEPARATORS
+from common.parsing import ParsedCardNumber, parse_card_number
+
+
+@lru_cache(maxsize=None)
+def _alphabet_deletions(alphabet):
+    '''
+    str.translate table deleting every character in `alphabet`, built once
+    per alphabet
+    '''
+    return str.maketrans('', '', alphabet)
 
 
 def validate_contains_only_digits_and_separators(value):
-    allowed_characters = re.escape(string.digits + ''.join(COMMON_SEPARATORS))
-    only_allowed = re.match(f"[{allowed_characters}]+$", value)
-    if not only_allowed:
+    validate_contains_only_alphabet_and_separators(
+        value, string.digits, name='digits'
+    )
+
+
+def validate_contains_only_alphabet_and_separators(value, alphabet, *,
+                                                   name=None):
+    '''
+    Accepts a string or a `ParsedCardNumber`, which skips stripping the
+    separators again
+    '''
+    parsed = parse_card_number(value)
+    if not parsed.raw or parsed.stripped.translate(
+        _alphabet_deletions(alphabet)
+    ):
         raise serializers.ValidationError(
-            f"Only digits and common separators ({','.join(COMMON_SEPARATORS)})"
-            " are allowed"
+            f"Only {name or repr(alphabet)} and common separators "
+            f"({','.join(COMMON_SEPARATORS)}) are allowed"
         )
 
 
@@ -22,10 +44,9 @@ class LengthWithoutSeparatorsValidator:
         self._max = max
 
     def __call__(self, value):
-        if not isinstance(value, str):
+        if not isinstance(value, (str, ParsedCardNumber)):
             return  # SRP
-        for separator in COMMON_SEPARATORS:
-            value = value.replace(separator, '')
+        value = parse_card_number(value).stripped
         if isinstance(self._min, int) and len(value) < self._min:
             raise serializers.ValidationError(
                 f"Value must have at least {self._min}"
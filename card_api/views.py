@@ -1,14 +1,55 @@
+import base64
+import binascii
+import hashlib
+import itertools
+import json
+import mmap
+from functools import lru_cache
+import numpy as np
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from card_api.serializers import PaymentCardNumberSerializer
+from card_api.models import Issuer
+from card_api.parsers import OctetStreamParser
+from card_api.serializers import (
+    PaymentCardNumberSerializer,
+    CompleteCardNumberSerializer,
+    IssuerSerializer,
+)
 from common.algorithms import (
+    clean_card_number,
+    count_card_numbers,
+    IssuerMix,
     generate_card_number,
-    generate_card_number_from_issuer
+    generate_card_number_from_mix,
+    generate_unique_card_numbers,
+    iter_card_numbers,
+)
+from common.batch import luhn_check_lines
+from common.blocklist import get_blocklist
+from common.check_digits import get_check_digit_algorithm
+from common.enums import CardIssuer, CardNumberError, UnknownIssuerError
+from common.issuers import get_issuer_snapshot
+from common.objects import CardNumberArray, PaymentCardNumber
+from common.pools import issuer_pool_metrics, take_card_number
+from common.completion import (
+    complete_card_number,
+    count_card_number_completions,
 )
 from card_api.schemas import (
     ValidateCardSchema,
+    BulkValidateCardSchema,
     GenerateCardSchema,
+    CompleteCardSchema,
+    EnumerateCardSchema,
+    NumberPoolsSchema,
+    IssuersSchema,
+    IssuerSchema,
 )
 from common.constants import (
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
@@ -16,6 +57,220 @@ from common.constants import (
 )
 
 
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Upper bound on how many numbers a page of /card-number/enumerate lists
+MAX_ENUMERATE_LIMIT = 1000
+
+# Default upper bound on how many numbers one /card-number/generate call
+# streams, see the CARD_NUMBER_MAX_GENERATE_COUNT setting
+MAX_GENERATE_COUNT = 1000000
+
+
+def _encode_cursor(prefix, num_digits, rank):
+    '''
+    Pack where to resume an enumeration into an opaque, URL-safe string. The
+    query it belongs to is included so it can't be replayed against another
+    '''
+    raw = f'{prefix}:{num_digits}:{rank}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor, prefix, num_digits):
+    '''
+    The rank a cursor resumes from, or None if it's malformed or from a
+    different query
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii')
+        cursor_prefix, cursor_digits, rank = raw.split(':')
+        if (cursor_prefix, cursor_digits) != (prefix, str(num_digits)):
+            return None
+        rank = int(rank)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    return rank if rank >= 0 else None
+
+
+# Query params of /card-number/generate that pick the numbers themselves, and
+# so can't be combined with an issuer `mix`
+_MIX_EXCLUSIVE_PARAMS = [
+    'issuer', 'prefix', 'length', 'algorithm', 'key', 'offset'
+]
+
+
+# Most mixes `_parse_issuer_mix` keeps
+MIX_CACHE_SIZE = 128
+
+# The issuer snapshot `_parse_issuer_mix` last answered from, and its cache
+# for it. Replaced whole when the snapshot is, so a mix naming issuers from
+# it isn't answered from an older one and a retired snapshot isn't kept alive
+_mix_cache = (None, {})
+
+
+def _parse_issuer_mix(mix, issuers):
+    global _mix_cache
+    cached_issuers, cache = _mix_cache
+    if cached_issuers is not issuers:
+        cache = {}
+        _mix_cache = (issuers, cache)
+    try:
+        return cache[mix]
+    except KeyError:
+        pass
+    if len(cache) >= MIX_CACHE_SIZE:
+        cache.clear()
+    issuer_mix = cache[mix] = IssuerMix.from_string(mix)
+    return issuer_mix
+
+
+def _parse_count(count):
+    '''
+    Validate the `count` query param of /card-number/generate
+    '''
+    max_count = getattr(
+        settings, 'CARD_NUMBER_MAX_GENERATE_COUNT', MAX_GENERATE_COUNT
+    )
+    try:
+        count = int(count)
+    except ValueError:
+        raise ValueError("Must be an integer") from None
+    if not 1 <= count <= max_count:
+        raise ValueError(f"Must be between [1, {max_count}], inclusive.")
+    return count
+
+
+def _describe_generated(number, **kwargs):
+    '''
+    The `number` + `details` record returned for a generated card number
+    '''
+    serializer = PaymentCardNumberSerializer(
+        data={'number': number, 'private': False, **kwargs}
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    return serializer.data
+
+
+def _describe_generated_many(numbers, **kwargs):
+    '''
+    Lazily `_describe_generated` each number. The serializer (and its options)
+    is only validated for the first number and reused for the rest, which
+    skips rebuilding its fields per record
+    '''
+    numbers = iter(numbers)
+    first = next(numbers, None)
+    if first is None:
+        return
+    serializer = PaymentCardNumberSerializer(
+        data={'number': first, 'private': False, **kwargs}
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    yield serializer.data
+    algorithm = serializer.validated_data['algorithm']
+    for number in numbers:
+        # Generated numbers are already clean digits
+        instance = PaymentCardNumber.from_digits(number, algorithm=algorithm)
+        yield serializer.to_representation(instance)
+
+
+def _get_generated_response(numbers, *, stream, **kwargs):
+    '''
+    The record for the first of `numbers`, or with `stream`, an NDJSON stream
+    of one record per number. Records are built as the stream is read, so
+    memory use doesn't grow with the count
+    '''
+    if not stream:
+        return Response(
+            _describe_generated(next(iter(numbers)), **kwargs),
+            status=status.HTTP_200_OK
+        )
+    records = map(_to_ndjson, _describe_generated_many(numbers, **kwargs))
+    return StreamingHttpResponse(records, content_type=NDJSON_CONTENT_TYPE)
+
+
+def _to_ndjson(record):
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def _rejected(number):
+    '''
+    The errors /card-number/validate responds with for `number`
+    '''
+    serializer = PaymentCardNumberSerializer(data={'number': number})
+    serializer.is_valid()
+    return serializer.errors
+
+
+@lru_cache(maxsize=4)
+def _bulk_records(issuers, blocking=False):
+    '''
+    Every distinct record of /card-number/validate/bulk, indexed by the codes
+    `_describe_lines` gives each line: invalid, valid without an issuer, valid
+    per name in `issuers` (see `CardNumberArray.issuers`), then the errors
+    for invalid characters and too few or too many digits. With `blocking`,
+    the records before the errors have isBlocked, and are followed by their
+    blocked versions
+    '''
+    records = [{'isValid': False}, {'isValid': True}] + [
+        {'isValid': True, 'issuer': issuer} for issuer in issuers
+    ]
+    if blocking:
+        records = [
+            {**record, 'isBlocked': is_blocked}
+            for is_blocked in (False, True) for record in records
+        ]
+    records += [
+        _rejected('x' * MIN_LENGTH),
+        _rejected('0'),
+        _rejected('0' * (MAX_LENGTH + 1)),
+    ]
+    return np.array([_to_ndjson(record) for record in records], dtype=object)
+
+
+def _describe_lines(data):
+    '''
+    An NDJSON record per line of card numbers in `data`, in the same order.
+    Lines are checked in batches with `luhn_check_lines`, and each batch is
+    written out as one string
+    '''
+    blocklist = get_blocklist()
+    for valid, values, lengths, errors in luhn_check_lines(data):
+        numbers = CardNumberArray(values[valid], lengths[valid])
+        issuers = numbers.issuer
+        records = _bulk_records(numbers.issuers, blocklist is not None)
+        invalid_characters, too_short, too_long = range(len(records))[-3:]
+        # How many codes there are before their blocked versions
+        unblocked = 2 + len(numbers.issuers)
+        codes = valid.astype(np.intp)
+        codes[valid] += np.where(issuers >= 0, issuers + 1, 0)
+        if blocklist is not None:
+            codes[blocklist.contains_many(values, lengths)] += unblocked
+        codes[lengths < MIN_LENGTH] = too_short
+        codes[lengths > MAX_LENGTH] = too_long
+        codes[errors == CardNumberError.INVALID_CHARACTERS] = (
+            invalid_characters
+        )
+        yield ''.join(records[codes])
+
+
+def _read_upload(upload):
+    '''
+    An uploaded file as something `luhn_check_lines` can read in place: the
+    file mapped into memory if it was spooled to disk, or the buffer behind
+    an in-memory upload
+    '''
+    if hasattr(upload, 'temporary_file_path'):
+        if not upload.size:
+            return b''
+        with open(upload.temporary_file_path(), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(upload.file, 'getbuffer'):
+        return upload.file.getbuffer()
+    return upload.chunks()
+
+
 def _get_payment_card_number_response(**kwargs):
     serializer = PaymentCardNumberSerializer(data=kwargs)
     if serializer.is_valid():
@@ -31,6 +286,23 @@ class ValidateCardView(APIView):
         return _get_payment_card_number_response(**request.data)
 
 
+class BulkValidateCardView(APIView):
+    schema = BulkValidateCardSchema()
+    parser_classes = [OctetStreamParser, MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'file': ["No file was submitted."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return StreamingHttpResponse(
+            _describe_lines(_read_upload(upload)),
+            content_type=NDJSON_CONTENT_TYPE
+        )
+
+
 class GenerateCardView(APIView):
     schema = GenerateCardSchema()
 
@@ -40,18 +312,48 @@ class GenerateCardView(APIView):
                 kwargs[k] = [v]
         return Response(kwargs, status=status.HTTP_400_BAD_REQUEST)
 
+    def _unknown_issuer(self, error, field='issuer'):
+        '''
+        The 400 for an issuer that wasn't found, listing the issuers it could
+        have meant under `suggestions`
+        '''
+        return self._bad(**{field: str(error)}, suggestions=error.suggestions)
+
     def get(self, request):
         num_digits = request.query_params.get('length')
         issuer = request.query_params.get('issuer')
         prefix = request.query_params.get('prefix')
+        algorithm = request.query_params.get('algorithm')
+        count = request.query_params.get('count')
+        key = request.query_params.get('key')
+        offset = request.query_params.get('offset')
+        mix = request.query_params.get('mix')
 
-        if issuer and (prefix or num_digits is not None):
+        if mix is not None:
+            return self._get_mix(request, mix=mix, count=count)
+        if issuer and (prefix or num_digits is not None or algorithm):
             return self._bad(
-                issuer="cannot be specified with `prefix` or `length`"
+                issuer="cannot be specified with `prefix`, `length`, or "
+                "`algorithm`"
+            )
+        if algorithm:
+            try:
+                algorithm = get_check_digit_algorithm(algorithm).name
+            except ValueError as e:
+                return self._bad(algorithm=str(e))
+        # The keyed shuffle only covers Luhn numbers, so other algorithms
+        # stream independently generated numbers for a `count`
+        if key is not None or offset is not None or (
+            count is not None and not algorithm
+        ):
+            return self._get_unique(
+                request, count=count, key=key, offset=offset
             )
         if issuer:
             try:
-                number = generate_card_number_from_issuer(issuer)
+                number = take_card_number(issuer)
+            except UnknownIssuerError as e:
+                return self._unknown_issuer(e)
             except Exception as e:
                 return self._bad(issuer=str(e))
         else:
@@ -69,8 +371,263 @@ class GenerateCardView(APIView):
                 inputs['num_digits'] = int(num_digits)
             if prefix:
                 inputs['prefix'] = prefix
+            if algorithm:
+                inputs['algorithm'] = algorithm
             try:
                 number = generate_card_number(**inputs)
             except Exception as e:
                 return self._bad(prefix=str(e))
-        return _get_payment_card_number_response(number=number, private=False)
+        details = {'algorithm': algorithm} if algorithm else {}
+        if count is not None:
+            try:
+                count = _parse_count(count)
+            except ValueError as e:
+                return self._bad(count=str(e))
+            numbers = itertools.chain([number], (
+                generate_card_number(**inputs) for _ in range(count - 1)
+            ))
+            return _get_generated_response(numbers, stream=True, **details)
+        return _get_payment_card_number_response(
+            number=number, private=False, **details
+        )
+
+    def _get_mix(self, request, *, mix, count):
+        '''
+        Generate numbers from issuers drawn by weight, e.g.
+        "visa:55,mastercard:25,amex:15,discover:5"
+        '''
+        others = [
+            f'`{name}`' for name in _MIX_EXCLUSIVE_PARAMS
+            if request.query_params.get(name) is not None
+        ]
+        if others:
+            return self._bad(
+                mix=f"cannot be specified with {', '.join(others)}"
+            )
+        try:
+            mix = _parse_issuer_mix(mix, get_issuer_snapshot())
+        except UnknownIssuerError as e:
+            return self._unknown_issuer(e, field='mix')
+        except ValueError as e:
+            return self._bad(mix=str(e))
+        stream = count is not None
+        try:
+            count = _parse_count(count) if stream else 1
+        except ValueError as e:
+            return self._bad(count=str(e))
+
+        numbers = (generate_card_number_from_mix(mix) for _ in range(count))
+        return _get_generated_response(numbers, stream=stream)
+
+    def _get_unique(self, request, *, count, key, offset):
+        '''
+        Generate `count` distinct numbers from a keyed shuffle of every valid
+        number under the prefix or issuer. The same key and offset always give
+        the same numbers
+        '''
+        if request.query_params.get('algorithm'):
+            return self._bad(
+                algorithm="cannot be specified with `key` or `offset`"
+            )
+        stream = count is not None
+        try:
+            count = _parse_count(count) if stream else 1
+        except ValueError as e:
+            return self._bad(count=str(e))
+        try:
+            offset = int(offset) if offset is not None else 0
+        except ValueError:
+            return self._bad(offset="Must be an integer")
+        if offset < 0:
+            return self._bad(offset="Must not be negative")
+
+        issuer = request.query_params.get('issuer')
+        if issuer:
+            prefixes = CardIssuer.from_string(issuer)
+            if not prefixes:
+                return self._unknown_issuer(UnknownIssuerError(issuer))
+            num_digits = prefixes.num_digits
+        else:
+            prefixes = request.query_params.get('prefix') or ''
+            try:
+                num_digits = int(request.query_params.get('length', 16))
+            except ValueError:
+                return self._bad(length="Must be an integer")
+        if num_digits < MIN_LENGTH or num_digits > MAX_LENGTH:
+            return self._bad(
+                length=f"Must be between [{MIN_LENGTH}, {MAX_LENGTH}], "
+                "inclusive."
+            )
+        try:
+            space = count_card_numbers(prefixes, num_digits=num_digits)
+        except ValueError as e:
+            return self._bad(prefix=str(e))
+        if offset + count > space:
+            error = (
+                f"Only {space} valid card numbers exist under the given "
+                f"prefix or issuer."
+            )
+            return self._bad(**{'offset' if offset else 'count': error})
+        numbers = generate_unique_card_numbers(
+            count, prefixes, num_digits=num_digits, key=key, offset=offset
+        )
+        return _get_generated_response(numbers, stream=stream)
+
+
+class CompleteCardView(APIView):
+    schema = CompleteCardSchema()
+
+    def post(self, request):
+        serializer = CompleteCardNumberSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        pattern = serializer.validated_data['pattern']
+        issuer = serializer.validated_data.get('issuer')
+        limit = serializer.validated_data['limit']
+
+        count = count_card_number_completions(pattern, issuer=issuer)
+        numbers = list(itertools.islice(
+            complete_card_number(pattern, issuer=issuer), limit
+        ))
+        return Response({
+            'count': count,
+            'numbers': numbers,
+            'truncated': count > len(numbers),
+        }, status=status.HTTP_200_OK)
+
+
+class EnumerateCardView(APIView):
+    schema = EnumerateCardSchema()
+
+    def _bad(self, **kwargs):
+        return Response(
+            {k: [v] for k, v in kwargs.items()},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    def get(self, request):
+        prefix = request.query_params.get('prefix') or ''
+        num_digits = request.query_params.get('length', 16)
+        limit = request.query_params.get('limit', 100)
+        cursor = request.query_params.get('cursor')
+
+        try:
+            num_digits = int(num_digits)
+        except ValueError:
+            return self._bad(length="Must be an integer")
+        if num_digits < MIN_LENGTH or num_digits > MAX_LENGTH:
+            return self._bad(
+                length=f"Must be between [{MIN_LENGTH}, {MAX_LENGTH}], "
+                "inclusive."
+            )
+        try:
+            limit = int(limit)
+        except ValueError:
+            return self._bad(limit="Must be an integer")
+        if not 1 <= limit <= MAX_ENUMERATE_LIMIT:
+            return self._bad(
+                limit=f"Must be between [1, {MAX_ENUMERATE_LIMIT}], inclusive."
+            )
+        try:
+            prefix = clean_card_number(prefix, var_name='prefix') \
+                if prefix else ''
+            count = count_card_numbers(prefix, num_digits=num_digits)
+        except ValueError as e:
+            return self._bad(prefix=str(e))
+
+        start = 0
+        if cursor:
+            start = _decode_cursor(cursor, prefix, num_digits)
+            if start is None or start > count:
+                return self._bad(cursor="Invalid cursor for this query")
+
+        numbers = list(itertools.islice(
+            iter_card_numbers(prefix, num_digits=num_digits, start=start),
+            limit
+        )) if start < count else []
+        end = start + len(numbers)
+        return Response({
+            'count': count,
+            'numbers': numbers,
+            'next': _encode_cursor(prefix, num_digits, end)
+            if end < count else None,
+        }, status=status.HTTP_200_OK)
+
+
+class NumberPoolsView(APIView):
+    schema = NumberPoolsSchema()
+
+    def get(self, request):
+        return Response(issuer_pool_metrics(), status=status.HTTP_200_OK)
+
+
+@lru_cache(maxsize=1)
+def _issuer_listing(snapshot):
+    '''
+    The GET /issuers body for an issuer snapshot and its ETag, a hash of the
+    body. Snapshots never change, so both are only worked out once per
+    snapshot
+    '''
+    data = IssuerSerializer(snapshot.records, many=True).data
+    digest = hashlib.sha256(
+        json.dumps(data, sort_keys=True).encode('utf-8')
+    ).hexdigest()
+    return data, quote_etag(digest[:32])
+
+
+class IssuerListView(APIView):
+    schema = IssuersSchema()
+
+    def get(self, request):
+        '''
+        Served from the issuer snapshot rather than the database
+        '''
+        data, etag = _issuer_listing(get_issuer_snapshot())
+        headers = {'ETag': etag}
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and (
+            etag in parse_etags(if_none_match) or if_none_match == '*'
+        ):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+    def post(self, request):
+        serializer = IssuerSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class IssuerDetailView(APIView):
+    schema = IssuerSchema()
+
+    def get(self, request, pk):
+        issuer = get_object_or_404(Issuer, pk=pk)
+        return Response(
+            IssuerSerializer(issuer).data, status=status.HTTP_200_OK
+        )
+
+    def put(self, request, pk, partial=False):
+        issuer = get_object_or_404(Issuer, pk=pk)
+        serializer = IssuerSerializer(
+            issuer, data=request.data, partial=partial
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def patch(self, request, pk):
+        return self.put(request, pk, partial=True)
+
+    def delete(self, request, pk):
+        get_object_or_404(Issuer, pk=pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,19 +1,70 @@
-import re
-import string
-import random
-from common.constants import (
+import hashlib
+import math
+from collections import namedtuple
+from functools import lru_cache
+from common.constants import (  # noqa: F401 - re-exports COMMON_SEPARATORS
     COMMON_SEPARATORS,
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
     MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
 )
-from common.enums import CardIssuer
+from common.entropy import get_entropy_pool
+from common.parsing import parse_card_number
+from common.enums import CardIssuer, UnknownIssuerError
+from common.issuers import IssuerRecord
+from common.check_digits import (
+    DEFAULT_CHECK_DIGIT_ALGORITHM,
+    get_check_digit_algorithm,
+)
+
+
+# Lookup table mapping each digit to its Luhn-doubled value (2n, minus 9 when
+# the result is two digits) so the checksum never has to branch per digit
+_LUHN_DOUBLED = str.maketrans('0123456789', '0246813579')
+_LUHN_DOUBLED_VALUES = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+# The check digits for the 10 numbers that differ only in their last account
+# digit, keyed by the checksum of everything before that digit
+_LUHN_NEXT_CHECKS = tuple(
+    ''.join(str(-(kept + _LUHN_DOUBLED_VALUES[d]) % 10) for d in range(10))
+    for kept in range(10)
+)
+
+# The digit whose Luhn term (doubled or not) is a given value mod 10
+_LUHN_INVERSE_TERM = {
+    True: tuple(_LUHN_DOUBLED_VALUES.index(v) for v in range(10)),
+    False: tuple(range(10)),
+}
+
+# For a checksum that is off by `error`, the digit that fixes it when typed in
+# place of each digit, as translation tables keyed by (is doubled, error)
+_LUHN_FIXES = {
+    (doubled, error): str.maketrans('0123456789', ''.join(
+        str(_LUHN_INVERSE_TERM[doubled][(term - error) % 10])
+        for term in (_LUHN_DOUBLED_VALUES if doubled else range(10))
+    ))
+    for doubled in (True, False)
+    for error in range(10)
+}
+
+# For a checksum that is off by `error`, the pairs of neighbouring digits that
+# fix it when swapped, keyed by (is the left one doubled, error)
+_LUHN_SWAP_FIXES = {
+    (left_doubled, error): frozenset(
+        f'{a}{b}' for a in range(10) for b in range(10)
+        if a != b and (error + (
+            _LUHN_DOUBLED_VALUES[b] + a - _LUHN_DOUBLED_VALUES[a] - b
+        ) * (1 if left_doubled else -1)) % 10 == 0
+    )
+    for left_doubled in (True, False)
+    for error in range(10)
+}
 
 
 def is_all_digits(maybe_all_digits):
     '''
     Returns True if the input string contains only digits (0-9), otherwise False
     '''
-    return bool(re.fullmatch(r'\d+', maybe_all_digits))
+    return maybe_all_digits.isascii() and maybe_all_digits.isdigit()
 
 
 def clean_card_number(card_number, *, var_name='card_number'):
@@ -21,14 +72,9 @@ def clean_card_number(card_number, *, var_name='card_number'):
     Many users tend to add spaces, dashes, or periods in between chunks of
     numbers on their credit cards. Clean the number by removing all the "spacer"
     characters from the card number, and assert the result is only digits.
+    Accepts a `ParsedCardNumber` to skip stripping the separators again.
     '''
-    if not isinstance(card_number, str):
-        raise TypeError(
-            f"Expected {var_name} to be type 'str'. Got: {type(card_number)}"
-        )
-
-    for ignore in COMMON_SEPARATORS:
-        card_number = card_number.replace(ignore, '')
+    card_number = parse_card_number(card_number, var_name=var_name).stripped
     if not is_all_digits(card_number):
         raise ValueError(
             f"{var_name} must be string of digits. Got: {card_number}"
@@ -36,15 +82,92 @@ def clean_card_number(card_number, *, var_name='card_number'):
     return card_number
 
 
-def luhn_check(card_number):
+def luhn_check(card_number, *, algorithm=None):
     '''
     Takes the card number to check against the Luhn algorithm and returns
     True/False for whether it passed
+
+    `algorithm` selects a different check digit algorithm by name (see
+    `common.check_digits.CHECK_DIGIT_ALGORITHMS`)
     '''
-    card_number = clean_card_number(card_number)
-    valid_check_digit = str(_get_luhn_check_digit(card_number))
-    cur_check_digit = card_number[-1:]
-    return valid_check_digit == cur_check_digit
+    if _is_default_algorithm(algorithm):
+        return is_luhn_valid(clean_card_number(card_number))
+    check_digits = get_check_digit_algorithm(algorithm)
+    return check_digits.is_valid(check_digits.clean(card_number))
+
+
+def _is_default_algorithm(algorithm):
+    '''
+    The default (Luhn mod 10) takes the faster path through `_luhn_sum`
+    '''
+    return algorithm is None or (
+        get_check_digit_algorithm(algorithm)
+        is get_check_digit_algorithm(DEFAULT_CHECK_DIGIT_ALGORITHM)
+    )
+
+
+def is_luhn_valid(digits):
+    '''
+    Luhn check for a number that has already been cleaned down to only digits
+    (see `clean_card_number`). Includes the check digit.
+    '''
+    return _luhn_sum(digits) % 10 == 0
+
+
+def _luhn_sum(digits, *, is_incomplete=False):
+    '''
+    The Luhn checksum (before the mod 10) of a string of digits in one pass.
+
+    Every other digit starting from the rightmost is doubled. When the digits
+    already end in a check digit it's skipped, so the doubling starts one place
+    further left. Doubled digits go through a translation table, then each half
+    is summed straight off its ASCII bytes (48 == ord('0')).
+    '''
+    if is_incomplete:
+        doubled, kept = digits[::-2], digits[-2::-2]
+    else:
+        doubled, kept = digits[-2::-2], digits[::-2]
+    return (
+        sum(kept.encode('ascii'))
+        + sum(doubled.translate(_LUHN_DOUBLED).encode('ascii'))
+        - 48 * len(digits)
+    )
+
+
+def luhn_corrections(digits):
+    '''
+    Every number that is one typo away from a cleaned number failing the Luhn
+    algorithm and passes it. A typo is either one wrong digit or one pair of
+    neighbouring digits swapped.
+
+    Each candidate comes from how far off the checksum is, not by re-running
+    the check: only one digit in any position makes up the difference, and a
+    swap changes the checksum by a fixed amount per pair of digits.
+    '''
+    error = _luhn_sum(digits) % 10
+    if not error:
+        return []
+    length = len(digits)
+    # The fixing digit for every position at once: digits an even distance
+    # from the right-hand end are kept as is, the rest are doubled
+    fixes = list(digits)
+    fixes[length - 1::-2] = digits[::-2].translate(_LUHN_FIXES[False, error])
+    fixes[length - 2::-2] = digits[-2::-2].translate(_LUHN_FIXES[True, error])
+    candidates = [
+        f'{digits[:idx]}{fixed}{digits[idx + 1:]}'
+        for idx, fixed in enumerate(fixes)
+    ]
+
+    swaps = (
+        _LUHN_SWAP_FIXES[length % 2 == 0, error],
+        _LUHN_SWAP_FIXES[length % 2 == 1, error],
+    )
+    candidates.extend(
+        f'{digits[:idx]}{digits[idx + 1]}{digits[idx]}{digits[idx + 2:]}'
+        for idx in range(length - 1)
+        if digits[idx:idx + 2] in swaps[idx % 2]
+    )
+    return candidates
 
 
 def _get_luhn_check_digit(card_number, *, is_incomplete=False):
@@ -60,58 +183,140 @@ def _get_luhn_check_digit(card_number, *, is_incomplete=False):
     if not is_incomplete:
         card_number = card_number[:-1]
 
-    check_sum = 0
-    to_double, remaining = card_number[::-2], card_number[:-1][::-2]
-    for digit in to_double:
-        doubled = int(digit) * 2
-        if doubled > 9:
-            doubled -= 9
-        check_sum += doubled
-    check_sum += sum(int(x) for x in remaining)
+    return -_luhn_sum(card_number, is_incomplete=True) % 10
+
 
-    return (10 - (check_sum % 10)) % 10
+class LuhnState(namedtuple('LuhnState', 'if_last_doubled if_last_kept')):
+    '''
+    An immutable, partially computed Luhn checksum for digits read left to
+    right. Since the final length isn't known yet, both parities are tracked:
+        if_last_doubled - the checksum (mod 10) if the last digit so far gets
+                          doubled, which is the case once a check digit follows
+        if_last_kept    - the checksum (mod 10) if the last digit so far is the
+                          check digit itself
+    Adding a digit shifts every earlier digit by one place, swapping the two.
+    '''
+    __slots__ = ()
+
+    def __new__(cls, if_last_doubled=0, if_last_kept=0):
+        return super().__new__(cls, if_last_doubled, if_last_kept)
+
+    @classmethod
+    def from_digits(cls, digits):
+        return cls().extend(digits)
+
+    def append(self, digit):
+        '''
+        Add a single digit (an int or a 1-character string) to the right
+        '''
+        digit = int(digit)
+        return LuhnState(
+            (self.if_last_kept + _LUHN_DOUBLED_VALUES[digit]) % 10,
+            (self.if_last_doubled + digit) % 10,
+        )
+
+    def extend(self, digits):
+        '''
+        Add a string of already-cleaned digits to the right in one pass
+        '''
+        if not digits:
+            return self
+        doubled, kept = self
+        if len(digits) % 2:
+            doubled, kept = kept, doubled
+        return LuhnState(
+            (doubled + _luhn_sum(digits, is_incomplete=True)) % 10,
+            (kept + _luhn_sum(digits)) % 10,
+        )
+
+    def check_digit(self):
+        '''
+        The check digit to append to the digits so far
+        '''
+        return -self.if_last_doubled % 10
+
+    @property
+    def is_valid(self):
+        '''
+        Whether the digits so far (ending in their check digit) pass Luhn
+        '''
+        return self.if_last_kept == 0
 
 
-def generate_card_number(prefix=None, *, num_digits=16):
+@lru_cache(maxsize=1024)
+def _luhn_prefix_state(prefix):
+    '''
+    The `LuhnState` of a cleaned prefix, cached since generation tends to reuse
+    the same handful of BINs
+    '''
+    return LuhnState.from_digits(prefix)
+
+
+def generate_card_number(prefix=None, *, num_digits=16, algorithm=None,
+                         key=None, index=0):
     '''
     Generate a random card number that passes the Luhn algorithm, given:
         a prefix (optional)
             &
         the number of digits to generate (optional - defaults to 16)
+            &
+        a check digit algorithm to use instead of Luhn (optional)
+
+    Passing a `key` switches to a repeatable mode: the number at position
+    `index` of a keyed shuffle of every valid number under the prefix. Each
+    index gives a different number (see `generate_unique_card_numbers`).
     '''
+    if key is not None:
+        if not _is_default_algorithm(algorithm):
+            raise ValueError("Keyed generation only supports Luhn numbers.")
+        return next(generate_unique_card_numbers(
+            1, prefix or '', num_digits=num_digits, key=key, offset=index
+        ))
+
     if num_digits < MIN_LENGTH or num_digits > MAX_LENGTH:
         raise ValueError(
             "Invalid length requested. Valid card numbers must be a length"
             f" between [{MIN_LENGTH}, {MAX_LENGTH}] inclusive."
         )
 
+    is_default = _is_default_algorithm(algorithm)
+    check_digits = get_check_digit_algorithm(algorithm)
     if not prefix:
         prefix = ''
-    else:
+    elif is_default:
         # Make sure we only have digits and that when we're checking how many
         # digits to generate, we have the actual length without separators
         prefix = clean_card_number(prefix, var_name='prefix')
+    else:
+        prefix = check_digits.clean(prefix, var_name='prefix')
     length = len(prefix)
     if length > num_digits:
         raise ValueError(
             "Too many digits given in prefix. Card number of length "
             f"{num_digits} requested, but {length} digits already given.")
     if length == num_digits:
-        check = _get_luhn_check_digit(prefix)
-        if str(check) == prefix[-1]:
+        if is_default:
+            check = str(_get_luhn_check_digit(prefix))
+        else:
+            check = check_digits.check_character(prefix[:-1])
+        if check == prefix[-1]:
             return prefix
         raise ValueError(
             "Requested a card number of the same length as digits given, but "
             f"check digit is incorrect. Given '{prefix}', but check digit must "
             f"be '{check}'."
         )
-    randoms_needed = num_digits - length - 1
-    while randoms_needed > 0:
-        prefix += random.choice(string.digits)
-        randoms_needed -= 1
+    randoms = get_entropy_pool().characters(
+        check_digits.alphabet, num_digits - length - 1
+    )
 
-    check = _get_luhn_check_digit(prefix, is_incomplete=True)
-    return prefix + str(check)
+    if is_default:
+        # The prefix's share of the checksum is cached, so only the random
+        # digits get summed when many numbers are generated under one BIN
+        state = _luhn_prefix_state(prefix).extend(randoms)
+        return f'{prefix}{randoms}{state.check_digit()}'
+    payload = prefix + randoms
+    return payload + check_digits.check_character(payload)
 
 
 def generate_card_number_from_issuer(issuer):
@@ -121,22 +326,402 @@ def generate_card_number_from_issuer(issuer):
     '''
     create_from = CardIssuer.from_string(issuer)
     if not create_from:
-        raise ValueError(f"Unable to find CardIssuer matching '{issuer}'.")
+        raise UnknownIssuerError(issuer)
+
+    rng = get_entropy_pool()
+    prefix_range = rng.choice(create_from.bin_ranges)
+    return generate_card_number(
+        prefix=_pick_prefix(rng, prefix_range),
+        num_digits=create_from.num_digits
+    )
 
-    prefix_range = random.choice(create_from.bin_ranges)
+
+def _pick_prefix(rng, prefix_range):
+    '''
+    A random prefix from one of the entries of `CardIssuer.bin_ranges`
+    '''
     if isinstance(prefix_range, str):
-        prefix = prefix_range
-    else:
-        start, end = prefix_range
-        if start.startswith('0') or end.startswith('0'):
-            # None of the BINs we care about right now begin with a 0,
-            # so let's worry about this later
-            raise NotImplementedError(
-                "Implement a method that does not cast the start/end "
-                "as integers because leading 0s will be lost."
+        return prefix_range
+    start, end = prefix_range
+    if start.startswith('0') or end.startswith('0'):
+        # None of the BINs we care about right now begin with a 0,
+        # so let's worry about this later
+        raise NotImplementedError(
+            "Implement a method that does not cast the start/end "
+            "as integers because leading 0s will be lost."
+        )
+    return str(rng.randint(int(start), int(end)))
+
+
+class IssuerMix:
+    '''
+    A weighted distribution over card issuers, e.g. {'visa': 55, 'amex': 45}.
+    Inside each issuer, `bin_weights` optionally maps the issuer to one weight
+    per entry of its `bin_ranges` (by default every entry is equally likely,
+    like `generate_card_number_from_issuer`).
+
+    Every (issuer, BIN range) pair goes into an alias table (Vose's method),
+    so each draw takes two random numbers no matter how many pairs there are.
+    '''
+    # Alias probabilities are stored as integers out of this, so a draw never
+    # needs a float
+    _SCALE = 1 << 32
+
+    def __init__(self, weights, *, bin_weights=None):
+        bin_weights = {
+            CardIssuer.from_string(issuer): w
+            for issuer, w in (bin_weights or {}).items()
+        }
+        self.weights = {}
+        entries = []
+        for issuer, weight in weights.items():
+            card_issuer = CardIssuer.from_string(issuer)
+            if not card_issuer:
+                raise UnknownIssuerError(issuer)
+            if card_issuer in self.weights:
+                raise ValueError(
+                    f"{card_issuer.value} is given more than once."
+                )
+            ranges = card_issuer.bin_ranges
+            inner = bin_weights.pop(card_issuer, [1] * len(ranges))
+            if len(inner) != len(ranges):
+                raise ValueError(
+                    f"Expected {len(ranges)} BIN weights for "
+                    f"{card_issuer.value}. Got: {len(inner)}"
+                )
+            if not all(
+                math.isfinite(w) and w >= 0 for w in [weight, *inner]
+            ) or not sum(inner):
+                raise ValueError(
+                    "Weights must be finite and not negative, and each issuer "
+                    "needs a positive BIN weight."
+                )
+            self.weights[card_issuer] = weight
+            entries.extend(
+                (card_issuer, prefix_range, weight * w / sum(inner))
+                for prefix_range, w in zip(ranges, inner)
+            )
+        if bin_weights:
+            raise ValueError(
+                "BIN weights given for issuers without a weight: "
+                f"{', '.join(issuer.value for issuer in bin_weights)}"
             )
-        prefix = str(random.randint(int(start), int(end)))
+        total = sum(weight for *_, weight in entries)
+        if not 0 < total < math.inf:
+            raise ValueError("At least one issuer needs a positive weight.")
+        # (issuer, BIN range, probability) for every pair that can be drawn
+        self.entries = [
+            (issuer, prefix_range, weight / total)
+            for issuer, prefix_range, weight in entries if weight > 0
+        ]
+        self._build_alias_table([entry[2] for entry in self.entries])
+
+    def _build_alias_table(self, probabilities):
+        size = len(probabilities)
+        scaled = [p * size for p in probabilities]
+        self._accept = [self._SCALE] * size
+        self._alias = list(range(size))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._accept[less] = int(scaled[less] * self._SCALE)
+            self._alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # Anything left over is 1 up to float rounding, so it's always kept
+
+    @classmethod
+    def from_string(cls, value):
+        '''
+        Parse a mix written as "issuer:weight,issuer:weight", like
+        "visa:55,mastercard:25,amex:15,discover:5"
+        '''
+        weights = {}
+        for part in value.split(','):
+            issuer, sep, weight = part.rpartition(':')
+            try:
+                weights[issuer] = float(weight)
+            except ValueError:
+                sep = None
+            if not sep:
+                raise ValueError(
+                    f"Expected 'issuer:weight' pairs separated by commas. "
+                    f"Got: '{part}'"
+                )
+        return cls(weights)
+
+    def sample(self, rng=None):
+        '''
+        A random (CardIssuer, BIN range) pair
+        '''
+        rng = rng or get_entropy_pool()
+        column = rng.randbelow(len(self.entries))
+        if rng.randbelow(self._SCALE) >= self._accept[column]:
+            column = self._alias[column]
+        return self.entries[column][:2]
+
+
+def generate_card_number_from_mix(mix):
+    '''
+    Generate a random card number from an issuer picked by `mix`: an
+    `IssuerMix`, or the issuer weights to build one from
+    '''
+    if not isinstance(mix, IssuerMix):
+        mix = IssuerMix(mix)
+    rng = get_entropy_pool()
+    issuer, prefix_range = mix.sample(rng)
     return generate_card_number(
-        prefix=prefix,
-        num_digits=create_from.num_digits
+        prefix=_pick_prefix(rng, prefix_range),
+        num_digits=issuer.num_digits
+    )
+
+
+class _PrefixRange(namedtuple('_PrefixRange', 'start end width')):
+    '''
+    An inclusive range of equal-length numeric prefixes, held as integers with
+    the width they're zero-padded to
+    '''
+    __slots__ = ()
+
+    @property
+    def size(self):
+        return self.end - self.start + 1
+
+    def format(self, value):
+        return f'{value:0{self.width}d}' if self.width else ''
+
+
+def _prefix_ranges(prefixes):
+    '''
+    Normalize the ways a number space can be given into a list of
+    `_PrefixRange`s: a prefix string, a (start, end) tuple of equal-length
+    prefixes, a CardIssuer (or IssuerRecord), or a list of any of those (like
+    `CardIssuer.bin_ranges`)
+    '''
+    if isinstance(prefixes, (CardIssuer, IssuerRecord)):
+        prefixes = list(prefixes.bin_ranges)
+    if not isinstance(prefixes, list):
+        prefixes = [prefixes]
+
+    ranges = []
+    for prefix in prefixes:
+        if isinstance(prefix, tuple):
+            start, end = (
+                clean_card_number(value, var_name='prefix') for value in prefix
+            )
+            if len(start) != len(end) or start > end:
+                raise ValueError(
+                    "A prefix range must be (start, end) with start <= end and"
+                    f" both the same length. Got: {prefix}"
+                )
+        else:
+            start = end = clean_card_number(prefix, var_name='prefix') \
+                if prefix else ''
+        ranges.append(_PrefixRange(int(start or 0), int(end or 0), len(start)))
+    return ranges
+
+
+def _account_digits(prefix_range, num_digits):
+    '''
+    How many digits sit between a prefix and the check digit
+    '''
+    if num_digits < MIN_LENGTH or num_digits > MAX_LENGTH:
+        raise ValueError(
+            "Invalid length requested. Valid card numbers must be a length"
+            f" between [{MIN_LENGTH}, {MAX_LENGTH}] inclusive."
+        )
+    free = num_digits - prefix_range.width - 1
+    if free < 0:
+        raise ValueError(
+            f"Prefixes must be shorter than the card number. Card number of "
+            f"length {num_digits} requested, but prefix has "
+            f"{prefix_range.width} digits."
+        )
+    return free
+
+
+def count_card_numbers(prefixes='', *, num_digits=16):
+    '''
+    How many numbers of `num_digits` digits pass the Luhn algorithm under the
+    given prefix(es) (see `_prefix_ranges` for the accepted forms).
+
+    Every choice of account digits has exactly one valid check digit, so this
+    is a product of sizes rather than a count of anything.
+    '''
+    return sum(
+        prefix_range.size * 10 ** _account_digits(prefix_range, num_digits)
+        for prefix_range in _prefix_ranges(prefixes)
+    )
+
+
+def unrank_card_number(rank, prefixes='', *, num_digits=16):
+    '''
+    The valid card number at position `rank` (from 0) among those counted by
+    `count_card_numbers`. Within a prefix range numbers are in ascending
+    order, and ranges keep the order they were given in.
+
+    Splitting [0, count) into slices partitions the space exactly, and an
+    unranked uniform random integer is a uniform random valid number.
+    '''
+    if rank < 0:
+        raise ValueError(f"rank must not be negative. Got: {rank}")
+    for prefix_range in _prefix_ranges(prefixes):
+        free = _account_digits(prefix_range, num_digits)
+        size = prefix_range.size * 10 ** free
+        if rank >= size:
+            rank -= size
+            continue
+        offset, account = divmod(rank, 10 ** free)
+        prefix = prefix_range.format(prefix_range.start + offset)
+        account = f'{account:0{free}d}' if free else ''
+        check = _luhn_prefix_state(prefix).extend(account).check_digit()
+        return f'{prefix}{account}{check}'
+    raise ValueError(
+        "rank is past the end of the card numbers under the given prefixes"
+    )
+
+
+def iter_card_numbers(prefixes='', *, num_digits=16, start=0):
+    '''
+    Lazily yield every valid card number counted by `count_card_numbers`, in
+    the same order as `unrank_card_number`, beginning at rank `start`.
+
+    Numbers come in runs of 10 that differ only in their last account digit,
+    so the checksum is only worked out once per run and each check digit in
+    it is a table lookup.
+    '''
+    if start < 0:
+        raise ValueError(f"start must not be negative. Got: {start}")
+    for prefix_range in _prefix_ranges(prefixes):
+        free = _account_digits(prefix_range, num_digits)
+        size = prefix_range.size * 10 ** free
+        if start >= size:
+            start -= size
+            continue
+        offset, account = divmod(start, 10 ** free)
+        start = 0
+        for value in range(prefix_range.start + offset, prefix_range.end + 1):
+            prefix = prefix_range.format(value)
+            yield from _iter_accounts(prefix, free, account)
+            account = 0
+
+
+def _iter_accounts(prefix, free, first):
+    '''
+    The valid numbers under one prefix with `free` account digits, beginning
+    at account number `first`
+    '''
+    prefix_state = _luhn_prefix_state(prefix)
+    if not free:
+        yield f'{prefix}{prefix_state.check_digit()}'
+        return
+    first_run, first_digit = divmod(first, 10)
+    for run in range(first_run, 10 ** (free - 1)):
+        head = f'{run:0{free - 1}d}' if free > 1 else ''
+        checks = _LUHN_NEXT_CHECKS[prefix_state.extend(head).if_last_kept]
+        for digit in range(first_digit, 10):
+            yield f'{prefix}{head}{digit}{checks[digit]}'
+        first_digit = 0
+
+
+def rank_card_number(card_number, prefixes=''):
+    '''
+    The inverse of `unrank_card_number`: the position of a valid card number
+    among the valid numbers of the same length under the given prefix(es).
+    Prefix ranges are expected not to overlap (as with `CardIssuer.bin_ranges`)
+    '''
+    card_number = clean_card_number(card_number)
+    num_digits = len(card_number)
+    if not is_luhn_valid(card_number):
+        raise ValueError(f"{card_number} does not pass the Luhn algorithm.")
+
+    rank = 0
+    for prefix_range in _prefix_ranges(prefixes):
+        free = _account_digits(prefix_range, num_digits)
+        width = prefix_range.width
+        prefix = int(card_number[:width] or 0)
+        if prefix_range.start <= prefix <= prefix_range.end:
+            account = int(card_number[width:-1] or 0)
+            return rank + (prefix - prefix_range.start) * 10 ** free + account
+        rank += prefix_range.size * 10 ** free
+    raise ValueError(f"{card_number} is not under the given prefixes.")
+
+
+class FeistelPermutation:
+    '''
+    A keyed shuffle of the integers [0, size) that can be computed one value
+    at a time: a balanced Feistel network over the smallest even number of
+    bits covering `size`, with blake2b as the round function. Values that
+    land outside the range are fed back in (cycle walking) until they fall
+    inside, which keeps it a bijection on [0, size).
+
+    The same key always gives the same shuffle, and nothing is stored per
+    value, so distinct inputs give distinct outputs at any scale.
+    '''
+
+    def __init__(self, size, key, *, rounds=8):
+        if size < 1:
+            raise ValueError(f"size must be at least 1. Got: {size}")
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        self.size = size
+        self.rounds = rounds
+        self._half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._mask = (1 << self._half_bits) - 1
+        # Derive a fixed-length key so any key length is accepted
+        self._hash = hashlib.blake2b(
+            key=hashlib.blake2b(key, digest_size=32).digest(), digest_size=8
+        )
+
+    def _round(self, number, value):
+        digest = self._hash.copy()
+        digest.update(bytes([number]) + value.to_bytes(8, 'big'))
+        return int.from_bytes(digest.digest(), 'big') & self._mask
+
+    def _encrypt(self, value):
+        left, right = value >> self._half_bits, value & self._mask
+        for number in range(self.rounds):
+            left, right = right, left ^ self._round(number, right)
+        return (left << self._half_bits) | right
+
+    def __call__(self, value):
+        if not 0 <= value < self.size:
+            raise ValueError(
+                f"value must be in [0, {self.size}). Got: {value}"
+            )
+        value = self._encrypt(value)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+def generate_unique_card_numbers(count, prefixes='', *, num_digits=16,
+                                 key=None, offset=0):
+    '''
+    Lazily generate `count` distinct valid card numbers under the given
+    prefix(es) (see `_prefix_ranges`). The numbers at positions
+    [offset, offset + count) of a keyed shuffle of every valid number are
+    returned, so the same key and offset always give the same sequence, and
+    non-overlapping offsets never repeat a number. The arguments are checked
+    right away, before the first number is asked for.
+
+    Without a key, a random one is used: the numbers are still distinct, but
+    can't be regenerated.
+    '''
+    space = count_card_numbers(prefixes, num_digits=num_digits)
+    if count < 0 or offset < 0:
+        raise ValueError("count and offset must not be negative.")
+    if offset + count > space:
+        raise ValueError(
+            f"Only {space} valid card numbers exist under the given prefixes, "
+            f"so {count} unique numbers can't be generated from offset "
+            f"{offset}."
+        )
+    if key is None:
+        key = get_entropy_pool().read(16)
+    permute = FeistelPermutation(space, key)
+    return (
+        unrank_card_number(permute(index), prefixes, num_digits=num_digits)
+        for index in range(offset, offset + count)
     )
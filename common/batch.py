@@ -0,0 +1,335 @@
+"""
+    Vectorized versions of the scalar functions in `common.algorithms`.
+
+    Card numbers are packed into a fixed-width uint8 matrix of digits (or, for
+    alphanumeric check digit algorithms, alphabet values), one row per card
+    number, right-aligned and padded on the left with 0s. Leading 0s don't
+    change a Luhn checksum, so every row can be checked with the same column
+    weights regardless of its length.
+"""
+import numpy as np
+from common.algorithms import _PrefixRange, _account_digits, _prefix_ranges
+from common.check_digits import INVALID_BYTE, get_check_digit_algorithm
+from common.constants import (
+    COMMON_SEPARATORS,
+    MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
+    MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
+)
+from common.entropy import get_entropy_pool
+from common.enums import CardIssuer, CardNumberError
+from common.issuers import IssuerRecord
+
+
+# Byte lookup table so separators are found with one array index
+_IS_SEPARATOR = np.zeros(256, dtype=bool)
+_IS_SEPARATOR[[ord(sep) for sep in COMMON_SEPARATORS]] = True
+
+
+def _pack(card_numbers):
+    '''
+    Pack the inputs into a left-aligned, 0-padded uint8 matrix of characters
+    along with each row's raw length and a mask of rows that weren't strings
+    '''
+    card_numbers = list(card_numbers)
+    not_str = np.zeros(len(card_numbers), dtype=bool)
+    # Checking the set of types keeps the common all-`str` case out of a loop
+    if set(map(type, card_numbers)) - {str}:
+        not_str[:] = [not isinstance(value, str) for value in card_numbers]
+        card_numbers = [
+            '' if bad else value for value, bad in zip(card_numbers, not_str)
+        ]
+    raw_lengths = np.fromiter(
+        map(len, card_numbers), dtype=np.intp, count=len(card_numbers)
+    )
+
+    width = max(1, int(raw_lengths.max())) if card_numbers else 1
+    code_points = np.array(card_numbers, dtype=f'U{width}').view(np.uint32)
+    # Anything past 255 can't be a digit or a separator, and neither can 255
+    packed = np.minimum(code_points, 255).astype(np.uint8)
+    return packed.reshape(len(card_numbers), width), raw_lengths, not_str
+
+
+def clean_many(card_numbers, *, algorithm=None):
+    '''
+    Batch version of `clean_card_number`. Takes a sequence of card number
+    strings and returns a tuple of:
+        digits  - (N, width) uint8 matrix of digit values, right-aligned
+        lengths - the number of digits in each row
+        errors  - a `CardNumberError` code per row (0 for rows that cleaned)
+    Rows with an error have no digits and a length of 0.
+
+    Passing a check digit `algorithm` accepts its alphabet instead of digits.
+    '''
+    check_digits = get_check_digit_algorithm(algorithm)
+    packed, raw_lengths, not_str = _pack(card_numbers)
+    rows, width = packed.shape
+
+    # Anything after a row's real length is padding added by the packing. Nulls
+    # inside the string are still counted so they get rejected like the scalar
+    in_string = np.arange(width) < raw_lengths[:, None]
+    values = check_digits.byte_values[packed]
+    is_digit = (values != INVALID_BYTE) & in_string
+    is_invalid = in_string & ~is_digit & ~_IS_SEPARATOR[packed]
+
+    lengths = is_digit.sum(axis=1)
+    errors = np.full(rows, CardNumberError.NONE, dtype=np.int8)
+    errors[lengths == 0] = CardNumberError.NO_DIGITS
+    errors[is_invalid.any(axis=1)] = CardNumberError.INVALID_CHARACTERS
+    errors[not_str] = CardNumberError.NOT_A_STRING
+
+    is_digit &= (errors == CardNumberError.NONE)[:, None]
+    lengths[errors != CardNumberError.NONE] = 0
+
+    if is_digit.all():
+        # Already-clean numbers of one length need no realigning
+        return values, lengths, errors
+
+    # Right-align: a stable sort on "is a digit" moves every digit to the end
+    # of its row without changing their order, and leaves zeros in front
+    values[~is_digit] = 0
+    order = np.argsort(is_digit, axis=1, kind='stable')
+    out_width = max(1, int(lengths.max())) if rows else 1
+    digits = np.take_along_axis(values, order[:, width - out_width:], axis=1)
+    return digits, lengths, errors
+
+
+def luhn_check_many(card_numbers, *, algorithm=None):
+    '''
+    Batch version of `luhn_check`. Returns a tuple of a boolean array of which
+    rows passed the Luhn algorithm (or the given check digit `algorithm`) and
+    the per-row `CardNumberError` codes. Rows with an error never pass.
+    '''
+    check_digits = get_check_digit_algorithm(algorithm)
+    values, lengths, errors = clean_many(card_numbers, algorithm=check_digits)
+    valid = check_digits.is_valid_many(values, lengths)
+    return valid & (errors == CardNumberError.NONE), errors
+
+
+def _prefix_digits(values, width):
+    '''
+    Split integer prefixes into a (N, width) matrix of their digits
+    '''
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    return (values[:, None] // powers % 10).astype(np.uint8)
+
+
+def generate_many(count, prefixes='', *, num_digits=None, algorithm=None,
+                  rng=None, as_bytes=False):
+    '''
+    Batch version of `generate_card_number`. Returns an array of `count`
+    random card numbers (as strings) that pass the Luhn algorithm, or the
+    given check digit `algorithm`.
+
+    `prefixes` takes the same forms as `common.algorithms.count_card_numbers`
+    (a prefix, a (start, end) range, a CardIssuer or a list of them). Like
+    `generate_card_number_from_issuer`, each number picks one of the ranges
+    and then a prefix inside it. `num_digits` is either one length or a length
+    per number, and defaults to the issuer's length (or 16). With an
+    alphanumeric `algorithm`, a single prefix may use its whole alphabet, as
+    in `generate_card_number`. `rng` is a numpy
+    Generator or a seed for one, and is otherwise seeded from the thread's
+    entropy pool. `as_bytes` returns ASCII bytes instead, skipping the
+    conversion to str when the numbers are only going to be written out.
+    '''
+    if num_digits is None:
+        is_issuer = isinstance(prefixes, (CardIssuer, IssuerRecord))
+        num_digits = prefixes.num_digits if is_issuer else 16
+    check_digits = get_check_digit_algorithm(algorithm)
+    if rng is None:
+        rng = int.from_bytes(get_entropy_pool().read(16), 'big')
+    rng = np.random.default_rng(rng)
+    literal = None
+    if prefixes and isinstance(prefixes, str) and not check_digits.is_numeric:
+        # Written into every row as it is, since letters can't be drawn from
+        # a numeric range
+        literal = check_digits.byte_values[np.frombuffer(
+            check_digits.clean(prefixes, var_name='prefix').encode('ascii'),
+            dtype=np.uint8
+        )]
+        ranges = [_PrefixRange(0, 0, len(literal))]
+    else:
+        ranges = _prefix_ranges(prefixes)
+
+    lengths = np.broadcast_to(np.asarray(num_digits, dtype=np.intp), (count,))
+    for length in np.unique(lengths).tolist():
+        for prefix_range in ranges:
+            _account_digits(prefix_range, length)
+    width = int(lengths.max()) if count else 1
+
+    # Every payload is right-aligned in one matrix of random values, so the
+    # check values come from one batch checksum over the whole matrix
+    payload = rng.integers(
+        len(check_digits.alphabet), size=(count, width - 1), dtype=np.uint8
+    )
+    payload[np.arange(width - 1)[None, :] < (width - lengths)[:, None]] = 0
+
+    picks = rng.integers(len(ranges), size=count)
+    for index, prefix_range in enumerate(ranges):
+        if not prefix_range.width:
+            continue
+        rows = np.flatnonzero(picks == index)
+        columns = (width - lengths[rows])[:, None] \
+            + np.arange(prefix_range.width)[None, :]
+        if literal is not None:
+            payload[rows[:, None], columns] = literal
+            continue
+        values = rng.integers(
+            prefix_range.start, prefix_range.end, size=len(rows),
+            dtype=np.int64, endpoint=True
+        )
+        payload[rows[:, None], columns] = _prefix_digits(
+            values, prefix_range.width
+        )
+
+    checks = check_digits.check_values_many(payload, lengths - 1)
+    values = np.concatenate([payload, checks[:, None]], axis=1)
+
+    # Map values to their characters' bytes and read each row as one string
+    chars = np.frombuffer(check_digits.alphabet.encode(), dtype=np.uint8)
+    encoded = np.ascontiguousarray(chars[values])
+    kind = 'S' if as_bytes else 'U'
+    if count and (lengths == width).all():
+        return encoded.view(f'S{width}').ravel().astype(f'{kind}{width}')
+    numbers = np.empty(count, dtype=f'{kind}{width}')
+    for length in np.unique(lengths).tolist():
+        rows = np.flatnonzero(lengths == length)
+        numbers[rows] = np.ascontiguousarray(
+            encoded[rows, width - length:]
+        ).view(f'S{length}').ravel()
+    return numbers
+
+
+def generate_many_from_mix(count, mix, *, rng=None, as_bytes=False):
+    '''
+    Batch version of `generate_card_number_from_mix`. How many numbers each
+    (issuer, BIN range) pair of the `IssuerMix` gets is drawn in one go, each
+    pair's numbers are made with `generate_many`, and the result is shuffled
+    '''
+    if rng is None:
+        rng = int.from_bytes(get_entropy_pool().read(16), 'big')
+    rng = np.random.default_rng(rng)
+    probabilities = [probability for *_, probability in mix.entries]
+    counts = rng.multinomial(count, probabilities)
+    empty = np.empty(0, dtype='S1' if as_bytes else 'U1')
+    numbers = np.concatenate([empty] + [
+        generate_many(
+            entry_count, [prefix_range], num_digits=issuer.num_digits,
+            rng=rng, as_bytes=as_bytes
+        )
+        for (issuer, prefix_range, _), entry_count in zip(mix.entries, counts)
+        if entry_count
+    ])
+    rng.shuffle(numbers)
+    return numbers
+
+
+_NEWLINE = ord('\n')
+_CARRIAGE_RETURN = ord('\r')
+_IS_DIGIT_BYTE = np.zeros(256, dtype=bool)
+_IS_DIGIT_BYTE[ord('0'):ord('9') + 1] = True
+# Bytes that may appear on a line: digits, separators and the newline. A \r
+# is only allowed right before the newline (or the end of the data)
+_IS_LINE_BYTE = _IS_DIGIT_BYTE | _IS_SEPARATOR
+_IS_LINE_BYTE[_NEWLINE] = True
+# Powers of 10 indexed by exponent, covering every digit of a card number
+_POW10 = 10 ** np.arange(MAX_LENGTH + 1, dtype=np.uint64)
+
+
+# Bytes `luhn_check_lines` works on at once, which bounds its temporary arrays
+LINES_BLOCK_SIZE = 1 << 22
+
+
+def _check_lines(buffer):
+    '''
+    `luhn_check_lines` over one buffer of whole lines (only the last may lack
+    its newline), read in place
+    '''
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    ends = np.flatnonzero(data == _NEWLINE)
+    if data[-1] != _NEWLINE:
+        ends = np.append(ends, len(data) - 1)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    rows = len(ends)
+
+    is_digit = _IS_DIGIT_BYTE[data]
+    digit_counts = np.add.reduceat(is_digit, starts, dtype=np.intp)
+    errors = np.full(rows, CardNumberError.NONE, dtype=np.int8)
+    errors[digit_counts == 0] = CardNumberError.NO_DIGITS
+    invalid_bytes = np.flatnonzero(~_IS_LINE_BYTE[data])
+    if len(invalid_bytes):
+        last = invalid_bytes == len(data) - 1
+        following = data[np.where(last, invalid_bytes, invalid_bytes + 1)]
+        line_ending = (data[invalid_bytes] == _CARRIAGE_RETURN) \
+            & (last | (following == _NEWLINE))
+        invalid_bytes = invalid_bytes[~line_ending]
+    errors[np.searchsorted(ends, invalid_bytes)] = (
+        CardNumberError.INVALID_CHARACTERS
+    )
+    lengths = np.where(errors == CardNumberError.NONE, digit_counts, 0)
+
+    # Scatter each line's digits into the right-aligned matrix used by the
+    # rest of this module. Lines too long for it are left empty but keep
+    # their length, so they're never valid
+    kept = np.where(lengths <= MAX_LENGTH, lengths, 0)
+    digits = data[is_digit] - ord('0')
+    if (kept != digit_counts).any():
+        digits = digits[np.repeat(kept == digit_counts, digit_counts)]
+    line_ends = np.cumsum(kept)
+    positions = np.repeat(
+        np.arange(rows) * MAX_LENGTH + MAX_LENGTH - 1 - line_ends, kept
+    ) + np.arange(1, len(digits) + 1)
+    matrix = np.zeros((rows, MAX_LENGTH), dtype=np.uint8)
+    matrix.ravel()[positions] = digits
+
+    valid = (
+        get_check_digit_algorithm(None).is_valid_many(matrix, kept)
+        & (lengths >= MIN_LENGTH) & (lengths <= MAX_LENGTH)
+    )
+    values = matrix.astype(np.uint64) @ _POW10[MAX_LENGTH - 1::-1]
+    return valid, values, lengths, errors
+
+
+def luhn_check_lines(data, *, block_size=LINES_BLOCK_SIZE):
+    '''
+    Validate newline-delimited ASCII card numbers without decoding them or
+    making an object per line. `data` is a bytes-like object (bytes,
+    memoryview, mmap, ...) or an iterable of them that may split lines
+    anywhere, and is read in place `block_size` bytes at a time.
+
+    Yields, per run of lines, a tuple of:
+        valid   - whether each line passes Luhn and has a valid length
+        values  - each line's digits as a uint64 (0 past 19 digits)
+        lengths - the number of digits on each line
+        errors  - a `CardNumberError` code per line
+    Lines with an error have a length of 0.
+    '''
+    # The pieces of a line straddling blocks, the only bytes that are copied
+    tail = []
+    for block in _split_blocks(data, block_size):
+        newlines = np.flatnonzero(
+            np.frombuffer(block, dtype=np.uint8) == _NEWLINE
+        )
+        if not len(newlines):
+            tail.append(bytes(block))
+            continue
+        first, last = newlines[0] + 1, newlines[-1] + 1
+        if tail:
+            yield _check_lines(b''.join(tail) + block[:first])
+        else:
+            first = 0
+        if last > first:
+            yield _check_lines(block[first:last])
+        tail = [bytes(block[last:])] if last < len(block) else []
+    if tail:
+        yield _check_lines(b''.join(tail))
+
+
+def _split_blocks(data, block_size):
+    try:
+        data = [memoryview(data)]
+    except TypeError:
+        pass
+    for block in data:
+        block = memoryview(block).cast('B')
+        for start in range(0, len(block), block_size):
+            yield block[start:start + block_size]
@@ -0,0 +1,201 @@
+"""
+    A compiled index of issuer BIN ranges.
+
+    Every range is broken down into the fewest digit prefixes that cover it,
+    and the prefixes go into a trie, so finding a number's issuer walks at
+    most MAX_IIN_LENGTH nodes however many issuers there are. The longest
+    matching prefix wins, so a co-branded or narrower range takes precedence
+    over the network range it sits in.
+
+    For numpy lookups the same prefixes are flattened into disjoint intervals
+    over a number's first MAX_IIN_LENGTH digits, searched with `searchsorted`.
+"""
+import numpy as np
+from common.constants import MAX_IIN_LENGTH
+
+
+_DIGITS = {digit: value for value, digit in enumerate('0123456789')}
+
+
+def split_bin_range(bin_range):
+    '''
+    The (start, end) of a `CardIssuer.bin_ranges` entry, checked to be a
+    range of same-length digit strings of at most MAX_IIN_LENGTH digits
+    '''
+    start, end = (
+        (bin_range, bin_range) if isinstance(bin_range, str) else bin_range
+    )
+    if (
+        len(start) != len(end) or len(start) > MAX_IIN_LENGTH
+        or not (start + end).isdigit() or start > end
+    ):
+        raise ValueError(
+            f"BIN ranges must be a prefix or a (start, end) pair of up to "
+            f"{MAX_IIN_LENGTH} digits each. Got: {bin_range!r}"
+        )
+    return start, end
+
+
+def range_prefixes(start, end):
+    '''
+    The fewest prefixes that together match exactly the numbers starting with
+    anything from `start` to `end`, e.g. ('2221', '2720') -> '2221', ...,
+    '2229', '223', ..., '229', '23', ..., '26', '270', '271', '2720'
+    '''
+    width = len(start)
+    low, high = int(start), int(end)
+    prefixes = []
+    while low <= high:
+        # Widen the block starting at `low` while it stays aligned and in range
+        size = 0
+        while (
+            size < width and low % 10 ** (size + 1) == 0
+            and low + 10 ** (size + 1) - 1 <= high
+        ):
+            size += 1
+        prefix = str(low // 10 ** size).zfill(width - size)
+        prefixes.append(prefix if size < width else '')
+        low += 10 ** size
+    return prefixes
+
+
+class BinIndex:
+    '''
+    Longest-prefix lookup of the issuer a card number belongs to, compiled
+    from (issuer, BIN range) entries. Where two entries have the same prefix,
+    the first one added wins
+    '''
+
+    def __init__(self, entries=()):
+        self.issuers = []
+        # Node n's child for digit d is at 10 * n + d, with 0 meaning no child
+        # (the root, node 0, is never anyone's child)
+        self._children = [0] * 10
+        # The indexes into `issuers` of the prefixes ending at each node
+        self._matches = [()]
+        codes = {}
+        for issuer, bin_range in entries:
+            if issuer not in codes:
+                codes[issuer] = len(self.issuers)
+                self.issuers.append(issuer)
+            for prefix in range_prefixes(*split_bin_range(bin_range)):
+                self._add(prefix, codes[issuer])
+        self.bounds, self.owners = self._intervals()
+
+    @classmethod
+    def from_issuers(cls, issuers):
+        '''
+        An index of every range in each CardIssuer's `bin_ranges`
+        '''
+        return cls(
+            (issuer, bin_range)
+            for issuer in issuers for bin_range in issuer.bin_ranges
+        )
+
+    def _add(self, prefix, code):
+        node = 0
+        for digit in prefix:
+            slot = 10 * node + _DIGITS[digit]
+            if not self._children[slot]:
+                self._children[slot] = len(self._matches)
+                self._children.extend([0] * 10)
+                self._matches.append(())
+            node = self._children[slot]
+        if code not in self._matches[node]:
+            self._matches[node] += (code,)
+
+    def _walk(self, card_number):
+        '''
+        The matches of every node on `card_number`'s path, shortest first
+        '''
+        children, matches = self._children, self._matches
+        node = 0
+        yield matches[0]
+        for char in card_number[:MAX_IIN_LENGTH]:
+            digit = _DIGITS.get(char)
+            if digit is None:
+                return
+            node = children[10 * node + digit]
+            if not node:
+                return
+            yield matches[node]
+
+    def lookup_code(self, card_number):
+        '''
+        `lookup`, but as an index into `issuers` (-1 when there's no match)
+        '''
+        # The hot path of `PaymentCardNumber.issuer`, so `_walk` is inlined
+        children, matches = self._children, self._matches
+        node = 0
+        found = matches[0][0] if matches[0] else -1
+        for char in card_number[:MAX_IIN_LENGTH]:
+            digit = _DIGITS.get(char)
+            if digit is None:
+                break
+            node = children[10 * node + digit]
+            if not node:
+                break
+            if matches[node]:
+                found = matches[node][0]
+        return found
+
+    def lookup(self, card_number):
+        '''
+        The issuer with the longest BIN prefix matching `card_number`, or None
+        '''
+        code = self.lookup_code(card_number)
+        return None if code < 0 else self.issuers[code]
+
+    def lookup_all(self, card_number):
+        '''
+        Every issuer with a BIN range containing `card_number`, from the
+        longest matching prefix to the shortest
+        '''
+        found = []
+        for codes in self._walk(card_number):
+            found[:0] = [code for code in codes if code not in found]
+        return [self.issuers[code] for code in found]
+
+    def _intervals(self):
+        '''
+        The index flattened into sorted interval start `bounds` over the first
+        MAX_IIN_LENGTH digits, and the `owners` (index into `issuers`, or -1)
+        of each interval
+        '''
+        bounds = {0}
+        stack = [(0, '')]
+        while stack:
+            node, prefix = stack.pop()
+            if self._matches[node]:
+                scale = 10 ** (MAX_IIN_LENGTH - len(prefix))
+                start = int(prefix or 0) * scale
+                bounds.update([start, start + scale])
+            for digit in range(10):
+                child = self._children[10 * node + digit]
+                if child:
+                    stack.append((child, prefix + str(digit)))
+        bounds.discard(10 ** MAX_IIN_LENGTH)
+        bounds = sorted(bounds)
+
+        owners = [
+            self.lookup_code(str(start).zfill(MAX_IIN_LENGTH))
+            for start in bounds
+        ]
+        # Neighbouring intervals with the same owner are merged
+        keep = [0] + [
+            i for i in range(1, len(bounds)) if owners[i] != owners[i - 1]
+        ]
+        return (
+            np.array([bounds[i] for i in keep], dtype=np.uint64),
+            np.array([owners[i] for i in keep], dtype=np.int32),
+        )
+
+    def lookup_many(self, leading):
+        '''
+        Vectorized `lookup` of the first MAX_IIN_LENGTH digits of many numbers
+        (as integers). Returns each one's index into `issuers`, or -1
+        '''
+        leading = np.asarray(leading, dtype=np.uint64)
+        return self.owners[
+            np.searchsorted(self.bounds, leading, side='right') - 1
+        ]
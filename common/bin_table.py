@@ -0,0 +1,355 @@
+"""
+    A compiled table of BIN ranges, read straight out of a memory-mapped file.
+
+    `manage.py compile_bin_table` flattens a CSV of (possibly overlapping) BIN
+    ranges into disjoint intervals over the first MAX_IIN_LENGTH digits and
+    writes them sorted, one column after another. Opening the file maps it
+    rather than parsing it, so every worker process shares the same
+    page-cache copy and a lookup is a binary search over the `starts` column.
+
+    File layout (little-endian):
+        header   - magic, interval count, size of the names block
+        starts   - uint32 per interval, the first 8-digit IIN it covers
+        ends     - uint32 per interval, one past the last 8-digit IIN
+        issuers  - uint16 per interval, index into the names
+        networks - uint16 per interval, index into the names
+        lengths  - uint32 per interval, bit n set if n digits are allowed
+        country  - 2 ASCII bytes per interval (ISO 3166-1 alpha-2, or blank)
+        names    - UTF-8 issuer and network names, one per line
+
+    Recompiling replaces the file rather than rewriting it, and
+    `reload_bin_table` (run by a watcher thread or a signal) opens the new
+    one alongside the old and swaps it in, so lookups never wait on a reload.
+"""
+import logging
+import mmap
+import os
+import signal
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+import numpy as np
+from common.bin_index import BinIndex
+from common.constants import MAX_IIN_LENGTH
+
+
+MAGIC = b'BINTABL1'
+_HEADER = struct.Struct('<8sII')
+
+# (dtype, name) of each column, in file order
+_COLUMNS = [
+    ('<u4', 'starts'),
+    ('<u4', 'ends'),
+    ('<u2', 'issuer_ids'),
+    ('<u2', 'network_ids'),
+    ('<u4', 'length_masks'),
+    ('S2', 'countries'),
+]
+
+# memoryview formats reading the integer columns one value at a time
+_SCALAR_FORMATS = {'<u4': 'I', '<u2': 'H'}
+
+_IIN_SPACE = 10 ** MAX_IIN_LENGTH
+
+# Seconds between attempts to open a configured table that couldn't be read
+OPEN_RETRY_INTERVAL = 10
+
+logger = logging.getLogger(__name__)
+
+
+class BinRecord(namedtuple('BinRecord', 'issuer network lengths country')):
+    '''
+    What the table knows about a BIN range. `lengths` is a tuple of the
+    allowed card number lengths (empty if any length is), `network` and
+    `country` may be empty strings
+    '''
+    __slots__ = ()
+
+
+def _lengths_mask(lengths):
+    mask = 0
+    for length in lengths:
+        mask |= 1 << length
+    return mask
+
+
+def write_bin_table(entries, file):
+    '''
+    Compile (bin_range, BinRecord) pairs into the binary format and write it
+    to a binary `file`. Where ranges overlap the longest prefix wins, then the
+    earliest entry, as in `BinIndex`. Returns the number of intervals written
+    '''
+    entries = list(entries)
+    index = BinIndex(
+        (position, bin_range)
+        for position, (bin_range, _) in enumerate(entries)
+    )
+    owned = index.owners >= 0
+    starts = index.bounds[owned]
+    ends = np.append(index.bounds[1:], _IIN_SPACE)[owned]
+    records = [entries[index.issuers[code]][1] for code in index.owners[owned]]
+
+    names = {}
+    for record in records:
+        for name in (record.issuer, record.network):
+            names.setdefault(name, len(names))
+    if len(names) > 1 << 16:
+        raise ValueError("A BIN table can't have more than 65536 names.")
+    if any('\n' in name for name in names):
+        raise ValueError("Issuer and network names can't contain newlines.")
+    names_block = '\n'.join(names).encode('utf-8')
+
+    columns = {
+        'starts': starts,
+        'ends': ends,
+        'issuer_ids': [names[record.issuer] for record in records],
+        'network_ids': [names[record.network] for record in records],
+        'length_masks': [_lengths_mask(record.lengths) for record in records],
+        'countries': [
+            record.country.encode('ascii').ljust(2) for record in records
+        ],
+    }
+    file.write(_HEADER.pack(MAGIC, len(records), len(names_block)))
+    for dtype, name in _COLUMNS:
+        file.write(np.asarray(columns[name], dtype=dtype).tobytes())
+    file.write(names_block)
+    return len(records)
+
+
+class BinTable:
+    '''
+    A file written by `write_bin_table`, mapped read-only. The columns are
+    numpy arrays over the mapping, so nothing is copied onto the heap but the
+    names
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # Which file this is, to tell when the path points at a new one
+            self.file_key = _file_key(os.fstat(file.fileno()))
+        magic, count, names_size = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} isn't a compiled BIN table.")
+        offset = _HEADER.size
+        for dtype, name in _COLUMNS:
+            column = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=offset
+            )
+            setattr(self, name, column)
+            # Indexing a memoryview is much quicker than a numpy array for one
+            # value at a time, but it reads in the host's byte order
+            scalar_format = _SCALAR_FORMATS.get(dtype)
+            if scalar_format and sys.byteorder == 'little':
+                view = memoryview(self._mmap)[offset:offset + column.nbytes]
+                setattr(self, f'_{name}', view.cast(scalar_format))
+            elif scalar_format:
+                setattr(self, f'_{name}', column.tolist())
+            offset += column.nbytes
+        names = self._mmap[offset:offset + names_size].decode('utf-8')
+        self.names = names.split('\n') if names else []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def record(self, position):
+        mask = self._length_masks[position]
+        return BinRecord(
+            self.names[self._issuer_ids[position]],
+            self.names[self._network_ids[position]],
+            tuple(n for n in range(mask.bit_length()) if mask >> n & 1),
+            self.countries[position].decode('ascii').strip(),
+        )
+
+    def issuer_of(self, card_number, length=None):
+        '''
+        Just the issuer name from `lookup`, without building the record. None
+        if the range doesn't allow the number's length (`length`, for when
+        `card_number` is only its leading digits)
+        '''
+        position = self.find(card_number)
+        if position < 0:
+            return None
+        mask = self._length_masks[position]
+        if length is None:
+            length = len(card_number)
+        if mask and not mask >> length & 1:
+            return None
+        return self.names[self._issuer_ids[position]]
+
+    def find(self, card_number):
+        '''
+        The position of the interval holding `card_number`, or -1. A number
+        shorter than MAX_IIN_LENGTH digits only matches when every number
+        starting with it would
+        '''
+        digits = card_number[:MAX_IIN_LENGTH]
+        if not digits.isdigit():
+            return -1
+        scale = 10 ** (MAX_IIN_LENGTH - len(digits))
+        low = int(digits) * scale
+        position = bisect_right(self._starts, low) - 1
+        if position < 0 or self._ends[position] < low + scale:
+            return -1
+        return position
+
+    def lookup(self, card_number):
+        '''
+        The BinRecord of the range holding `card_number`, or None
+        '''
+        position = self.find(card_number)
+        return None if position < 0 else self.record(position)
+
+    def find_many(self, leading):
+        '''
+        Vectorized `find` for the first MAX_IIN_LENGTH digits of many numbers
+        (as integers)
+        '''
+        leading = np.asarray(leading, dtype=np.uint64)
+        if not len(self):
+            return np.full(leading.shape, -1, dtype=np.intp)
+        positions = np.searchsorted(self.starts, leading, side='right') - 1
+        found = (positions >= 0) & (self.ends[positions] > leading)
+        return np.where(found, positions, -1)
+
+
+def _file_key(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _BinTableState(namedtuple('_BinTableState', 'path table')):
+    __slots__ = ()
+
+
+# The configured path and the BinTable snapshot opened from it. Lookups read
+# this one reference without locking; reloads build a new BinTable and then
+# replace the whole state in a single assignment, so a lookup only ever sees
+# a complete table, old or new
+_state = _BinTableState(None, None)
+
+# Only taken by writers, so two reloads don't open the same file twice
+_reload_lock = threading.Lock()
+
+_watch_interval = None
+# When (on the monotonic clock) lookups may next try to open a table that
+# failed to open
+_retry_at = 0
+# Bumped by every configure_bin_table, which retires the watchers before it
+_generation = 0
+# The (pid, generation) the running watcher thread belongs to
+_watcher = None
+
+
+def configure_bin_table(path, *, reload_interval=None):
+    '''
+    Resolve issuers against the compiled BIN table at `path` (or stop, with
+    None). The file is opened on first use. With a `reload_interval` (in
+    seconds), a background thread checks that often whether the file was
+    replaced and swaps the new one in
+    '''
+    global _state, _watch_interval, _retry_at, _generation
+    with _reload_lock:
+        _state = _BinTableState(os.fspath(path) if path else None, None)
+        _watch_interval = reload_interval if path else None
+        _retry_at = 0
+        _generation += 1
+
+
+def get_bin_table():
+    '''
+    The current BinTable snapshot, or None if there isn't one. Callers should
+    use the table they got for the whole of a lookup. A file that can't be
+    opened is logged and treated as no table, and tried again every
+    OPEN_RETRY_INTERVAL seconds (or by the watcher)
+    '''
+    global _retry_at
+    state = _state
+    if _watch_interval and _watcher != (os.getpid(), _generation):
+        # First use, or a forked worker that didn't inherit the thread
+        _start_watcher()
+    if state.table is None and state.path and time.monotonic() >= _retry_at:
+        try:
+            reload_bin_table()
+        except Exception:
+            _retry_at = time.monotonic() + OPEN_RETRY_INTERVAL
+            logger.exception(
+                "Couldn't open the BIN table at %s, using the built-in "
+                "ranges", state.path
+            )
+        state = _state
+    return state.table
+
+
+def reload_bin_table(*, force=False):
+    '''
+    Open the configured file again if it isn't the one the current snapshot
+    was read from (or always, with `force`) and swap the new snapshot in.
+    Lookups carry on with the old one while the new one is opened. Returns
+    whether the table was replaced
+    '''
+    global _state
+    with _reload_lock:
+        state = _state
+        if not state.path:
+            return False
+        if state.table is not None and not force:
+            try:
+                key = _file_key(os.stat(state.path))
+            except FileNotFoundError:
+                # Mid-replace, or removed; keep the table that's in use
+                return False
+            if key == state.table.file_key:
+                return False
+        _state = _BinTableState(state.path, BinTable(state.path))
+    return True
+
+
+def _reload_logging_errors():
+    try:
+        if reload_bin_table():
+            logger.info("Reloaded the BIN table from %s", _state.path)
+    except Exception:
+        logger.exception("Couldn't reload the BIN table, keeping the old one")
+
+
+def _watch(interval, generation):
+    while generation == _generation:
+        time.sleep(interval)
+        if generation == _generation:
+            _reload_logging_errors()
+
+
+def _start_watcher():
+    global _watcher
+    with _reload_lock:
+        owner = (os.getpid(), _generation)
+        if _watcher == owner:
+            return
+        _watcher = owner
+        interval = _watch_interval
+    threading.Thread(
+        target=_watch, args=(interval, owner[1]), name='bin-table-watcher',
+        daemon=True,
+    ).start()
+
+
+def install_reload_signal(signum):
+    '''
+    Reload the BIN table whenever the process receives `signum` (a number or
+    a name like 'SIGHUP'). Must be called from the main thread
+    '''
+    if isinstance(signum, str):
+        signum = getattr(signal, signum)
+
+    def _handle(signum, frame):
+        # Handlers run on the main thread between bytecodes, so the table is
+        # opened on another one instead of holding up a request
+        threading.Thread(
+            target=_reload_logging_errors, name='bin-table-reload',
+            daemon=True,
+        ).start()
+    signal.signal(signum, _handle)
@@ -0,0 +1,301 @@
+"""
+    A blocklist of card numbers (known test, compromised or retired PANs),
+    checked straight out of a memory-mapped file.
+
+    `manage.py compile_blocklist` packs every number as its digits read as a
+    uint64 plus its digit count (like `CardNumberArray`) and writes them
+    sorted, along with a blocked Bloom filter over them, to one file.
+
+    Each number hashes to one 512-bit block of the filter and sets
+    `num_hashes` bits inside it, so a lookup reads a single cache line (and
+    page) of the filter. The filter answers "not blocked" for almost every
+    number; a hit is confirmed by a binary search over the sorted values, so
+    its false positives never show. The file is mapped rather than read, so
+    every worker process shares the page-cache copy and none of them holds
+    the list on its heap.
+
+    File layout (little-endian):
+        header  - magic, number count, block count, hash count, padded to 64
+                  bytes
+        blocks  - the filter, 8 uint64 words per block
+        values  - uint64 per number, sorted
+        lengths - uint8 per number
+    The filter and the numbers are in one file, so replacing it swaps both at
+    once.
+"""
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+import numpy as np
+from common.constants import (
+    MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
+)
+
+
+MAGIC = b'BLKLIST1'
+_HEADER = struct.Struct('<8sQQI36x')
+
+# Bits in each block of the filter, and uint64 words in each block
+_BLOCK_BITS = 512
+_BLOCK_WORDS = _BLOCK_BITS // 64
+
+DEFAULT_BITS_PER_NUMBER = 12
+
+_MASK = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX_1 = 0xBF58476D1CE4E5B9
+_MIX_2 = 0x94D049BB133111EB
+
+# Seconds between attempts to open a configured blocklist that couldn't be
+# read
+OPEN_RETRY_INTERVAL = 10
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value, length):
+    '''
+    A 64-bit hash of a packed number (splitmix64's finalizer)
+    '''
+    x = (value + length * _GOLDEN) & _MASK
+    x = ((x ^ (x >> 30)) * _MIX_1) & _MASK
+    x = ((x ^ (x >> 27)) * _MIX_2) & _MASK
+    return x ^ (x >> 31)
+
+
+def _hash_many(values, lengths):
+    '''
+    Vectorized `_hash`. uint64 arithmetic wraps, so no masking is needed
+    '''
+    with np.errstate(over='ignore'):
+        x = values.astype(np.uint64) \
+            + lengths.astype(np.uint64) * np.uint64(_GOLDEN)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(_MIX_1)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(_MIX_2)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bloom_words(hashes, num_blocks, num_hashes):
+    '''
+    For each hash, the index of the filter word and the bit in it for each
+    of the `num_hashes` probes, as two (len(hashes), num_hashes) arrays
+    '''
+    # The top half picks the block (multiply-shift, so without modulo bias),
+    # the bottom half the bits in it by double hashing. The step is odd, so
+    # the probes hit distinct bits
+    blocks = ((hashes >> np.uint64(32)) * np.uint64(num_blocks)) \
+        >> np.uint64(32)
+    start = hashes & np.uint64(_BLOCK_BITS - 1)
+    step = ((hashes >> np.uint64(9)) & np.uint64(_BLOCK_BITS - 1)) \
+        | np.uint64(1)
+    probes = np.arange(num_hashes, dtype=np.uint64)
+    bits = (start[:, None] + probes[None, :] * step[:, None]) \
+        & np.uint64(_BLOCK_BITS - 1)
+    words = blocks[:, None] * np.uint64(_BLOCK_WORDS) + (bits >> np.uint64(6))
+    return words.astype(np.intp), bits & np.uint64(63)
+
+
+def write_blocklist(values, lengths, file, *,
+                    bits_per_number=DEFAULT_BITS_PER_NUMBER):
+    '''
+    Write the numbers (as `CardNumberArray` columns) and their filter to a
+    binary `file`. Duplicates are dropped. Returns how many distinct numbers
+    were written
+    '''
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.asarray(lengths, dtype=np.uint8)
+    order = np.lexsort((lengths, values))
+    values, lengths = values[order], lengths[order]
+    if len(values):
+        distinct = np.ones(len(values), dtype=bool)
+        distinct[1:] = (values[1:] != values[:-1]) \
+            | (lengths[1:] != lengths[:-1])
+        values, lengths = values[distinct], lengths[distinct]
+    count = len(values)
+
+    num_blocks = max(1, -(-count * bits_per_number // _BLOCK_BITS))
+    # The number of hashes that minimizes false positives for this size
+    num_hashes = max(1, min(16, round(bits_per_number * 0.6931)))
+    filter_words = np.zeros(num_blocks * _BLOCK_WORDS, dtype='<u8')
+    for start in range(0, count, 1 << 20):
+        chunk = slice(start, start + (1 << 20))
+        words, bits = _bloom_words(
+            _hash_many(values[chunk], lengths[chunk]), num_blocks, num_hashes
+        )
+        words, masks = words.ravel(), np.uint64(1) << bits.ravel()
+        # OR together the masks landing on the same word, then set them all
+        order = np.argsort(words, kind='stable')
+        words, masks = words[order], masks[order]
+        firsts = np.flatnonzero(np.diff(words, prepend=-1))
+        filter_words[words[firsts]] |= np.bitwise_or.reduceat(masks, firsts)
+
+    file.write(_HEADER.pack(MAGIC, count, num_blocks, num_hashes))
+    file.write(filter_words.tobytes())
+    file.write(values.astype('<u8').tobytes())
+    file.write(lengths.tobytes())
+    return count
+
+
+class Blocklist:
+    '''
+    A file written by `write_blocklist`, mapped read-only
+    '''
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        with open(self.path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            # Which file this is, to tell when the path points at a new one
+            self.file_key = _file_key(os.fstat(file.fileno()))
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{self.path} isn't a compiled blocklist.")
+        magic, count, num_blocks, num_hashes = _HEADER.unpack_from(self._mmap)
+        words_end = _HEADER.size + num_blocks * _BLOCK_BITS // 8
+        values_end = words_end + 8 * count
+        if magic != MAGIC or len(self._mmap) != values_end + count:
+            raise ValueError(f"{self.path} isn't a compiled blocklist.")
+        self.num_blocks, self.num_hashes = num_blocks, num_hashes
+
+        self.words = np.frombuffer(
+            self._mmap, dtype='<u8', count=num_blocks * _BLOCK_WORDS,
+            offset=_HEADER.size
+        )
+        self.values = np.frombuffer(
+            self._mmap, dtype='<u8', count=count, offset=words_end
+        )
+        self.lengths = np.frombuffer(
+            self._mmap, dtype=np.uint8, count=count, offset=values_end
+        )
+        # As in BinTable, memoryviews are much quicker than numpy arrays for
+        # one value at a time, but read in the host's byte order
+        if sys.byteorder == 'little':
+            view = memoryview(self._mmap)
+            self._words = view[_HEADER.size:words_end].cast('Q')
+            self._values = view[words_end:values_end].cast('Q')
+        else:
+            self._values, self._words = self.values, self.words
+
+    def __len__(self):
+        return len(self.values)
+
+    def contains(self, card_number):
+        '''
+        Whether `card_number` (a string of digits) is on the list
+        '''
+        if not 0 < len(card_number) <= MAX_LENGTH \
+                or not (card_number.isascii() and card_number.isdigit()):
+            return False
+        value, length = int(card_number), len(card_number)
+        x = _hash(value, length)
+        block = ((x >> 32) * self.num_blocks) >> 32
+        base = block * _BLOCK_WORDS
+        bit = x & (_BLOCK_BITS - 1)
+        step = ((x >> 9) & (_BLOCK_BITS - 1)) | 1
+        words = self._words
+        for _ in range(self.num_hashes):
+            if not words[base + (bit >> 6)] >> (bit & 63) & 1:
+                return False
+            bit = (bit + step) & (_BLOCK_BITS - 1)
+        return self._confirm(value, length)
+
+    def _confirm(self, value, length):
+        values = self._values
+        position = bisect_left(values, value)
+        # The same value can be there with several lengths (leading 0s)
+        while position < len(values) and values[position] == value:
+            if self.lengths[position] == length:
+                return True
+            position += 1
+        return False
+
+    def contains_many(self, values, lengths):
+        '''
+        Vectorized `contains` for numbers packed like `CardNumberArray`
+        '''
+        values = np.asarray(values, dtype=np.uint64)
+        lengths = np.asarray(lengths)
+        # Checked before the cast, which would wrap lengths past 255
+        in_range = (lengths > 0) & (lengths <= MAX_LENGTH)
+        lengths = lengths.astype(np.uint8)
+        words, bits = _bloom_words(
+            _hash_many(values, lengths), self.num_blocks, self.num_hashes
+        )
+        maybe = ((self.words[words] >> bits) & np.uint64(1)).all(axis=1)
+        maybe &= in_range
+        rows = np.flatnonzero(maybe)
+        if not len(rows) or not len(self):
+            return np.zeros(len(values), dtype=bool)
+
+        positions = np.searchsorted(self.values, values[rows])
+        in_range = positions < len(self)
+        positions = np.minimum(positions, len(self) - 1)
+        same_value = in_range & (self.values[positions] == values[rows])
+        found = same_value & (self.lengths[positions] == lengths[rows])
+        # Rows whose value is there but with another length first
+        for row in np.flatnonzero(same_value & ~found).tolist():
+            found[row] = self._confirm(
+                int(values[rows[row]]), int(lengths[rows[row]])
+            )
+        maybe[rows] = found
+        return maybe
+
+
+def _file_key(stat):
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _BlocklistState(namedtuple('_BlocklistState', 'path blocklist')):
+    __slots__ = ()
+
+
+# Swapped whole, as in common.bin_table, so readers never need the lock
+_state = _BlocklistState(None, None)
+_open_lock = threading.Lock()
+# When (on the monotonic clock) get_blocklist next looks at the file
+_check_at = 0
+
+
+def configure_blocklist(path):
+    '''
+    Check numbers against the blocklist compiled to `path` (or stop, with
+    None). The file is opened on first use
+    '''
+    global _state, _check_at
+    with _open_lock:
+        _state = _BlocklistState(os.fspath(path) if path else None, None)
+        _check_at = 0
+
+
+def get_blocklist():
+    '''
+    The configured Blocklist, or None if there isn't one. At most every
+    OPEN_RETRY_INTERVAL seconds, the file is opened again if it was replaced
+    (or couldn't be opened before). A file that can't be opened is logged and
+    the last good blocklist is kept
+    '''
+    global _state, _check_at
+    state = _state
+    if state.path and time.monotonic() >= _check_at:
+        with _open_lock:
+            state = _state
+            if state.path and time.monotonic() >= _check_at:
+                _check_at = time.monotonic() + OPEN_RETRY_INTERVAL
+                try:
+                    if state.blocklist is None or _file_key(
+                        os.stat(state.path)
+                    ) != state.blocklist.file_key:
+                        state = _state = _BlocklistState(
+                            state.path, Blocklist(state.path)
+                        )
+                except Exception:
+                    logger.exception(
+                        "Couldn't open the blocklist at %s, keeping the last "
+                        "good one", state.path
+                    )
+    return state.blocklist
@@ -0,0 +1,281 @@
+"""
+    Check digit algorithms compiled into transition tables.
+
+    Every scheme here is read as a small state machine: starting from state 0,
+    each character moves the state along a table picked by the character's
+    position, and a code is valid when it ends back at state 0. Right-to-left
+    schemes count positions from the check character (position 0), so the
+    payload of an incomplete code starts at position 1. The check character
+    for a payload is then a single lookup on the state the payload ends in.
+"""
+import string
+import numpy as np
+from common.parsing import parse_card_number
+
+# Marks bytes that aren't part of an algorithm's alphabet in `byte_values`
+INVALID_BYTE = 255
+
+
+class CheckDigitAlgorithm:
+    '''
+    A check digit scheme described by:
+        alphabet      - the characters a code may contain, in value order
+        transitions   - one [state][value] -> state table per position class
+        completion    - the check value that brings each state back to 0
+        right_to_left - whether positions are counted from the check character
+    '''
+    case_sensitive = True
+
+    def __init__(self, name, alphabet, transitions, completion, *,
+                 right_to_left=True):
+        self.name = name
+        self.alphabet = alphabet
+        self.right_to_left = right_to_left
+        self.completion = tuple(completion)
+        self.period = len(transitions)
+
+        # Scalar tables are keyed on characters to skip a value lookup per char
+        self._char_tables = tuple(
+            tuple(dict(zip(alphabet, row)) for row in table)
+            for table in transitions
+        )
+        # Batch tables are indexed by (position class, state, value)
+        self._array_tables = np.array(transitions, dtype=np.uint8)
+        self._completion_chars = ''.join(alphabet[v] for v in self.completion)
+        self._strip_alphabet = str.maketrans('', '', alphabet)
+
+        self.byte_values = np.full(256, INVALID_BYTE, dtype=np.uint8)
+        for value, char in enumerate(alphabet):
+            self.byte_values[ord(char)] = value
+            if not self.case_sensitive:
+                self.byte_values[ord(char.lower())] = value
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.name!r}>'
+
+    @property
+    def is_numeric(self):
+        return self.alphabet == string.digits
+
+    def clean(self, code, *, var_name='card_number'):
+        '''
+        Same as `common.algorithms.clean_card_number`, but accepts any
+        character in the algorithm's alphabet rather than only digits
+        '''
+        code = parse_card_number(code, var_name=var_name).stripped
+        if not self.case_sensitive:
+            code = code.upper()
+        if not code or code.translate(self._strip_alphabet):
+            raise ValueError(
+                f"{var_name} must be string of characters in "
+                f"'{self.alphabet}'. Got: {code}"
+            )
+        return code
+
+    def checksum_state(self, code, *, is_incomplete=False):
+        '''
+        Run a cleaned code through the transition tables. `is_incomplete`
+        denotes the code does not end in a check character yet
+        '''
+        tables, period = self._char_tables, self.period
+        if self.right_to_left:
+            code = code[::-1]
+            start = 1 if is_incomplete else 0
+        else:
+            start = 0
+        state = 0
+        for position, char in enumerate(code, start):
+            state = tables[position % period][state][char]
+        return state
+
+    def is_valid(self, code):
+        return self.checksum_state(code) == 0
+
+    def check_character(self, payload):
+        '''
+        The character that completes a cleaned payload into a valid code
+        '''
+        state = self.checksum_state(payload, is_incomplete=True)
+        return self._completion_chars[state]
+
+    def _positions(self, width, lengths):
+        '''
+        The position class of every cell in a right-aligned (N, width) matrix
+        '''
+        columns = np.arange(width)
+        if self.right_to_left:
+            # Right-aligned rows all share their positions from the right edge
+            return ((width - 1 - columns) % self.period)[None, :]
+        return (columns[None, :] - (width - lengths)[:, None]) % self.period
+
+    def checksum_state_many(self, values, lengths, *, is_incomplete=False):
+        '''
+        Batch version of `checksum_state` over a right-aligned matrix of
+        alphabet values (see `common.batch.clean_many`), one column at a time
+        '''
+        rows, width = values.shape
+        positions = self._positions(width, lengths)
+        if is_incomplete and self.right_to_left:
+            positions = (positions + 1) % self.period
+        positions = np.broadcast_to(positions, values.shape)
+        in_code = np.arange(width)[None, :] >= (width - lengths)[:, None]
+
+        state = np.zeros(rows, dtype=np.uint8)
+        columns = range(width)
+        if self.right_to_left:
+            columns = reversed(columns)
+        for col in columns:
+            moved = self._array_tables[positions[:, col], state, values[:, col]]
+            state = np.where(in_code[:, col], moved, state)
+        return state
+
+    def is_valid_many(self, values, lengths):
+        return self.checksum_state_many(values, lengths) == 0
+
+    def check_values_many(self, values, lengths):
+        '''
+        The check value completing each row of a matrix of payloads
+        '''
+        state = self.checksum_state_many(values, lengths, is_incomplete=True)
+        return np.array(self.completion, dtype=np.uint8)[state]
+
+
+class LuhnModN(CheckDigitAlgorithm):
+    '''
+    The Luhn mod N algorithm. With the 10 digits as the alphabet this is the
+    Luhn algorithm used by payment cards.
+
+    https://en.wikipedia.org/wiki/Luhn_mod_N_algorithm
+    '''
+
+    def __init__(self, name, alphabet):
+        radix = len(alphabet)
+        # A doubled value is written in base N and its two "digits" are summed
+        self.doubled = tuple(sum(divmod(2 * v, radix)) for v in range(radix))
+        transitions = [
+            [[(s + v) % radix for v in range(radix)] for s in range(radix)],
+            [
+                [(s + self.doubled[v]) % radix for v in range(radix)]
+                for s in range(radix)
+            ],
+        ]
+        completion = [-s % radix for s in range(radix)]
+        super().__init__(name, alphabet, transitions, completion)
+
+    def checksum_state_many(self, values, lengths, *, is_incomplete=False):
+        # The checksum is a plain sum and leading 0s add nothing to it, so the
+        # whole matrix can be summed with per-column weights instead of scanned
+        rows, width = values.shape
+        radix = len(self.alphabet)
+        from_right = width - 1 - np.arange(width)
+        is_doubled = from_right % 2 == int(not is_incomplete)
+        doubled = np.array(self.doubled, dtype=np.uint8)
+        total = (
+            values[:, ~is_doubled].sum(axis=1, dtype=np.int64)
+            + doubled[values[:, is_doubled]].sum(axis=1, dtype=np.int64)
+        )
+        return (total % radix).astype(np.uint8)
+
+
+class AlphanumericLuhnModN(LuhnModN):
+    '''
+    Luhn mod N over digits and letters. Letters are read case-insensitively
+    '''
+    case_sensitive = False
+
+
+class Verhoeff(CheckDigitAlgorithm):
+    '''
+    https://en.wikipedia.org/wiki/Verhoeff_algorithm
+    '''
+    # Multiplication in the dihedral group D5
+    MULTIPLY = (
+        (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+        (1, 2, 3, 4, 0, 6, 7, 8, 9, 5),
+        (2, 3, 4, 0, 1, 7, 8, 9, 5, 6),
+        (3, 4, 0, 1, 2, 8, 9, 5, 6, 7),
+        (4, 0, 1, 2, 3, 9, 5, 6, 7, 8),
+        (5, 9, 8, 7, 6, 0, 4, 3, 2, 1),
+        (6, 5, 9, 8, 7, 1, 0, 4, 3, 2),
+        (7, 6, 5, 9, 8, 2, 1, 0, 4, 3),
+        (8, 7, 6, 5, 9, 3, 2, 1, 0, 4),
+        (9, 8, 7, 6, 5, 4, 3, 2, 1, 0),
+    )
+    # The permutation applied to a digit, by position mod 8
+    PERMUTE = (
+        (0, 1, 2, 3, 4, 5, 6, 7, 8, 9),
+        (1, 5, 7, 6, 2, 8, 3, 0, 9, 4),
+        (5, 8, 0, 3, 7, 9, 6, 1, 4, 2),
+        (8, 9, 1, 6, 0, 4, 3, 5, 2, 7),
+        (9, 4, 5, 3, 1, 2, 8, 7, 0, 6),
+        (4, 2, 8, 6, 5, 7, 3, 9, 0, 1),
+        (2, 7, 9, 3, 8, 0, 6, 4, 1, 5),
+        (7, 0, 4, 6, 9, 1, 3, 2, 5, 8),
+    )
+    INVERSE = (0, 4, 3, 2, 1, 5, 6, 7, 8, 9)
+
+    def __init__(self, name):
+        transitions = [
+            [[self.MULTIPLY[s][perm[v]] for v in range(10)] for s in range(10)]
+            for perm in self.PERMUTE
+        ]
+        super().__init__(name, string.digits, transitions, self.INVERSE)
+
+
+class Damm(CheckDigitAlgorithm):
+    '''
+    https://en.wikipedia.org/wiki/Damm_algorithm
+    '''
+    # A totally anti-symmetric quasigroup of order 10 with a 0 diagonal, so the
+    # check digit is whatever state the payload ends in
+    QUASIGROUP = (
+        (0, 3, 1, 7, 5, 9, 8, 6, 4, 2),
+        (7, 0, 9, 2, 1, 5, 4, 8, 6, 3),
+        (4, 2, 0, 6, 8, 7, 1, 3, 5, 9),
+        (1, 7, 5, 0, 9, 8, 3, 4, 2, 6),
+        (6, 1, 2, 3, 0, 4, 5, 9, 7, 8),
+        (3, 6, 7, 4, 2, 0, 9, 5, 8, 1),
+        (5, 8, 6, 9, 7, 2, 0, 1, 3, 4),
+        (8, 9, 4, 5, 3, 6, 2, 0, 1, 7),
+        (9, 4, 3, 8, 6, 1, 7, 2, 0, 5),
+        (2, 5, 8, 1, 4, 3, 6, 7, 9, 0),
+    )
+
+    def __init__(self, name):
+        super().__init__(
+            name, string.digits, [self.QUASIGROUP], range(10),
+            right_to_left=False
+        )
+
+
+DEFAULT_CHECK_DIGIT_ALGORITHM = 'luhn'
+
+# Every supported check digit algorithm, compiled once at import
+CHECK_DIGIT_ALGORITHMS = {
+    algorithm.name: algorithm for algorithm in [
+        LuhnModN('luhn', string.digits),
+        AlphanumericLuhnModN(
+            'luhn_mod_36', string.digits + string.ascii_uppercase
+        ),
+        Verhoeff('verhoeff'),
+        Damm('damm'),
+    ]
+}
+
+
+def get_check_digit_algorithm(algorithm=None):
+    '''
+    Look up a check digit algorithm by name. Passing None gives the default
+    (Luhn) and passing an algorithm object returns it untouched
+    '''
+    if algorithm is None:
+        algorithm = DEFAULT_CHECK_DIGIT_ALGORITHM
+    if isinstance(algorithm, CheckDigitAlgorithm):
+        return algorithm
+    try:
+        return CHECK_DIGIT_ALGORITHMS[algorithm]
+    except (KeyError, TypeError):
+        raise ValueError(
+            f"Unknown check digit algorithm '{algorithm}'. Expected one of: "
+            f"{', '.join(CHECK_DIGIT_ALGORITHMS)}"
+        ) from None
@@ -0,0 +1,147 @@
+"""
+    Solve partially known card numbers, e.g. "4111 11** **** 1111".
+
+    The Luhn checksum is a sum of independent per-position terms, so with the
+    unknown digits set to 0 the known digits give a fixed partial sum. Each
+    unknown then adds one term, and every term is a bijection on 0-9. Picking
+    digits for all but the last unknown leaves exactly one digit that brings
+    the checksum to 0 mod 10, which is read straight off an inverse table. Only
+    1 in 10 candidates is ever built, and nothing invalid is generated.
+
+    An issuer's BIN ranges are broken down into prefixes, and each prefix the
+    pattern can start with is solved on its own, so counting is arithmetic
+    however many IIN digits are masked.
+"""
+import itertools
+from common.algorithms import (
+    _LUHN_DOUBLED_VALUES,
+    _LUHN_INVERSE_TERM,
+    _luhn_sum,
+    is_all_digits,
+)
+from common.bin_index import range_prefixes, split_bin_range
+from common.constants import MASK_CHARACTERS
+from common.enums import CardIssuer, UnknownIssuerError
+from common.parsing import parse_card_number
+
+
+def parse_masked_card_number(pattern, *, var_name='pattern'):
+    '''
+    Strip the separators from a masked card number and return it with every
+    mask character replaced by '*'. Raises the same errors as
+    `clean_card_number`
+    '''
+    pattern = parse_card_number(pattern, var_name=var_name).stripped
+    for mask in MASK_CHARACTERS:
+        pattern = pattern.replace(mask, '*')
+    if not is_all_digits(pattern.replace('*', '0')):
+        raise ValueError(
+            f"{var_name} must be string of digits and mask characters "
+            f"({','.join(MASK_CHARACTERS)}). Got: {pattern}"
+        )
+    return pattern
+
+
+def _disjoint_prefixes(bin_ranges):
+    '''
+    The fewest prefixes, in ascending order and none starting with another,
+    that match exactly the numbers in any of `bin_ranges`
+    '''
+    prefixes = sorted({
+        prefix for bin_range in bin_ranges
+        for prefix in range_prefixes(*split_bin_range(bin_range))
+    })
+    disjoint = []
+    for prefix in prefixes:
+        # Sorted, a prefix's extensions come right after it
+        if not disjoint or not prefix.startswith(disjoint[-1]):
+            disjoint.append(prefix)
+    return disjoint
+
+
+class _Solver:
+    '''
+    The per-pattern tables shared by counting and enumerating completions
+    '''
+
+    def __init__(self, pattern, issuer=None):
+        self.pattern = parse_masked_card_number(pattern)
+        # The issuer's BIN ranges as disjoint prefixes. Each one fixes the
+        # leading unknowns it covers, so neither counting nor enumerating ever
+        # tries IIN digits one assignment at a time
+        self.prefixes = ['']
+        if issuer is not None:
+            card_issuer = CardIssuer.from_string(issuer)
+            if not card_issuer:
+                raise UnknownIssuerError(issuer)
+            self.prefixes = _disjoint_prefixes(card_issuer.bin_ranges)
+
+    def _patterns(self):
+        '''
+        The pattern with each prefix written over its leading digits, for the
+        prefixes it can start with
+        '''
+        pattern = self.pattern
+        for prefix in self.prefixes:
+            if len(prefix) <= len(pattern) and all(
+                c == '*' or c == digit for c, digit in zip(pattern, prefix)
+            ):
+                yield prefix + pattern[len(prefix):]
+
+    def _terms(self, digits, doubled):
+        return sum(
+            _LUHN_DOUBLED_VALUES[d] if dbl else d
+            for d, dbl in zip(digits, doubled)
+        )
+
+    def _complete(self, pattern):
+        '''
+        Every completion of a pattern, ascending. Digits are picked for all but
+        the last unknown, which is solved for
+        '''
+        length = len(pattern)
+        unknowns = [i for i, c in enumerate(pattern) if c == '*']
+        if not unknowns:
+            if _luhn_sum(pattern) % 10 == 0:
+                yield pattern
+            return
+        base = _luhn_sum(pattern.replace('*', '0'))
+        # Whether each unknown's term is doubled, counting from the right
+        doubled = [(length - 1 - i) % 2 == 1 for i in unknowns]
+        inverse = _LUHN_INVERSE_TERM[doubled[-1]]
+        template = pattern.replace('*', '%s')
+        for digits in itertools.product(range(10), repeat=len(unknowns) - 1):
+            partial = base + self._terms(digits, doubled)
+            yield template % (digits + (inverse[-partial % 10],))
+
+    def __iter__(self):
+        for pattern in self._patterns():
+            yield from self._complete(pattern)
+
+    def count(self):
+        # Every choice of digits for all but the last unknown has exactly one
+        # completion, so only fully known patterns need checking
+        total = 0
+        for pattern in self._patterns():
+            unknowns = pattern.count('*')
+            if unknowns:
+                total += 10 ** (unknowns - 1)
+            else:
+                total += _luhn_sum(pattern) % 10 == 0
+        return total
+
+
+def complete_card_number(pattern, *, issuer=None):
+    '''
+    Lazily yield, in ascending order, every card number matching a masked
+    pattern (unknown digits written as one of `MASK_CHARACTERS`) that passes
+    the Luhn algorithm, optionally only those with a BIN from `issuer`
+    '''
+    return iter(_Solver(pattern, issuer))
+
+
+def count_card_number_completions(pattern, *, issuer=None):
+    '''
+    How many numbers `complete_card_number` would yield, without building them
+    '''
+    return _Solver(pattern, issuer).count()
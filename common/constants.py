@@ -3,6 +3,8 @@
 #   lengthen the IIN from 6 digits to 8 (ISO/IEC 7812-1:2017)
 # The standard will be enforced by most major banks starting in 2022
 IIN_LENGTH = 6  # TODO: Update this value (most likely in 2022)
+# BIN ranges may already be given with the longer IINs
+MAX_IIN_LENGTH = 8
 
 
 # According to the ISO standard, there needs to be a 6-digit IIN, 1 digit to
@@ -15,3 +17,8 @@ MAX_PAYMENT_CARD_NUMBER_LENGTH = 19
 # Users tend to input their card numbers with spacers where the card shows them
 # These tend to be the most common spacer characters
 COMMON_SEPARATORS = [' ', '.', ',', '|', ':', ';', '-', '\t']
+
+
+# Characters accepted in place of an unknown digit when completing a partially
+# transcribed card number
+MASK_CHARACTERS = ['*', '?', 'x', 'X', '_']
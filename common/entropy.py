@@ -0,0 +1,158 @@
+"""
+    Buffered random number streams for card number generation.
+
+    Every thread (and every forked worker process) gets its own stream, so
+    threads never contend for or share the module-global `random` state.
+    Entropy is pulled a block at a time and turned into characters with one
+    `bytes.translate` call, which makes a digit a string slice rather than a
+    Python-level random call. The same holds in secure mode, where the blocks
+    come from `os.urandom` instead of a seeded PRNG.
+"""
+import itertools
+import os
+import random
+import threading
+
+
+DEFAULT_BLOCK_SIZE = 4096
+
+
+class EntropyPool:
+    '''
+    A buffered stream of random bytes, with helpers for the draws card number
+    generation needs. Not thread-safe: use `get_entropy_pool` for the calling
+    thread's own pool
+    '''
+
+    def __init__(self, *, secure=False, seed=None,
+                 block_size=DEFAULT_BLOCK_SIZE):
+        if secure and seed is not None:
+            raise ValueError("A secure entropy pool cannot be seeded.")
+        self.secure = secure
+        self.block_size = block_size
+        if secure:
+            self._read = os.urandom
+        else:
+            prng = random.Random(seed)
+            self._read = lambda n: prng.getrandbits(8 * n).to_bytes(n, 'big')
+        # Each buffer is kept with how much of it has been used, so a draw is
+        # one slice rather than a copy of everything left in the buffer
+        self._bytes = (b'', 0)
+        self._chars = {}
+
+    def read(self, n):
+        '''
+        The next `n` random bytes
+        '''
+        buffered, used = self._bytes
+        if used + n > len(buffered):
+            buffered = buffered[used:] + self._read(max(n, self.block_size))
+            used = 0
+        self._bytes = (buffered, used + n)
+        return buffered[used:used + n]
+
+    def characters(self, alphabet, k):
+        '''
+        `k` characters drawn uniformly and independently from `alphabet`
+        '''
+        buffered, used = self._chars.get(alphabet, ('', 0))
+        if used + k > len(buffered):
+            buffered = buffered[used:]
+            used = 0
+            while len(buffered) < k:
+                buffered += self._read(self.block_size).translate(
+                    *_byte_tables(alphabet)
+                ).decode('ascii')
+        self._chars[alphabet] = (buffered, used + k)
+        return buffered[used:used + k]
+
+    def randbelow(self, n):
+        '''
+        A uniform random integer in [0, n)
+        '''
+        if n <= 0:
+            raise ValueError(f"Expected a positive n. Got: {n}")
+        bits = (n - 1).bit_length()
+        num_bytes = (bits + 7) // 8
+        while True:
+            value = int.from_bytes(self.read(num_bytes), 'big')
+            value >>= 8 * num_bytes - bits
+            if value < n:
+                return value
+
+    def randint(self, a, b):
+        '''
+        A uniform random integer in [a, b], like `random.randint`
+        '''
+        return a + self.randbelow(b - a + 1)
+
+    def choice(self, seq):
+        '''
+        A random element of `seq`, like `random.choice`
+        '''
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[self.randbelow(len(seq))]
+
+
+_BYTE_TABLES = {}
+
+
+def _byte_tables(alphabet):
+    '''
+    The `bytes.translate` arguments mapping a random byte onto `alphabet`.
+    Bytes past the largest multiple of the alphabet's length are deleted so
+    every character stays equally likely
+    '''
+    if alphabet not in _BYTE_TABLES:
+        if not alphabet.isascii() or not 0 < len(alphabet) <= 256:
+            raise ValueError(
+                f"Expected an alphabet of 1 to 256 ASCII characters. Got: "
+                f"{alphabet}"
+            )
+        usable = 256 - 256 % len(alphabet)
+        table = bytes(
+            ord(alphabet[byte % len(alphabet)]) if byte < usable else 0
+            for byte in range(256)
+        )
+        _BYTE_TABLES[alphabet] = (table, bytes(range(usable, 256)))
+    return _BYTE_TABLES[alphabet]
+
+
+# Settings every thread's pool is built from, see `configure_entropy`
+_config = {'secure': False, 'seed': None, 'block_size': DEFAULT_BLOCK_SIZE}
+_generation = 0
+_streams = itertools.count()
+_local = threading.local()
+
+
+def configure_entropy(*, secure=False, seed=None,
+                      block_size=DEFAULT_BLOCK_SIZE):
+    '''
+    Set how every thread's pool is built, replacing any existing pools.
+
+    `secure` reads blocks from `os.urandom`. `seed` makes runs repeatable: the
+    Nth pool created after this call is always seeded the same way, so a
+    single-threaded run produces the same numbers every time
+    '''
+    global _config, _generation, _streams
+    if secure and seed is not None:
+        raise ValueError("A secure entropy pool cannot be seeded.")
+    _config = {'secure': secure, 'seed': seed, 'block_size': block_size}
+    _streams = itertools.count()
+    _generation += 1
+
+
+def get_entropy_pool():
+    '''
+    The calling thread's pool, created on first use. A pool inherited across
+    a fork is replaced so worker processes don't repeat each other
+    '''
+    pool = getattr(_local, 'pool', None)
+    if pool is None or _local.owner != (os.getpid(), _generation):
+        config = dict(_config)
+        if config['seed'] is not None:
+            config['seed'] = f"{config['seed']}:{next(_streams)}"
+        pool = _local.pool = EntropyPool(**config)
+        _local.owner = (os.getpid(), _generation)
+    return pool
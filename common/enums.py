@@ -1,4 +1,10 @@
-from enum import Enum
+from enum import Enum, IntEnum
+from common.issuers import (
+    IssuerNameIndex,
+    IssuerRecord,
+    get_issuer_snapshot,
+    normalize_issuer_name,
+)
 
 
 class CardIssuer(Enum):
@@ -29,20 +35,81 @@ class CardIssuer(Enum):
 
     @classmethod
     def from_string(cls, value):
-        if isinstance(value, cls):
+        '''
+        The CardIssuer named by `value`, or failing that the IssuerRecord of
+        that name in the current issuer snapshot (see `common.issuers`)
+        '''
+        if isinstance(value, (cls, IssuerRecord)):
             return value
         if not isinstance(value, str):
             return None
 
-        def _cleanse_str(val):
-            remove_all_of = ' _'
-            val = val.lower()
-            for char in remove_all_of:
-                val = val.replace(char, '')
-            return val
-
-        value = _cleanse_str(value)
-        for enum in cls:
-            if value in (_cleanse_str(enum.name), _cleanse_str(enum.value)):
-                return enum
-        return None
+        key = normalize_issuer_name(value)
+        issuer = _ISSUER_NAMES.get(key)
+        if issuer is None:
+            issuer = get_issuer_snapshot().names.get(key)
+        return issuer
+
+    @classmethod
+    def suggest(cls, value, limit=3):
+        '''
+        The issuers (built-in or from the snapshot) with names closest to a
+        `value` that `from_string` doesn't know, closest first
+        '''
+        if not isinstance(value, str):
+            return []
+        scored = sorted(
+            _ISSUER_NAMES.scored(value)
+            + get_issuer_snapshot().names.scored(value),
+            key=lambda item: item[:2]
+        )
+        suggestions = []
+        for _, _, issuer in scored:
+            if issuer not in suggestions:
+                suggestions.append(issuer)
+        return suggestions[:limit]
+
+
+# Every CardIssuer by its name and value, built once rather than per lookup
+_ISSUER_NAMES = IssuerNameIndex(
+    (alias, issuer) for issuer in CardIssuer
+    for alias in (issuer.name, issuer.value)
+)
+
+
+class UnknownIssuerError(ValueError):
+    '''
+    Raised for an issuer that `CardIssuer.from_string` can't find. The
+    names of the closest issuers it could have meant are in `suggestions`
+    '''
+
+    def __init__(self, issuer):
+        self.suggestions = [
+            suggestion.value for suggestion in CardIssuer.suggest(issuer)
+        ]
+        message = f"Unable to find CardIssuer matching '{issuer}'."
+        if self.suggestions:
+            message += " Did you mean {}?".format(
+                ' or '.join(f"'{name}'" for name in self.suggestions)
+            )
+        super().__init__(message)
+
+
+class CardNumberError(IntEnum):
+    '''
+    Per-row outcome codes for the batch functions in `common.batch`. Each code
+    mirrors a case where the scalar `clean_card_number` would raise
+    '''
+    NONE = 0
+    NOT_A_STRING = 1
+    INVALID_CHARACTERS = 2
+    NO_DIGITS = 3
+
+    @property
+    def exception(self):
+        '''
+        The exception type the scalar functions raise for the same input
+        '''
+        if self is self.NONE:
+            return None
+        return TypeError if self is self.NOT_A_STRING else ValueError
@@ -0,0 +1,200 @@
+"""
+    Issuers defined at runtime (e.g. card_api's Issuer model) rather than in
+    `CardIssuer`, held as one immutable snapshot.
+
+    The snapshot is built once from every issuer and compiled into a
+    `BinIndex` and an `IssuerNameIndex`, so resolving an issuer never goes
+    back to where the issuers are stored. Whoever owns them builds a new
+    snapshot when they change and swaps it in with `set_issuer_snapshot`;
+    readers just take the current one, without locking.
+"""
+import heapq
+from collections import Counter, defaultdict, namedtuple
+from common.bin_index import BinIndex
+
+
+class IssuerRecord(
+    namedtuple('IssuerRecord', 'id name num_digits bin_ranges')
+):
+    '''
+    An issuer that can stand in for a CardIssuer: it has the same
+    `value`, `num_digits` and `bin_ranges` (here a tuple). `id` is whatever
+    identifies it where it's stored
+    '''
+    __slots__ = ()
+
+    @property
+    def value(self):
+        return self.name
+
+
+_IGNORED_CHARACTERS = str.maketrans('', '', ' _')
+
+
+def normalize_issuer_name(value):
+    '''
+    The form issuer names are compared in, so "Master Card", "master_card"
+    and "MASTERCARD" are all the same issuer
+    '''
+    return value.lower().translate(_IGNORED_CHARACTERS)
+
+
+def _trigrams(key):
+    # Padded, so the start and end of a name count for more
+    padded = f'^^{key}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    '''
+    The optimal string alignment distance between `a` and `b` (insertions,
+    deletions, substitutions and swaps of neighbouring characters), or
+    `limit + 1` once it's known to be over `limit`
+    '''
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    # Only cells within `limit` of the diagonal can stay under the limit
+    before = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            other = b[j - 1]
+            cost = previous[j - 1] + (char != other)
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            if (
+                before is not None and j > 1 and char == b[j - 2]
+                and a[i - 2] == other and before[j - 2] + 1 < cost
+            ):
+                cost = before[j - 2] + 1
+            current[j] = cost if cost < over else over
+        if min(current) > limit:
+            return over
+        before, previous = previous, current
+    return previous[-1]
+
+
+class IssuerNameIndex:
+    '''
+    Issuers by name and alias, compared with `normalize_issuer_name`. Finding
+    an exact match is one dict lookup. For names that don't match, `scored`
+    narrows the aliases down to those sharing the most trigrams with it and
+    ranks them by edit distance, so it stays quick with thousands of aliases
+    '''
+    # How many of the aliases sharing the most trigrams get an edit distance
+    CANDIDATES = 32
+    MAX_TYPOS = 3
+
+    def __init__(self, aliases=()):
+        self._issuers = {}
+        for alias, issuer in aliases:
+            self._issuers.setdefault(normalize_issuer_name(alias), issuer)
+        self._keys = list(self._issuers)
+        self._postings = defaultdict(list)
+        for position, key in enumerate(self._keys):
+            for trigram in _trigrams(key):
+                self._postings[trigram].append(position)
+
+    def __len__(self):
+        return len(self._issuers)
+
+    def find(self, name):
+        '''
+        The issuer with `name` as a name or alias, or None
+        '''
+        return self._issuers.get(normalize_issuer_name(name))
+
+    def get(self, key):
+        '''
+        `find`, for a name that's already normalized
+        '''
+        return self._issuers.get(key)
+
+    def scored(self, name):
+        '''
+        (distance, alias, issuer) for the aliases close enough to `name` to
+        suggest, closest first. Aliases that `name` begins are as close as the
+        furthest allowed
+        '''
+        key = normalize_issuer_name(name)
+        if not key:
+            return []
+        trigrams = _trigrams(key)
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self._postings.get(trigram, ()))
+        # Allow a typo for every 3 characters, up to MAX_TYPOS. Each one
+        # changes at most 4 trigrams, so aliases sharing fewer than that many
+        # can't be close enough
+        limit = min(max(1, len(key) // 3), self.MAX_TYPOS)
+        needed = len(trigrams) - 4 * limit
+        scored = []
+        for position, count in heapq.nlargest(
+            self.CANDIDATES, shared.items(), key=lambda item: item[1]
+        ):
+            alias = self._keys[position]
+            distance = (
+                _edit_distance(key, alias, limit) if count >= needed
+                else limit + 1
+            )
+            if distance > limit and len(key) >= 3 and alias.startswith(key):
+                distance = limit
+            if distance <= limit:
+                scored.append((distance, alias, self._issuers[alias]))
+        return sorted(scored, key=lambda item: item[:2])
+
+
+class IssuerSnapshot:
+    '''
+    A fixed set of IssuerRecords, indexed by BIN range and by name. `version`
+    is the version of the issuers it was built from
+    '''
+
+    def __init__(self, records=(), version=None):
+        self.records = tuple(records)
+        self.version = version
+        self.index = BinIndex.from_issuers(self.records)
+        self.names = IssuerNameIndex(
+            (record.name, record) for record in self.records
+        )
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, name):
+        '''
+        The record named `name` (compared with `normalize_issuer_name`), or
+        None
+        '''
+        return self.names.find(name)
+
+    def lookup(self, card_number):
+        '''
+        The record with the longest BIN prefix matching `card_number`, or None
+        '''
+        return self.index.lookup(card_number) if self.records else None
+
+
+_snapshot = IssuerSnapshot()
+
+
+def get_issuer_snapshot():
+    '''
+    The current IssuerSnapshot. Callers should use the snapshot they got for
+    the whole of a lookup
+    '''
+    return _snapshot
+
+
+def set_issuer_snapshot(snapshot):
+    '''
+    Replace the current snapshot (or go back to an empty one, with None)
+    '''
+    global _snapshot
+    _snapshot = snapshot if snapshot is not None else IssuerSnapshot()
@@ -1,13 +1,29 @@
+import itertools
+import numpy as np
 from common.bin_tests import (
     is_visa,
     is_master_card,
     is_discover_card,
     is_american_express,
 )
-from common.enums import CardIssuer
-from common.algorithms import luhn_check, clean_card_number
+from common.batch import _POW10, clean_many
+from common.bin_index import BinIndex
+from common.bin_table import get_bin_table
+from common.blocklist import get_blocklist
+from common.enums import CardIssuer, CardNumberError, UnknownIssuerError
+from common.issuers import get_issuer_snapshot
+from common.algorithms import (
+    is_luhn_valid,
+    clean_card_number,
+    luhn_corrections,
+)
+from common.check_digits import (
+    DEFAULT_CHECK_DIGIT_ALGORITHM,
+    get_check_digit_algorithm,
+)
 from common.constants import (
     IIN_LENGTH,
+    MAX_IIN_LENGTH,
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
     MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH
 )
@@ -22,22 +38,132 @@ COMMON_BIN_TESTS = {
 }
 
 
+# The same BIN ranges as COMMON_BIN_TESTS, compiled for lookups that don't
+# slow down as issuers are added
+BIN_INDEX = BinIndex.from_issuers(COMMON_BIN_TESTS)
+
+
+def _find_issuer(card_number):
+    return _lookup_issuer(card_number, get_bin_table(), get_issuer_snapshot())
+
+
+def _lookup_issuer(card_number, bin_table, issuers, length=None):
+    # A compiled BIN table, when one is configured, takes precedence (for the
+    # lengths it allows), then the issuers snapshot, then the built-in ranges
+    if bin_table is not None:
+        issuer = bin_table.issuer_of(card_number, length)
+        if issuer is not None:
+            return issuer
+    issuer = issuers.lookup(card_number) or BIN_INDEX.lookup(card_number)
+    return issuer.value if issuer else None
+
+
+# Most IINs `_find_iin_issuer` keeps
+IIN_CACHE_SIZE = 65536
+
+# The BIN table and snapshot `_find_iin_issuer` last answered from, and its
+# cache for them. Replaced whole when either changes, so the cache never
+# keeps an old table (and its mapped file) or snapshot alive
+_iin_cache = (None, None, {})
+
+
+def _find_iin_issuer(iin, length, bin_table, issuers):
+    '''
+    `_find_issuer` for the IIN of a `length` digit number, cached since
+    issuers are never found from more than MAX_IIN_LENGTH digits and the same
+    IINs come up over and over
+    '''
+    global _iin_cache
+    cached_table, cached_issuers, cache = _iin_cache
+    if cached_table is not bin_table or cached_issuers is not issuers:
+        cache = {}
+        _iin_cache = (bin_table, issuers, cache)
+    key = (iin, length)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+    if len(cache) >= IIN_CACHE_SIZE:
+        cache.clear()
+    issuer = cache[key] = _lookup_issuer(iin, bin_table, issuers, length)
+    return issuer
+
+
+# The check digit algorithm payment cards use
+_LUHN = get_check_digit_algorithm(DEFAULT_CHECK_DIGIT_ALGORITHM)
+
+# Marks a memoized field that hasn't been computed yet
+_UNSET = object()
+
+
 class PaymentCardNumber:
     """
     A class encapsulating common functionality used for payment card numbers
+
+    Instances are immutable. Validity and the issuer are computed the first
+    time they're read and kept, and `__slots__` keeps each instance small
     """
+    __slots__ = ('_number', '_check_digits', '_is_valid', '_issuer')
+
+    def __init__(self, card_number, *, algorithm=None):
+        check_digits = get_check_digit_algorithm(algorithm)
+        if check_digits is _LUHN:
+            number = clean_card_number(card_number)
+        else:
+            number = check_digits.clean(card_number)
+        self._init(number, check_digits)
+
+    @classmethod
+    def from_digits(cls, digits, *, algorithm=None):
+        '''
+        Build from a number that's already clean (see `clean_card_number`),
+        skipping the cleaning and its checks
+        '''
+        card = cls.__new__(cls)
+        card._init(digits, get_check_digit_algorithm(algorithm))
+        return card
+
+    def _init(self, number, check_digits):
+        for name, value in [
+            ('_number', number),
+            ('_check_digits', check_digits),
+            ('_is_valid', _UNSET),
+            ('_issuer', _UNSET),
+        ]:
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._number!r}, ' \
+            f'algorithm={self.algorithm!r})'
 
-    def __init__(self, card_number):
-        self.value = card_number
+    def __eq__(self, other):
+        if not isinstance(other, PaymentCardNumber):
+            return NotImplemented
+        return (self._number, self._check_digits) == \
+            (other._number, other._check_digits)
+
+    def __hash__(self):
+        return hash((self._number, self._check_digits.name))
+
+    @property
+    def _is_luhn(self):
+        return self._check_digits is _LUHN
 
     @property
     def value(self):
         return self._number
 
-    @value.setter
-    def value(self, new_value):
-        self._number = clean_card_number(new_value)
-        return self._number
+    @property
+    def algorithm(self):
+        '''
+        The name of the check digit algorithm the number is validated with
+        '''
+        return self._check_digits.name
 
     @property
     def mii(self):
@@ -76,20 +202,320 @@ class PaymentCardNumber:
     @property
     def is_valid(self):
         '''
-        Uses the Luhn algorithm and card number length to determine validity
+        Uses the Luhn algorithm (or the chosen check digit algorithm) and card
+        number length to determine validity
         Does not guarantee the card number is in use
         '''
-        return (
-            MIN_LENGTH <= len(self._number) <= MAX_LENGTH
-            and luhn_check(self.value)
-        )
+        if self._is_valid is _UNSET:
+            if not MIN_LENGTH <= len(self._number) <= MAX_LENGTH:
+                is_valid = False
+            elif self._is_luhn:
+                is_valid = is_luhn_valid(self._number)
+            else:
+                is_valid = self._check_digits.is_valid(self._number)
+            object.__setattr__(self, '_is_valid', is_valid)
+        return self._is_valid
+
+    @property
+    def is_blocked(self):
+        '''
+        Whether the number is on the configured blocklist (see
+        `common.blocklist`). Always False without one
+        '''
+        blocklist = get_blocklist()
+        return blocklist is not None and blocklist.contains(self._number)
 
     @property
     def issuer(self):
         '''
         The issuer of the card number determined by the IIN
+        Only payment cards (which always use Luhn) have an issuer
+        '''
+        if self._issuer is _UNSET:
+            issuer = _find_issuer(self._number) if self._is_luhn else None
+            object.__setattr__(self, '_issuer', issuer)
+        return self._issuer
+
+    def suggest_corrections(self):
+        '''
+        For an invalid number, the valid numbers from a known issuer that it
+        could be a typo of: one digit wrong or two neighbouring digits swapped
+        '''
+        if (
+            not self._is_luhn
+            or self.is_valid
+            or not MIN_LENGTH <= len(self._number) <= MAX_LENGTH
+        ):
+            return []
+        bin_table, issuers = get_bin_table(), get_issuer_snapshot()
+        return sorted(
+            candidate for candidate in luhn_corrections(self._number)
+            if _find_iin_issuer(
+                candidate[:MAX_IIN_LENGTH], len(candidate), bin_table, issuers
+            ) is not None
+        )
+
+
+_LUHN_DOUBLED_DIGITS = np.array([0, 2, 4, 6, 8, 1, 3, 5, 7, 9], dtype=np.uint8)
+
+
+def _memoized_column(compute):
+    '''
+    A read-only property computed for the whole array the first time it's read
+    '''
+    name = compute.__name__
+
+    def column(self):
+        if name not in self._columns:
+            values = compute(self)
+            values.flags.writeable = False
+            self._columns[name] = values
+        return self._columns[name]
+    column.__doc__ = compute.__doc__
+    return property(column)
+
+
+class CardNumberArray:
+    '''
+    Many Luhn card numbers held as columns: each number as one uint64 and its
+    digit count as one uint8, so 9 bytes per number (19 digits always fit in
+    a uint64, and the count keeps leading 0s).
+
+    The derived fields mirror the `PaymentCardNumber` properties, but are
+    whole-array numpy columns, computed lazily and kept. Digit fields are
+    integers: `iin` is the first IIN_LENGTH digits, `account_number` the ones
+    between the IIN and the check digit
+    '''
+    # Rows processed at a time, which bounds the size of temporary arrays
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, values, lengths):
+        self.values = np.asarray(values, dtype=np.uint64)
+        self.lengths = np.asarray(lengths, dtype=np.uint8)
+        if self.values.shape != self.lengths.shape or self.values.ndim != 1:
+            raise ValueError("values and lengths must be 1-d and equal size.")
+        if (
+            (self.lengths < 1).any() or (self.lengths > MAX_LENGTH).any()
+            or (self.values >= _POW10[self.lengths]).any()
+        ):
+            raise ValueError(
+                f"Every number must have 1 to {MAX_LENGTH} digits and fit its "
+                "length."
+            )
+        self.values.flags.writeable = False
+        self.lengths.flags.writeable = False
+        self._columns = {}
+        self._issuers = None
+
+    @classmethod
+    def from_strings(cls, card_numbers):
+        '''
+        Clean and pack card number strings, a chunk at a time. Raises like
+        `clean_card_number` does for the first one that can't be cleaned
+        '''
+        card_numbers = iter(card_numbers)
+        values, lengths = [], []
+        while True:
+            chunk = [
+                number for _, number in zip(range(cls.CHUNK_SIZE), card_numbers)
+            ]
+            if not chunk:
+                break
+            digits, chunk_lengths, errors = clean_many(chunk)
+            bad = np.flatnonzero(errors)
+            if len(bad):
+                error = CardNumberError(errors[bad[0]])
+                raise error.exception(
+                    f"card_number can't be cleaned ({error.name}). "
+                    f"Got: {chunk[bad[0]]!r}"
+                )
+            if digits.shape[1] > MAX_LENGTH:
+                raise ValueError(
+                    f"card_number has more than {MAX_LENGTH} digits. Got: "
+                    f"{chunk[int(np.argmax(chunk_lengths))]!r}"
+                )
+            powers = _POW10[digits.shape[1] - 1::-1]
+            values.append(digits.astype(np.uint64) @ powers)
+            lengths.append(chunk_lengths)
+        if not values:
+            return cls(np.empty(0), np.empty(0))
+        return cls(np.concatenate(values), np.concatenate(lengths))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        '''
+        A `PaymentCardNumber` for an integer index, otherwise (slices, masks,
+        index arrays) a new CardNumberArray
+        '''
+        if isinstance(index, (int, np.integer)):
+            number = f'{int(self.values[index]):0{int(self.lengths[index])}d}'
+            return PaymentCardNumber.from_digits(number)
+        return type(self)(self.values[index], self.lengths[index])
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_strings(self):
+        '''
+        The card numbers as a numpy array of strings
+        '''
+        numbers = self.values.astype(f'U{MAX_LENGTH}')
+        short = self.lengths > np.char.str_len(numbers)
+        for length in np.unique(self.lengths[short]).tolist():
+            rows = np.flatnonzero(short & (self.lengths == length))
+            numbers[rows] = np.char.zfill(numbers[rows], length)
+        return numbers
+
+    def _leading(self, width):
+        '''
+        The first `width` digits of each number (all of them when shorter)
+        '''
+        shift = np.maximum(self.lengths.astype(np.intp) - width, 0)
+        return self.values // _POW10[shift]
+
+    def _chunks(self):
+        for start in range(0, len(self), self.CHUNK_SIZE):
+            yield slice(start, start + self.CHUNK_SIZE)
+
+    @_memoized_column
+    def mii(self):
+        '''
+        The Major Industry Identifier (first digit) of each number
+        '''
+        return self._leading(1).astype(np.uint8)
+
+    @_memoized_column
+    def iin(self):
+        '''
+        The Issuer Identification Number (first IIN_LENGTH digits)
+        '''
+        return self._leading(IIN_LENGTH)
+
+    @_memoized_column
+    def account_number(self):
+        '''
+        The digits between the IIN and the check digit (0 when there are none)
+        '''
+        width = np.maximum(self.lengths.astype(np.intp) - IIN_LENGTH - 1, 0)
+        return self.values // 10 % _POW10[width]
+
+    @_memoized_column
+    def check_digit(self):
+        return (self.values % 10).astype(np.uint8)
+
+    @_memoized_column
+    def is_valid(self):
+        '''
+        Whether each number has a valid length and passes the Luhn algorithm
+        '''
+        is_valid = np.empty(len(self), dtype=bool)
+        for rows in self._chunks():
+            values = self.values[rows]
+            total = np.zeros(len(values), dtype=np.uint8)
+            # Digits past a number's length are 0 and add nothing to the sum
+            for position in range(MAX_LENGTH):
+                digits = (values // _POW10[position] % 10).astype(np.uint8)
+                if position % 2:
+                    digits = _LUHN_DOUBLED_DIGITS[digits]
+                total += digits
+            lengths = self.lengths[rows]
+            is_valid[rows] = (
+                (total % 10 == 0)
+                & (lengths >= MIN_LENGTH) & (lengths <= MAX_LENGTH)
+            )
+        return is_valid
+
+    @_memoized_column
+    def is_blocked(self):
+        '''
+        Whether each number is on the configured blocklist, like
+        `PaymentCardNumber.is_blocked`
+        '''
+        blocklist = get_blocklist()
+        if blocklist is None:
+            return np.zeros(len(self), dtype=bool)
+        is_blocked = np.empty(len(self), dtype=bool)
+        for rows in self._chunks():
+            is_blocked[rows] = blocklist.contains_many(
+                self.values[rows], self.lengths[rows]
+            )
+        return is_blocked
+
+    @_memoized_column
+    def issuer(self):
+        '''
+        The index in `issuers` of each number's issuer, or -1. Like
+        `PaymentCardNumber.issuer`, it's found from the BIN table, then the
+        issuer snapshot, then the built-in ranges
+        '''
+        bin_table, snapshot = get_bin_table(), get_issuer_snapshot()
+        # Each source's codes are offset past the names of the ones before it
+        table_names = bin_table.names if bin_table is not None else []
+        snapshot_start = len(table_names)
+        built_in_start = snapshot_start + len(snapshot.index.issuers)
+        self._issuers = tuple(table_names) + tuple(
+            issuer.value for issuer in itertools.chain(
+                snapshot.index.issuers, BIN_INDEX.issuers
+            )
+        )
+
+        codes = np.full(len(self), -1, dtype=np.intp)
+        for rows in self._chunks():
+            lengths = self.lengths[rows]
+            shift = np.maximum(lengths.astype(np.intp) - MAX_IIN_LENGTH, 0)
+            leading = self.values[rows] // _POW10[shift]
+            chunk_codes = codes[rows]
+            if bin_table is not None:
+                positions = bin_table.find_many(leading)
+                found = np.flatnonzero(positions >= 0)
+                masks = bin_table.length_masks[positions[found]]
+                # A range with lengths only covers numbers of those lengths
+                allowed = (masks == 0) | (masks >> lengths[found] & 1 == 1)
+                found = found[allowed]
+                chunk_codes[found] = bin_table.issuer_ids[positions[found]]
+            for index, start in [
+                (snapshot.index, snapshot_start),
+                (BIN_INDEX, built_in_start),
+            ]:
+                missing = np.flatnonzero(chunk_codes < 0)
+                if not len(missing) or not index.issuers:
+                    continue
+                found = index.lookup_many(leading[missing])
+                chunk_codes[missing] = np.where(found >= 0, found + start, -1)
+
+        # Numbers shorter than the longest IIN only match whole prefixes
+        short = np.flatnonzero(self.lengths < MAX_IIN_LENGTH).tolist()
+        if short:
+            first_codes = {}
+            for code, name in enumerate(self._issuers):
+                first_codes.setdefault(name, code)
+            for row in short:
+                number = str(self.values[row]).zfill(int(self.lengths[row]))
+                name = _lookup_issuer(number, bin_table, snapshot)
+                codes[row] = first_codes.get(name, -1)
+        return codes
+
+    @property
+    def issuers(self):
+        '''
+        The issuer names `issuer` indexes into. The same name can come up
+        more than once, from different sources
+        '''
+        self.issuer
+        return self._issuers
+
+    def issuer_is(self, issuer):
+        '''
+        Mask of the numbers from one issuer, by CardIssuer, issuer name or
+        BIN table issuer name
         '''
-        for issuer, test_func in COMMON_BIN_TESTS.items():
-            if test_func(self._number):
-                return issuer.value
-        return None
+        card_issuer = CardIssuer.from_string(issuer)
+        name = card_issuer.value if card_issuer else issuer
+        codes = [
+            code for code, found in enumerate(self.issuers) if found == name
+        ]
+        if not card_issuer and not codes:
+            raise UnknownIssuerError(issuer)
+        return np.isin(self.issuer, codes)
@@ -0,0 +1,42 @@
+"""
+    Parse a card number once and hand the result along.
+
+    Validators, serializers and `PaymentCardNumber` all need a card number
+    without its separators. `parse_card_number` strips them in one
+    `str.translate` pass and returns a `ParsedCardNumber`. Every layer that
+    accepts one uses its `stripped` value instead of cleaning the raw input
+    again.
+"""
+from collections import namedtuple
+from common.constants import COMMON_SEPARATORS
+
+
+# str.translate table deleting every separator in a single pass
+SEPARATOR_DELETIONS = str.maketrans('', '', ''.join(COMMON_SEPARATORS))
+
+
+class ParsedCardNumber(namedtuple('ParsedCardNumber', 'raw stripped')):
+    '''
+    A card number as it was given (`raw`) and with its separators removed
+    (`stripped`). `stripped` isn't checked for invalid characters
+    '''
+    __slots__ = ()
+
+    def __str__(self):
+        return self.raw
+
+
+def parse_card_number(card_number, *, var_name='card_number'):
+    '''
+    Strip the separators from a card number string. Already parsed numbers
+    are returned untouched
+    '''
+    if isinstance(card_number, ParsedCardNumber):
+        return card_number
+    if not isinstance(card_number, str):
+        raise TypeError(
+            f"Expected {var_name} to be type 'str'. Got: {type(card_number)}"
+        )
+    return ParsedCardNumber(
+        card_number, card_number.translate(SEPARATOR_DELETIONS)
+    )
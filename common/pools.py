@@ -0,0 +1,185 @@
+"""
+    Ready-made card numbers for each issuer, so bursts of generate requests
+    are served from memory instead of generating on the request path.
+
+    Each issuer has a bounded ring buffer that a background thread tops back
+    up once it drops below a low-water mark. When a burst drains a buffer, the
+    request falls back to generating its own number and counts as starved.
+"""
+import os
+import threading
+from collections import deque
+from common.algorithms import generate_card_number_from_issuer
+from common.batch import generate_many
+from common.entropy import get_entropy_pool
+from common.enums import CardIssuer, UnknownIssuerError
+from common.issuers import get_issuer_snapshot
+
+
+DEFAULT_POOL_CAPACITY = 10000
+
+
+class IssuerNumberPool:
+    '''
+    A ring buffer of up to `capacity` valid numbers for one CardIssuer,
+    refilled in batches of `batch_size` whenever fewer than `low_water` remain
+    '''
+
+    def __init__(self, issuer, *, capacity=DEFAULT_POOL_CAPACITY,
+                 low_water=None, batch_size=None):
+        self.issuer = issuer
+        self.capacity = capacity
+        self.low_water = capacity // 4 if low_water is None else low_water
+        self.batch_size = batch_size or max(1, capacity // 10)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # deque's append and popleft are atomic, so takes never need the lock
+        self._numbers = deque(maxlen=self.capacity)
+        self._refill_needed = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+        self.hits = self.starved = self.refills = 0
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def take(self):
+        '''
+        A number from the pool, or a freshly generated one if it's empty
+        '''
+        if self._pid != os.getpid():
+            # A forked worker must not hand out its parent's numbers again
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        try:
+            number = self._numbers.popleft()
+        except IndexError:
+            self._count('starved')
+            self._request_refill()
+            return generate_card_number_from_issuer(self.issuer)
+        self._count('hits')
+        if len(self._numbers) < self.low_water:
+            self._request_refill()
+        return number
+
+    def fill(self):
+        '''
+        Top the pool up to capacity on the calling thread
+        '''
+        while len(self._numbers) < self.capacity:
+            count = min(self.batch_size, self.capacity - len(self._numbers))
+            if get_entropy_pool().secure:
+                # Keep numbers from a secure pool coming from os.urandom
+                numbers = [
+                    generate_card_number_from_issuer(self.issuer)
+                    for _ in range(count)
+                ]
+            else:
+                numbers = generate_many(count, self.issuer).tolist()
+            self._numbers.extend(numbers)
+            self._count('refills')
+
+    @property
+    def hit_rate(self):
+        taken = self.hits + self.starved
+        return self.hits / taken if taken else None
+
+    def metrics(self):
+        return {
+            'issuer': self.issuer.value,
+            'size': len(self._numbers),
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'starved': self.starved,
+            'hitRate': self.hit_rate,
+            'refills': self.refills,
+        }
+
+    def _count(self, stat):
+        with self._lock:
+            setattr(self, stat, getattr(self, stat) + 1)
+
+    def _request_refill(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._refill_forever,
+                        name=f'{self.issuer.name.lower()}-number-pool',
+                        daemon=True,
+                    )
+                    self._thread.start()
+        self._refill_needed.set()
+
+    def _refill_forever(self):
+        while True:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+            self.fill()
+
+
+_POOLS = {issuer: IssuerNumberPool(issuer) for issuer in CardIssuer}
+
+
+# Most issuer names `_find_card_issuer` keeps
+ISSUER_CACHE_SIZE = 1024
+
+# The issuer snapshot `_find_card_issuer` last answered from, and its cache
+# for it. Replaced whole when the snapshot is, so names of issuers from it
+# aren't answered from an older one and a retired snapshot isn't kept alive
+_issuer_cache = (None, {})
+
+
+def _find_card_issuer(issuer, issuers):
+    global _issuer_cache
+    cached_issuers, cache = _issuer_cache
+    if cached_issuers is not issuers:
+        cache = {}
+        _issuer_cache = (issuers, cache)
+    try:
+        return cache[issuer]
+    except KeyError:
+        pass
+    if len(cache) >= ISSUER_CACHE_SIZE:
+        cache.clear()
+    card_issuer = cache[issuer] = CardIssuer.from_string(issuer)
+    return card_issuer
+
+
+def _resolve_issuer(issuer):
+    card_issuer = _find_card_issuer(issuer, get_issuer_snapshot())
+    if not card_issuer:
+        raise UnknownIssuerError(issuer)
+    return card_issuer
+
+
+def get_issuer_pool(issuer):
+    '''
+    The shared pool for a CardIssuer or issuer name. Only the built-in
+    issuers have one
+    '''
+    card_issuer = _resolve_issuer(issuer)
+    if card_issuer not in _POOLS:
+        raise ValueError(f"{card_issuer.value} has no number pool.")
+    return _POOLS[card_issuer]
+
+
+def take_card_number(issuer):
+    '''
+    Pooled version of `generate_card_number_from_issuer`. Issuers from the
+    issuer snapshot come and go, so their numbers are generated on the spot
+    '''
+    card_issuer = _resolve_issuer(issuer)
+    if card_issuer not in _POOLS:
+        return generate_card_number_from_issuer(card_issuer)
+    return _POOLS[card_issuer].take()
+
+
+def issuer_pool_metrics():
+    '''
+    Fill level, hit rate and starvation counts of every issuer's pool
+    '''
+    return [pool.metrics() for pool in _POOLS.values()]
@@ -124,3 +124,30 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Draw generated card numbers from os.urandom rather than a seeded PRNG
+SECURE_CARD_NUMBER_GENERATION = True
+
+# The most numbers one /card-number/generate?count=... response streams
+CARD_NUMBER_MAX_GENERATE_COUNT = 1000000
+
+# A BIN table written by `manage.py compile_bin_table`. When set, issuers are
+# looked up in it first, and in the built-in BIN ranges after
+BIN_TABLE_PATH = None
+
+# How often (in seconds) each process checks whether BIN_TABLE_PATH was
+# recompiled and swaps the new table in. None only reloads on the signal below
+BIN_TABLE_RELOAD_INTERVAL = 30
+
+# Also reload the BIN table when a process receives this signal, e.g. 'SIGHUP'
+BIN_TABLE_RELOAD_SIGNAL = None
+
+# How often (in seconds) each process checks whether another one changed the
+# issuers, at the start of a request. The version it checks is a row in the
+# database, so every worker sharing the database sees it
+ISSUER_SNAPSHOT_CHECK_INTERVAL = 1
+
+# A blocklist written by `manage.py compile_blocklist`. When set, validated
+# numbers are flagged with isBlocked
+BLOCKLIST_PATH = None
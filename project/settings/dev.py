@@ -2,3 +2,4 @@ from project.settings import *
 
 ALLOWED_HOSTS = ["*"]
 DEBUG = True
+SECURE_CARD_NUMBER_GENERATION = False
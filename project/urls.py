@@ -1,9 +1,12 @@
 from django.urls import path, include
 from django.views.generic import TemplateView
 from rest_framework.schemas import get_schema_view
+from card_api.views import IssuerListView, IssuerDetailView
 
 urlpatterns = [
     path('card-number/', include('card_api.urls')),
+    path('issuers', IssuerListView.as_view()),
+    path('issuers/<int:pk>', IssuerDetailView.as_view()),
 
     # Use the `get_schema_view()` helper to add a `SchemaView` to project URLs.
     #   * `title` and `description` parameters are passed to `SchemaGenerator`.
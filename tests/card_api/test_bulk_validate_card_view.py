@@ -0,0 +1,77 @@
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+from common.objects import PaymentCardNumber
+
+
+LINES = [
+    '4111 1111 1111 1111',
+    '4111-1111-1111-1112',
+    '378282246310005',
+    '0' * 8,
+    '4111',
+    '1' * 20,
+    '4111 x111 1111 1111',
+    '4111\r111111111111',
+]
+
+
+def _records(response):
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    return [json.loads(line) for line in lines]
+
+
+def _test(body, **kwargs):
+    client = APIClient()
+    return client.post('/card-number/validate/bulk', body, **kwargs)
+
+
+def test_octet_stream_matches_validate_endpoint():
+    '''
+    Each line gets what /card-number/validate would say about it alone
+    '''
+    body = '\n'.join(LINES).encode('ascii')
+    records = _records(
+        _test(body, content_type='application/octet-stream')
+    )
+    assert len(records) == len(LINES)
+
+    client = APIClient()
+    for line, record in zip(LINES, records):
+        single = client.post(
+            '/card-number/validate', {'number': line}, format='json'
+        )
+        if single.status_code == 400:
+            assert record == single.data
+        else:
+            assert record['isValid'] is single.data['isValid']
+            assert record.get('issuer') == single.data.get('issuer')
+
+
+def test_multipart_upload():
+    upload = SimpleUploadedFile('cards.txt', b'4111111111111111\r\n0000\r\n')
+    records = _records(_test({'file': upload}, format='multipart'))
+    assert records[0] == {
+        'isValid': True,
+        'issuer': PaymentCardNumber('4111111111111111').issuer,
+    }
+    assert 'number' in records[1]
+
+
+def test_large_body_is_spooled_to_disk(settings):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 1024
+    body = b'4111111111111111\n' * 1000
+    records = _records(_test(body, content_type='application/octet-stream'))
+    assert len(records) == 1000
+    assert all(record['isValid'] for record in records)
+
+
+def test_rejects_other_content_types():
+    response = _test({'number': '4111111111111111'}, format='json')
+    assert response.status_code == 415
+
+    response = _test(b'', content_type='application/octet-stream')
+    assert response.status_code == 400
+    assert 'file' in response.data
@@ -0,0 +1,54 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from common.bin_table import BinRecord, BinTable
+
+
+def _write_csv(tmp_path, content):
+    path = tmp_path / 'bins.csv'
+    path.write_text(content)
+    return str(path)
+
+
+def test_compiles_csv(tmp_path):
+    csv_path = _write_csv(tmp_path, (
+        'start,end,issuer,network,lengths,country\n'
+        '4,,Visa,Visa,"13,16,19",\n'
+        '41111100,41111199,Acme Bank,Visa,16,us\n'
+        '51,55,Mastercard,Mastercard,16-17,\n'
+    ))
+    output = tmp_path / 'bins.bin'
+    call_command('compile_bin_table', csv_path, str(output))
+
+    table = BinTable(output)
+    assert table.lookup('4111111150000000') == BinRecord(
+        'Acme Bank', 'Visa', (16,), 'US'
+    )
+    assert table.lookup('4000000000000000').lengths == (13, 16, 19)
+    assert table.lookup('5500000000000000').lengths == (16, 17)
+    assert table.lookup('5600000000000000') is None
+
+
+def test_output_defaults_to_setting(tmp_path, settings):
+    settings.BIN_TABLE_PATH = str(tmp_path / 'default.bin')
+    csv_path = _write_csv(tmp_path, 'start,issuer\n4,V\n')
+    call_command('compile_bin_table', csv_path)
+    assert BinTable(settings.BIN_TABLE_PATH).lookup('4').issuer == 'V'
+
+
+@pytest.mark.parametrize('content', [
+    'start,end\n4,\n',
+    'start,issuer\nabc,Visa\n',
+    'start,end,issuer\n55,51,Mastercard\n',
+    'start,end,issuer\n5,555,Mastercard\n',
+    'start,issuer,lengths\n4,Visa,20\n',
+    'start,issuer,country\n4,Visa,USA\n',
+    'start,issuer\n4,\n',
+])
+def test_rejects_bad_rows(tmp_path, content):
+    output = tmp_path / 'bins.bin'
+    with pytest.raises(CommandError):
+        call_command('compile_bin_table', _write_csv(tmp_path, content),
+                     str(output))
+    assert not output.exists()
+    assert list(tmp_path.iterdir()) == [tmp_path / 'bins.csv']
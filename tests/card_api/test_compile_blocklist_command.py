@@ -0,0 +1,82 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from rest_framework.test import APIClient
+from common.blocklist import Blocklist, configure_blocklist
+
+
+def _compile(tmp_path, content, *args):
+    input_path = tmp_path / 'numbers.txt'
+    input_path.write_text(content)
+    output = tmp_path / 'blocklist'
+    call_command('compile_blocklist', str(input_path), str(output), *args)
+    return str(output)
+
+
+@pytest.fixture
+def blocklist(tmp_path):
+    path = _compile(tmp_path, '4012 8888 8888 1881\n\n0000000000000000\n')
+    configure_blocklist(path)
+    yield path
+    configure_blocklist(None)
+
+
+def test_compiles_numbers(tmp_path):
+    path = _compile(
+        tmp_path, '4012-8888-8888-1881\r\n\n4012888888881881\n00123456',
+        '--bits-per-number', '16'
+    )
+    blocklist = Blocklist(path)
+    assert len(blocklist) == 2
+    assert blocklist.contains('4012888888881881')
+    assert blocklist.contains('00123456')
+    assert not blocklist.contains('123456')
+
+
+def test_output_defaults_to_setting(tmp_path, settings):
+    settings.BLOCKLIST_PATH = str(tmp_path / 'default')
+    input_path = tmp_path / 'numbers.txt'
+    input_path.write_text('4012888888881881\n')
+    call_command('compile_blocklist', str(input_path))
+    assert Blocklist(settings.BLOCKLIST_PATH).contains('4012888888881881')
+
+
+@pytest.mark.parametrize('content', ['4012888888881881\n4012x\n', '4111\n'])
+def test_rejects_bad_lines(tmp_path, content):
+    with pytest.raises(CommandError, match='line 1|line 2'):
+        _compile(tmp_path, content)
+    assert list(tmp_path.iterdir()) == [tmp_path / 'numbers.txt']
+
+
+def test_validate_flags_blocked_numbers(blocklist):
+    client = APIClient()
+    for number, is_blocked in [
+        ('4012888888881881', True),
+        ('4111111111111111', False),
+    ]:
+        response = client.post(
+            '/card-number/validate', {'number': number}, format='json'
+        )
+        assert response.data['isBlocked'] is is_blocked
+
+    body = b'4012888888881881\n4111111111111111\n0000000000000000\n41x\n'
+    response = client.post(
+        '/card-number/validate/bulk', body,
+        content_type='application/octet-stream'
+    )
+    records = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert [record.get('isBlocked') for record in records] == [
+        True, False, True, None
+    ]
+    assert records[0]['issuer'] == records[1]['issuer'] == 'Visa'
+
+
+def test_validate_without_blocklist():
+    response = APIClient().post(
+        '/card-number/validate', {'number': '4012888888881881'}, format='json'
+    )
+    assert 'isBlocked' not in response.data
@@ -0,0 +1,50 @@
+from rest_framework.test import APIClient
+from common.algorithms import luhn_check
+
+
+def _test(pattern, **kwargs):
+    client = APIClient()
+    return client.post(
+        '/card-number/complete', {'pattern': pattern, **kwargs}, format='json'
+    )
+
+
+def test_single_unknown_has_exactly_one_completion():
+    response = _test('4111 1111 1111 111*')
+    assert response.status_code == 200
+    assert response.data == {
+        'count': 1,
+        'numbers': ['4111111111111111'],
+        'truncated': False,
+    }
+
+
+def test_lists_up_to_limit_and_counts_the_rest():
+    response = _test('4111 11** **** 1111', limit=5)
+    assert response.status_code == 200
+    data = response.data
+    assert data['count'] == 10 ** 5
+    assert data['truncated'] is True
+    assert len(data['numbers']) == 5
+    assert data['numbers'] == sorted(data['numbers'])
+    for number in data['numbers']:
+        assert luhn_check(number)
+        assert number.startswith('411111') and number.endswith('1111')
+
+
+def test_issuer_filters_completions():
+    data = _test('**** 1111 1111 1111', issuer='amex', limit=1000).data
+    assert data['count'] == len(data['numbers']) == 20
+    for number in data['numbers']:
+        assert number[:2] in ('34', '37')
+
+    data = _test('4*** 1111 1111 1111', issuer='amex').data
+    assert data['count'] == 0 and data['numbers'] == []
+
+
+def test_returns_400_for_bad_input():
+    assert _test('4111 11** **** 111a').status_code == 400
+    assert _test('4111 1*').status_code == 400
+    assert _test('4111 11** **** 1111', issuer='viza').status_code == 400
+    assert _test('4111 11** **** 1111', limit=0).status_code == 400
+    assert _test(None).status_code == 400
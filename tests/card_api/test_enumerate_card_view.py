@@ -0,0 +1,67 @@
+import base64
+from furl import furl
+from rest_framework.test import APIClient
+from common.algorithms import luhn_check
+
+
+def _test(**kwargs):
+    client = APIClient()
+    return client.get(furl('/card-number/enumerate', args=kwargs).url)
+
+
+def test_walks_every_valid_number_exactly_once():
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        args = {'prefix': '4111 1111 1111', 'length': 16, 'limit': 300}
+        if cursor:
+            args['cursor'] = cursor
+        data = _test(**args).data
+        assert data['count'] == 1000
+        seen.extend(data['numbers'])
+        pages += 1
+        cursor = data['next']
+        if cursor is None:
+            break
+
+    assert pages == 4
+    assert len(seen) == len(set(seen)) == 1000
+    assert seen == sorted(seen)
+    for number in seen:
+        assert number.startswith('411111111111')
+        assert luhn_check(number)
+
+
+def test_defaults_to_16_digits():
+    data = _test(prefix='4').data
+    assert data['count'] == 10 ** 14
+    assert len(data['numbers']) == 100
+    assert all(len(number) == 16 for number in data['numbers'])
+    assert data['next']
+
+
+def test_cursor_is_tied_to_its_query():
+    cursor = _test(prefix='4111', limit=5).data['next']
+    assert _test(prefix='4111', cursor=cursor).status_code == 200
+    assert _test(prefix='5111', cursor=cursor).status_code == 400
+    assert _test(prefix='4111', length=15, cursor=cursor).status_code == 400
+    assert _test(prefix='4111', cursor='not a cursor').status_code == 400
+
+
+def test_rejects_negative_cursors():
+    cursor = base64.urlsafe_b64encode(b'411111:16:-5').decode('ascii')
+    response = _test(prefix='411111', cursor=cursor)
+    assert response.status_code == 400
+    assert 'cursor' in response.data
+
+
+def test_returns_400_for_bad_params():
+    assert _test(prefix='abc').status_code == 400
+    assert _test(prefix='4' * 16).status_code == 400
+    assert _test(length='zero').status_code == 400
+    response = _test(length=20)
+    assert response.status_code == 400
+    assert list(response.data) == ['length']
+    assert _test(limit=0).status_code == 400
+    assert _test(limit=1001).status_code == 400
@@ -1,9 +1,20 @@
+import gc
+import json
+import weakref
+from collections import Counter
 from furl import furl
+from common.algorithms import luhn_check
 from rest_framework.test import APIClient
 from common.constants import (
     MIN_PAYMENT_CARD_NUMBER_LENGTH as MIN_LENGTH,
     MAX_PAYMENT_CARD_NUMBER_LENGTH as MAX_LENGTH,
 )
+from common.issuers import (
+    IssuerRecord,
+    IssuerSnapshot,
+    get_issuer_snapshot,
+    set_issuer_snapshot,
+)
 
 
 def _test(**kwargs):
@@ -11,6 +22,17 @@ def _test(**kwargs):
     return client.get(furl('/card-number/generate', args=kwargs).url)
 
 
+def _records(**kwargs):
+    '''
+    The records of a streamed (`count=...`) response
+    '''
+    resp = _test(**kwargs)
+    assert resp.status_code == 200
+    assert resp['Content-Type'] == 'application/x-ndjson'
+    lines = b''.join(resp.streaming_content).decode().splitlines()
+    return [json.loads(line) for line in lines]
+
+
 def test_returns_400_for_bad_length():
     assert _test(length=MIN_LENGTH - 1).status_code == 400
     assert _test(length=MAX_LENGTH + 1).status_code == 400
@@ -29,6 +51,19 @@ def test_returns_400_if_issuer_not_found():
     assert _test(issuer="VIZA").status_code == 400
 
 
+def test_suggests_issuers_for_typos():
+    response = _test(issuer='viza')
+    assert response.status_code == 400
+    assert response.data['suggestions'] == ['Visa']
+    assert "Did you mean 'Visa'?" in response.data['issuer'][0]
+
+    response = _test(issuer='mastercrad', count=5)
+    assert response.data['suggestions'] == ['Master Card']
+    response = _test(mix='viza:1,amex:1')
+    assert response.data['suggestions'] == ['Visa']
+    assert _test(issuer='bob hope').data['suggestions'] == []
+
+
 def test_without_query_string_params_returns_16_digits():
     json_resp = _test().data
     assert 'number' in json_resp
@@ -83,3 +118,132 @@ def test_issuer_works_as_expected():
     issuer = json_resp['details']['issuer'].lower().replace(' ', '')
     assert num.startswith('4')
     assert issuer == 'visa'
+
+
+def test_algorithm_is_used_for_check_digit():
+    for algorithm in ['verhoeff', 'damm', 'luhn_mod_36']:
+        json_resp = _test(algorithm=algorithm, length=12).data
+        assert len(json_resp['number']) == 12
+        assert luhn_check(json_resp['number'], algorithm=algorithm)
+        assert json_resp['details']['isValid']
+
+    assert _test(algorithm='mod97').status_code == 400
+    assert _test(algorithm='damm', issuer='visa').status_code == 400
+
+
+def test_count_streams_other_algorithms():
+    records = _records(algorithm='verhoeff', prefix='12', length=10, count=50)
+    assert len(records) == 50
+    for record in records:
+        assert record['number'].startswith('12')
+        assert luhn_check(record['number'], algorithm='verhoeff')
+        assert record['details']['isValid']
+    assert _test(algorithm='damm', count=0).status_code == 400
+    assert _test(algorithm='damm', prefix='x', count=5).status_code == 400
+
+
+def test_count_returns_distinct_numbers():
+    records = _records(prefix='4111 1111 1111', count=500)
+    numbers = [record['number'] for record in records]
+    assert len(numbers) == len(set(numbers)) == 500
+    for record in records:
+        assert record['number'].startswith('411111111111')
+        assert record['details']['isValid']
+
+
+def test_key_and_offset_are_repeatable():
+    first = _records(prefix='4111', key='load-test', count=20)
+    again = _records(prefix='4111', key='load-test', count=20)
+    assert first == again
+
+    later = _records(prefix='4111', key='load-test', count=10, offset=10)
+    assert later == first[10:]
+
+    single = _test(prefix='4111', key='load-test', offset=3).data
+    assert single == first[3]
+
+    other = _records(prefix='4111', key='other-key', count=20)
+    assert other != first
+
+
+def test_unique_mode_supports_issuers():
+    numbers = [
+        r['number'] for r in _records(issuer='amex', key='k', count=50)
+    ]
+    assert len(set(numbers)) == 50
+    assert all(n[:2] in ('34', '37') for n in numbers)
+
+
+def test_unique_mode_returns_400_for_bad_params():
+    assert _test(count=0).status_code == 400
+    assert _test(count=1000001).status_code == 400
+    assert _test(count='many').status_code == 400
+    assert _test(key='k', offset=-1).status_code == 400
+    assert _test(key='k', algorithm='damm').status_code == 400
+    # only 10 valid numbers exist under a 14 digit prefix at length 16
+    assert _test(prefix='4' * 14, count=10).status_code == 200
+    assert list(_test(prefix='4' * 14, count=11).data) == ['count']
+    assert list(_test(prefix='4' * 14, key='k', offset=10).data) == ['offset']
+    for length in (7, 20):
+        response = _test(prefix='4111', key='k', length=length)
+        assert response.status_code == 400
+        assert list(response.data) == ['length']
+    assert list(_test(prefix='4x', key='k').data) == ['prefix']
+
+
+def test_pool_metrics_track_issuer_requests():
+    client = APIClient()
+
+    def _hits_and_starved():
+        metrics = client.get('/card-number/generate/pools').data
+        visa, = [m for m in metrics if m['issuer'] == 'Visa']
+        return visa['hits'] + visa['starved']
+
+    before = _hits_and_starved()
+    for _ in range(3):
+        assert _test(issuer='visa').data['number'].startswith('4')
+    assert _hits_and_starved() == before + 3
+
+
+def test_mix_generates_from_weighted_issuers():
+    resp = _test(mix='amex:1,visa:0')
+    assert resp.status_code == 200
+    assert resp.data['number'][:2] in ('34', '37')
+    assert resp.data['details']['isValid']
+
+    records = _records(mix='visa:3,discover:1', count=200)
+    assert len(records) == 200
+    starts = Counter(record['number'][0] for record in records)
+    assert set(starts) == {'4', '6'}
+    assert starts['4'] > starts['6']
+
+
+def test_mix_returns_400_for_bad_params():
+    assert _test(mix='visa:x').status_code == 400
+    assert _test(mix='visa:nan').status_code == 400
+    assert _test(mix='visa:1,Visa:2').status_code == 400
+    assert _test(mix='bob:1').status_code == 400
+    assert _test(mix='visa:1', issuer='visa').status_code == 400
+    assert _test(mix='visa:1', key='k').status_code == 400
+    assert _test(mix='visa:1', count=0).status_code == 400
+
+
+def test_mix_follows_the_issuer_snapshot():
+    acme = IssuerRecord(1, 'Acme Bank', 16, ('5019',))
+    set_issuer_snapshot(IssuerSnapshot([acme], version=1))
+    snapshot = weakref.ref(get_issuer_snapshot())
+    try:
+        assert _test(mix='acme bank:1').data['number'].startswith('5019')
+        set_issuer_snapshot(IssuerSnapshot([], version=2))
+        assert _test(mix='acme bank:1').status_code == 400
+        assert _test(mix='visa:1').status_code == 200
+        gc.collect()
+        assert snapshot() is None
+    finally:
+        set_issuer_snapshot(None)
+
+
+def test_count_limit_is_configurable(settings):
+    settings.CARD_NUMBER_MAX_GENERATE_COUNT = 5
+    assert len(_records(count=5)) == 5
+    assert _test(count=6).status_code == 400
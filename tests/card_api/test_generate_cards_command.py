@@ -0,0 +1,74 @@
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from common.algorithms import luhn_check
+from common.enums import CardIssuer
+from common.objects import COMMON_BIN_TESTS
+
+
+def _lines(path):
+    with open(path) as file:
+        return file.read().splitlines()
+
+
+def test_writes_csv_for_a_prefix(tmp_path):
+    output = tmp_path / 'cards.csv'
+    call_command('generate_cards', 2500, prefix='4111', length=19,
+                 output=str(output), chunk_size=1000, seed=7, processes=2)
+    numbers = _lines(output)
+    assert len(numbers) == 2500
+    assert all(len(n) == 19 and n.startswith('4111') for n in numbers)
+    assert all(luhn_check(n) for n in numbers)
+
+
+def test_shards_split_the_rows(tmp_path):
+    call_command('generate_cards', 1001, issuer='amex', format='ndjson',
+                 shards=3, output=str(tmp_path / 'amex-{shard}.ndjson'),
+                 seed=7, processes=2)
+    shards = sorted(tmp_path.iterdir())
+    assert [path.name for path in shards] == [
+        'amex-00000.ndjson', 'amex-00001.ndjson', 'amex-00002.ndjson'
+    ]
+    records = [json.loads(line) for path in shards for line in _lines(path)]
+    assert [len(_lines(path)) for path in shards] == [334, 334, 333]
+    assert all(
+        COMMON_BIN_TESTS[CardIssuer.AMEX](record['number'])
+        for record in records
+    )
+
+
+def test_seed_makes_output_repeatable(tmp_path):
+    def _run(name, **kwargs):
+        call_command('generate_cards', 3000, mix='visa:3,discover:1',
+                     output=str(tmp_path / name), seed=11, chunk_size=500,
+                     **kwargs)
+        return _lines(tmp_path / name)
+
+    first = _run('first.csv', processes=1)
+    assert first == _run('second.csv', processes=3)
+    assert {n[0] for n in first} == {'4', '6'}
+
+
+def test_writes_to_stdout_in_order(tmp_path, capfd):
+    call_command('generate_cards', 3000, prefix='4111', chunk_size=100,
+                 output=str(tmp_path / 'cards.csv'), seed=5, processes=2)
+    # 30 chunks across 2 processes, so most wait for the writer
+    call_command('generate_cards', 3000, prefix='4111', chunk_size=100,
+                 seed=5, processes=2)
+    assert capfd.readouterr().out.splitlines() == \
+        _lines(tmp_path / 'cards.csv')
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'issuer': 'bob hope'},
+    {'mix': 'visa'},
+    {'prefix': 'abc'},
+    {'prefix': '4' * 16},
+    {'issuer': 'visa', 'length': 16},
+    {'shards': 2},
+    {'shards': 0, 'output': 'x'},
+])
+def test_bad_options_raise(kwargs):
+    with pytest.raises(CommandError):
+        call_command('generate_cards', 10, **kwargs)
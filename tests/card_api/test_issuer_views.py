@@ -0,0 +1,165 @@
+import json
+import pytest
+from django.db import transaction
+from rest_framework.test import APIClient
+from card_api import issuers
+from card_api.issuers import (
+    bump_issuers_version,
+    get_issuers_version,
+    refresh_issuer_snapshot,
+)
+from card_api.models import BinRange, Issuer
+from common.issuers import IssuerSnapshot, set_issuer_snapshot
+
+
+# The snapshot is rebuilt when a change is committed, so these tests need
+# real transactions
+pytestmark = pytest.mark.django_db(transaction=True)
+
+ACME = {
+    'name': 'Acme Bank',
+    'binRanges': [{'start': '41111100', 'end': '41111199'}, {'start': '5019'}],
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_issuers():
+    yield
+    set_issuer_snapshot(None)
+
+
+def _issuer_of(client, number):
+    response = client.post(
+        '/card-number/validate', {'number': number}, format='json'
+    )
+    return response.data.get('issuer')
+
+
+def test_crud():
+    client = APIClient()
+    assert _issuer_of(client, '4111111150000001') == 'Visa'
+
+    response = client.post('/issuers', ACME, format='json')
+    assert response.status_code == 201
+    pk = response.data['id']
+    assert response.data == {
+        'id': pk,
+        'name': 'Acme Bank',
+        'numDigits': 16,
+        'binRanges': [
+            {'start': '41111100', 'end': '41111199'},
+            {'start': '5019', 'end': '5019'},
+        ],
+    }
+    assert _issuer_of(client, '4111111150000001') == 'Acme Bank'
+    assert client.get(f'/issuers/{pk}').data == response.data
+
+    response = client.patch(
+        f'/issuers/{pk}', {'binRanges': [{'start': '5019'}]}, format='json'
+    )
+    assert response.status_code == 200
+    assert response.data['name'] == 'Acme Bank'
+    assert _issuer_of(client, '4111111150000001') == 'Visa'
+    assert _issuer_of(client, '5019000000000008') == 'Acme Bank'
+
+    response = client.get('/card-number/generate?issuer=acme_bank')
+    assert response.data['details']['issuer'] == 'Acme Bank'
+
+    assert client.delete(f'/issuers/{pk}').status_code == 204
+    assert client.get(f'/issuers/{pk}').status_code == 404
+    assert _issuer_of(client, '5019000000000008') is None
+    assert BinRange.objects.count() == 0
+
+
+def test_list_etag():
+    client = APIClient()
+    response = client.get('/issuers')
+    assert response.status_code == 200
+    assert response.data == []
+    empty_etag = response['ETag']
+
+    client.post('/issuers', ACME, format='json')
+    response = client.get('/issuers')
+    assert [issuer['name'] for issuer in response.data] == ['Acme Bank']
+    etag = response['ETag']
+    assert etag != empty_etag
+
+    response = client.get('/issuers', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    response = client.get('/issuers', HTTP_IF_NONE_MATCH=empty_etag)
+    assert response.status_code == 200
+
+
+def test_rejects_invalid_issuers():
+    client = APIClient()
+    client.post('/issuers', ACME, format='json')
+    for data in [
+        {**ACME, 'name': 'acme_bank'},
+        {**ACME, 'name': 'Master Card'},
+        {**ACME, 'name': 'Other', 'binRanges': []},
+        {**ACME, 'name': 'Other', 'binRanges': [{'start': '4x'}]},
+        {**ACME, 'name': 'Other', 'binRanges': [{'start': '5', 'end': '45'}]},
+        {**ACME, 'name': 'Other', 'numDigits': 20},
+    ]:
+        response = client.post('/issuers', data, format='json')
+        assert response.status_code == 400, data
+    assert Issuer.objects.count() == 1
+
+
+def test_picks_up_changes_from_other_workers(settings):
+    '''
+    Another worker's change only reaches this one through the version in the
+    database, which is checked when a request starts
+    '''
+    settings.ISSUER_SNAPSHOT_CHECK_INTERVAL = 0
+    client = APIClient()
+    Issuer.objects.create(name='Acme Bank').bin_ranges.create(start='5019')
+    # As if this worker built its snapshot before the change committed
+    set_issuer_snapshot(IssuerSnapshot(version=get_issuers_version()))
+    assert not refresh_issuer_snapshot()
+    assert _issuer_of(client, '5019000000000008') is None
+
+    bump_issuers_version()
+    assert _issuer_of(client, '5019000000000008') == 'Acme Bank'
+
+
+def test_publishes_once_per_transaction(monkeypatch):
+    refreshes = []
+    refresh = issuers.refresh_issuer_snapshot
+    monkeypatch.setattr(issuers, 'refresh_issuer_snapshot', lambda **kwargs: (
+        refreshes.append(kwargs), refresh(**kwargs)
+    ))
+    version = get_issuers_version()
+    with transaction.atomic():
+        issuer = Issuer.objects.create(name='Acme Bank')
+        for start in ['5019', '5020', '5021']:
+            issuer.bin_ranges.create(start=start)
+        assert not refreshes
+    assert get_issuers_version() == version + 1
+    assert refreshes == [{'force': True}]
+    assert _issuer_of(APIClient(), '5019000000000008') == 'Acme Bank'
+
+    with transaction.atomic():
+        Issuer.objects.filter(pk=issuer.pk).delete()
+    assert get_issuers_version() == version + 2
+    assert refreshes.count({'force': True}) == 2
+
+
+def test_bulk_validate_finds_model_issuers():
+    client = APIClient()
+    client.post('/issuers', {
+        'name': 'Acme Bank', 'binRanges': [{'start': '41111111'}],
+    }, format='json')
+    numbers = ['4111111111111111', '4012888888881881', '4111111111111112']
+    response = client.post(
+        '/card-number/validate/bulk', '\n'.join(numbers).encode(),
+        content_type='application/octet-stream'
+    )
+    records = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert [record.get('issuer') for record in records] == [
+        _issuer_of(client, number) for number in numbers
+    ] == ['Acme Bank', 'Visa', None]
@@ -110,3 +110,67 @@ def test_returns_400_if_blank_string_given():
 def test_returns_400_if_non_digits_included():
     response = _test('0a1b2c3d4e5f6')
     assert response.status_code == 400
+
+
+def test_reports_characters_and_length_together():
+    response = _test('abc')
+    assert response.status_code == 400
+    assert len(response.data['number']) == 2
+    assert response.data['number'][0].startswith('Only digits')
+
+
+def test_algorithm_selects_check_digit_scheme():
+    client = APIClient()
+
+    def _post(number, **kwargs):
+        return client.post(
+            '/card-number/validate', {'number': number, **kwargs},
+            format='json'
+        )
+
+    response = _post('1234 5679', algorithm='verhoeff')
+    assert response.status_code == 200
+    assert response.data['isValid'] is True
+    assert 'issuer' not in response.data
+    assert _post('1234 5678', algorithm='verhoeff').data['isValid'] is False
+
+    response = _post('gift-card-4', algorithm='luhn_mod_36')
+    assert response.status_code == 200
+    assert response.data['isValid'] is True
+    assert _post('gift-card-4').status_code == 400
+    assert _post('4111111111111111', algorithm='mod97').status_code == 400
+
+
+def test_suggest_returns_corrections_for_invalid_numbers():
+    client = APIClient()
+
+    def _post(number, **kwargs):
+        return client.post(
+            '/card-number/validate', {'number': number, **kwargs},
+            format='json'
+        )
+
+    # one wrong digit
+    data = _post(f"{'4' * 15}7", suggest=True).data
+    assert data['isValid'] is False
+    assert f"{'4' * 15}8" in data['suggestions']
+    data = _post('4111 1111 1111 1121', suggest=True).data
+    assert '4111111111111111' in data['suggestions']
+
+    # two neighbouring digits swapped
+    data = _post('5500 0000 0000 0040', suggest=True).data
+    assert '5500000000000004' in data['suggestions']
+
+    # every suggestion is valid and belongs to a known issuer
+    for number in data['suggestions']:
+        details = _post(number).data
+        assert details['isValid'] is True
+        assert 'issuer' in details
+
+    # numbers that can't be fixed into a known issuer get no suggestions
+    assert _post('0000 0000 0000 0001', suggest=True).data['suggestions'] \
+        == []
+
+    # valid numbers and requests without `suggest` get nothing extra
+    assert 'suggestions' not in _post('4111111111111111', suggest=True).data
+    assert 'suggestions' not in _post(f"{'4' * 15}7").data
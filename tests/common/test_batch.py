@@ -0,0 +1,185 @@
+import pytest
+import string
+import numpy as np
+from common.algorithms import (
+    luhn_check,
+    clean_card_number,
+    generate_card_number,
+)
+from common.batch import (
+    clean_many,
+    generate_many,
+    luhn_check_lines,
+    luhn_check_many,
+)
+from common.constants import COMMON_SEPARATORS
+from common.enums import CardIssuer, CardNumberError
+from common.objects import COMMON_BIN_TESTS, PaymentCardNumber
+
+
+def _scalar_error(func, value):
+    try:
+        func(value)
+    except Exception as e:
+        return type(e)
+    return None
+
+
+def test_luhn_check_many_matches_scalar_luhn_check():
+    '''
+    Every row must have the same outcome as calling `luhn_check` on it alone
+    '''
+    inputs = [
+        "4111111111111111",
+        "4111 1111 1111 1112",
+        ".-: 4111 | 1111 | 1111 | 1111 :-.",
+        "373941476764901",
+        "0" * 19,
+        "79927398713",
+        "ff0000",
+        "",
+        "----",
+        "0000\x000000",
+        "4111²1111",
+        None,
+        4111111111111111,
+    ] + [generate_card_number(num_digits=n) for n in range(8, 20)]
+
+    valid, errors = luhn_check_many(inputs)
+    assert valid.shape == errors.shape == (len(inputs),)
+    for value, is_valid, error in zip(inputs, valid, errors):
+        expected_error = _scalar_error(luhn_check, value)
+        assert CardNumberError(error).exception is expected_error
+        if expected_error is None:
+            assert bool(is_valid) is luhn_check(value)
+        else:
+            assert not is_valid
+
+
+def test_clean_many_right_aligns_digits():
+    sep = ''.join(COMMON_SEPARATORS)
+    inputs = ["12345678", f"{sep}4{sep}1{sep}1{sep}1", "abc"]
+    digits, lengths, errors = clean_many(inputs)
+
+    assert list(lengths) == [8, 4, 0]
+    assert list(errors) == [
+        CardNumberError.NONE,
+        CardNumberError.NONE,
+        CardNumberError.INVALID_CHARACTERS,
+    ]
+    for row, length, value in zip(digits, lengths, inputs[:2]):
+        as_str = ''.join(string.digits[d] for d in row[row.shape[0] - length:])
+        assert as_str == clean_card_number(value)
+        assert not row[:row.shape[0] - length].any()
+
+
+def test_empty_batch():
+    valid, errors = luhn_check_many([])
+    assert valid.shape == errors.shape == (0,)
+    assert valid.dtype == np.bool_
+
+
+def test_generate_many_mixes_prefixes_and_lengths():
+    lengths = [8, 12, 16, 19] * 250
+    numbers = generate_many(1000, ['4', '37', ('510', '559')],
+                            num_digits=lengths)
+    assert [len(number) for number in numbers] == lengths
+    assert all(luhn_check(number) for number in numbers)
+    assert all(
+        n.startswith(('4', '37')) or '510' <= n[:3] <= '559' for n in numbers
+    )
+    # every range is picked from
+    assert {n[0] for n in numbers} == {'3', '4', '5'}
+
+
+def test_generate_many_from_issuers():
+    for issuer in CardIssuer:
+        numbers = generate_many(500, issuer)
+        assert all(len(number) == issuer.num_digits for number in numbers)
+        assert luhn_check_many(numbers)[0].all()
+        assert all(COMMON_BIN_TESTS[issuer](number) for number in numbers)
+
+
+def test_generate_many_other_algorithms():
+    for algorithm in ['luhn_mod_36', 'verhoeff', 'damm']:
+        numbers = generate_many(
+            200, '0012', num_digits=[10, 17] * 100, algorithm=algorithm
+        )
+        assert all(number.startswith('0012') for number in numbers)
+        assert luhn_check_many(numbers, algorithm=algorithm)[0].all()
+
+
+def test_generate_many_alphanumeric_prefixes():
+    numbers = generate_many(
+        200, 'ab-12', num_digits=[10, 17] * 100, algorithm='luhn_mod_36'
+    )
+    assert all(number.startswith('AB12') for number in numbers)
+    assert luhn_check_many(numbers, algorithm='luhn_mod_36')[0].all()
+    with pytest.raises(ValueError):
+        generate_many(10, 'ab12')
+    with pytest.raises(ValueError):
+        generate_many(10, 'AB12', num_digits=4, algorithm='luhn_mod_36')
+
+
+def test_generate_many_is_seedable():
+    assert (generate_many(50, rng=7) == generate_many(50, rng=7)).all()
+    assert len(generate_many(0)) == 0
+    with pytest.raises(ValueError):
+        generate_many(5, '4' * 16, num_digits=16)
+    with pytest.raises(ValueError):
+        generate_many(5, num_digits=[16, 20, 16, 16, 16])
+
+
+def _check_lines(data, **kwargs):
+    results = list(luhn_check_lines(data, **kwargs))
+    return [
+        np.concatenate([result[i] for result in results]).tolist()
+        for i in range(4)
+    ]
+
+
+def test_luhn_check_lines_matches_payment_card_number():
+    lines = [
+        "4111 1111 1111 1111",
+        ".-: 4111 | 1111 | 1111 | 1112 :-.",
+        "79927398713",
+        "1234567",
+        "0" * 19,
+        "1" * 20,
+        "ff0000",
+        "4111\r1111 1111 1111",
+        "4111111111111111\r\r",
+        "----",
+        "",
+    ] + [generate_card_number(num_digits=n) for n in range(8, 20)]
+    data = '\r\n'.join(lines).encode('ascii')
+
+    expected = _check_lines(data)
+    # Lines split across blocks must give the same results
+    for block_size in [1, 5, 64]:
+        assert _check_lines(data, block_size=block_size) == expected
+        blocks = [data[i:i + 7] for i in range(0, len(data), 7)]
+        assert _check_lines(blocks, block_size=block_size) == expected
+
+    valid, values, lengths, errors = expected
+    assert len(valid) == len(lines)
+    for line, is_valid, value, length, error in zip(
+        lines, valid, values, lengths, errors
+    ):
+        expected_error = _scalar_error(clean_card_number, line)
+        assert CardNumberError(error).exception is expected_error
+        if expected_error is None:
+            number = PaymentCardNumber(line)
+            assert is_valid is number.is_valid
+            assert length == len(number.value)
+            if length <= 19:
+                assert value == int(number.value)
+        else:
+            assert not is_valid and length == 0
+
+
+def test_luhn_check_lines_reads_buffers_in_place():
+    data = bytearray(b'4111111111111111\n4111111111111112\n')
+    assert _check_lines(memoryview(data))[0] == [True, False]
+    assert list(luhn_check_lines(b'')) == []
+    assert _check_lines(b'4111111111111111')[0] == [True]
@@ -0,0 +1,90 @@
+import pytest
+import numpy as np
+from common.algorithms import generate_card_number
+from common.bin_index import BinIndex, range_prefixes
+from common.enums import CardIssuer
+from common.objects import BIN_INDEX, COMMON_BIN_TESTS
+
+
+def _expand(prefixes, width):
+    '''
+    Every `width`-digit string starting with one of `prefixes`
+    '''
+    return {
+        str(n).zfill(width) for n in range(10 ** width)
+        if str(n).zfill(width).startswith(tuple(prefixes))
+    }
+
+
+def test_range_prefixes_cover_the_range_exactly():
+    for start, end in [('2221', '2720'), ('0', '9'), ('644', '649'),
+                       ('0999', '1000'), ('1234', '1234'), ('00', '37')]:
+        prefixes = range_prefixes(start, end)
+        expected = {
+            str(n).zfill(len(start))
+            for n in range(int(start), int(end) + 1)
+        }
+        assert _expand(prefixes, len(start)) == expected
+        assert len(prefixes) == len(set(prefixes))
+
+    assert range_prefixes('0', '9') == ['']
+    assert range_prefixes('644', '649') == [
+        '644', '645', '646', '647', '648', '649'
+    ]
+
+
+def test_matches_bin_tests():
+    '''
+    The compiled index must agree with the hand-written BIN tests
+    '''
+    numbers = [
+        generate_card_number(str(prefix), num_digits=16)
+        for prefix in range(1000)
+    ] + ['2221', '2720', '2721', '622126', '622925', '622926', '6', '']
+    for number in numbers:
+        expected = [
+            issuer for issuer, test in COMMON_BIN_TESTS.items()
+            if test(number)
+        ]
+        assert BIN_INDEX.lookup(number) == (expected[0] if expected else None)
+
+
+def test_longest_prefix_wins():
+    index = BinIndex([
+        (CardIssuer.VISA, '4'),
+        ('Co-brand', ('41111100', '41111199')),
+        ('Bank', '4111'),
+    ])
+    assert index.lookup('4111111150000000') == 'Co-brand'
+    assert index.lookup('4111120050000000') == 'Bank'
+    assert index.lookup('4000000000000000') == CardIssuer.VISA
+    assert index.lookup('5000000000000000') is None
+    assert index.lookup_all('4111111150000000') == [
+        'Co-brand', 'Bank', CardIssuer.VISA
+    ]
+    assert index.lookup_all('5') == []
+
+
+def test_lookup_many_matches_lookup():
+    index = BinIndex([
+        (CardIssuer.VISA, '4'),
+        ('Co-brand', ('41111100', '41111199')),
+    ] + [
+        (issuer, bin_range)
+        for issuer in CardIssuer for bin_range in issuer.bin_ranges
+    ])
+    bounds = index.bounds.astype(np.int64)
+    leading = np.concatenate([
+        np.random.default_rng(0).integers(0, 10 ** 8, 10000),
+        bounds, bounds[1:] - 1,
+    ])
+    expected = [
+        index.lookup_code(str(value).zfill(8)) for value in leading.tolist()
+    ]
+    assert index.lookup_many(leading).tolist() == expected
+
+
+def test_rejects_malformed_ranges():
+    for bin_range in [('12', '3'), ('9', '1'), 'abc', '123456789']:
+        with pytest.raises(ValueError):
+            BinIndex([(CardIssuer.VISA, bin_range)])
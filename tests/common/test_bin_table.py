@@ -0,0 +1,189 @@
+import gc
+import os
+import signal
+import time
+import weakref
+import pytest
+import numpy as np
+from common.bin_table import (
+    BinRecord,
+    BinTable,
+    configure_bin_table,
+    get_bin_table,
+    install_reload_signal,
+    reload_bin_table,
+    write_bin_table,
+)
+from common.objects import PaymentCardNumber
+
+
+VISA = BinRecord('Visa', 'Visa', (13, 16, 19), '')
+CO_BRAND = BinRecord('Acme Bank', 'Visa', (16,), 'US')
+MASTER_CARD = BinRecord('Mastercard', 'Mastercard', (16,), '')
+
+
+def _compile(path, entries):
+    '''
+    Write a table next to `path` and move it over, like compile_bin_table
+    '''
+    with open(f'{path}.tmp', 'wb') as file:
+        write_bin_table(entries, file)
+    os.replace(f'{path}.tmp', path)
+
+
+@pytest.fixture
+def table_path(tmp_path):
+    path = tmp_path / 'bins.bin'
+    _compile(path, [
+        ('4', VISA),
+        (('41111100', '41111199'), CO_BRAND),
+        (('222100', '272099'), MASTER_CARD),
+    ])
+    return path
+
+
+@pytest.fixture
+def configured(table_path):
+    configure_bin_table(table_path)
+    yield table_path
+    configure_bin_table(None)
+
+
+def test_lookup_prefers_the_narrowest_range(table_path):
+    table = BinTable(table_path)
+    assert table.lookup('4111111150000000') == CO_BRAND
+    assert table.lookup('4111120000000000') == VISA
+    assert table.lookup('4000000000000000') == VISA
+    assert table.lookup('2221000000000000') == MASTER_CARD
+    assert table.lookup('2720999999999999') == MASTER_CARD
+    assert table.lookup('2721000000000000') is None
+    assert table.lookup('') is None
+    assert table.lookup('4111x111') is None
+
+
+def test_find_many_matches_find(table_path):
+    table = BinTable(table_path)
+    starts = table.starts.astype(np.int64)
+    ends = table.ends.astype(np.int64)
+    leading = np.concatenate([
+        np.random.default_rng(0).integers(0, 10 ** 8, 1000),
+        starts, starts - 1, ends, ends - 1,
+    ])
+    leading = leading[(leading >= 0) & (leading < 10 ** 8)]
+    assert table.find_many(leading).tolist() == [
+        table.find(str(value).zfill(8)) for value in leading.tolist()
+    ]
+
+
+def test_empty_table(tmp_path):
+    path = tmp_path / 'empty.bin'
+    with open(path, 'wb') as file:
+        assert write_bin_table([], file) == 0
+    table = BinTable(path)
+    assert len(table) == 0
+    assert table.lookup('4111111111111111') is None
+    assert table.find_many([41111111]).tolist() == [-1]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'bins.csv'
+    path.write_bytes(b'start,end,issuer\n4,,Visa\n')
+    with pytest.raises(ValueError):
+        BinTable(path)
+
+
+def test_issuer_falls_back_to_built_in_ranges(table_path):
+    configure_bin_table(table_path)
+    try:
+        assert PaymentCardNumber('4111111150000000').issuer == 'Acme Bank'
+        assert PaymentCardNumber('4012888888881881').issuer == 'Visa'
+        assert PaymentCardNumber('6011000000000004').issuer == 'Discover Card'
+    finally:
+        configure_bin_table(None)
+    assert PaymentCardNumber('4111111150000000').issuer == 'Visa'
+
+
+def test_reload_swaps_in_a_replaced_file(configured):
+    old = get_bin_table()
+    assert old.lookup('4111111150000000') == CO_BRAND
+    assert not reload_bin_table()
+    assert get_bin_table() is old
+
+    _compile(configured, [('4', VISA)])
+    assert reload_bin_table()
+    assert get_bin_table().lookup('4111111150000000') == VISA
+    # Anyone still holding the old snapshot can keep using it
+    assert old.lookup('4111111150000000') == CO_BRAND
+    assert PaymentCardNumber('4111111150000000').issuer == 'Visa'
+
+
+def test_reload_keeps_the_table_when_the_file_is_missing(configured):
+    table = get_bin_table()
+    os.remove(configured)
+    assert not reload_bin_table()
+    assert get_bin_table() is table
+
+
+def test_watcher_picks_up_a_replaced_file(table_path):
+    configure_bin_table(table_path, reload_interval=0.01)
+    try:
+        assert get_bin_table().lookup('4111111150000000') == CO_BRAND
+        _compile(table_path, [('4', VISA)])
+        deadline = time.monotonic() + 5
+        while get_bin_table().lookup('4111111150000000') != VISA:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        configure_bin_table(None)
+
+
+def test_reload_signal(configured):
+    previous = signal.getsignal(signal.SIGUSR1)
+    install_reload_signal('SIGUSR1')
+    try:
+        get_bin_table()
+        _compile(configured, [('4', VISA)])
+        os.kill(os.getpid(), signal.SIGUSR1)
+        deadline = time.monotonic() + 5
+        while get_bin_table().lookup('4111111150000000') != VISA:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_missing_file_falls_back_to_built_in_ranges(tmp_path, caplog):
+    path = tmp_path / 'bins.bin'
+    configure_bin_table(path)
+    try:
+        assert get_bin_table() is None
+        assert PaymentCardNumber('4111111150000000').issuer == 'Visa'
+        assert "Couldn't open the BIN table" in caplog.text
+        # Only retried after a while, not on every lookup
+        _compile(path, [(('41111100', '41111199'), CO_BRAND)])
+        assert get_bin_table() is None
+        assert reload_bin_table()
+        assert PaymentCardNumber('4111111150000000').issuer == 'Acme Bank'
+    finally:
+        configure_bin_table(None)
+
+
+def test_issuer_needs_an_allowed_length(configured):
+    table = get_bin_table()
+    assert table.issuer_of('4111111150000000') == 'Acme Bank'
+    assert table.issuer_of('411111115000000') is None
+    assert table.issuer_of('41111111', 16) == 'Acme Bank'
+    # Numbers of other lengths fall through to the built-in ranges
+    assert PaymentCardNumber('411111115000000').issuer == 'Visa'
+    assert PaymentCardNumber('22210000000000000').issuer == 'Master Card'
+    assert PaymentCardNumber('2221000000000000').issuer == 'Mastercard'
+
+
+def test_replaced_tables_are_released(configured):
+    table = weakref.ref(get_bin_table())
+    assert PaymentCardNumber('4111111150000000').suggest_corrections()
+    _compile(configured, [('4', VISA)])
+    assert reload_bin_table()
+    PaymentCardNumber('4111111150000000').suggest_corrections()
+    gc.collect()
+    assert table() is None
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pytest
+from common import blocklist as blocklist_module
+from common.blocklist import (
+    Blocklist,
+    configure_blocklist,
+    get_blocklist,
+    write_blocklist,
+)
+from common.objects import CardNumberArray, PaymentCardNumber
+
+
+BLOCKED = ['4012888888881881', '5019000000000008', '0012345678', '12345678']
+
+
+def _write(path, numbers, **kwargs):
+    values = [int(number) for number in numbers]
+    lengths = [len(number) for number in numbers]
+    with open(path, 'wb') as file:
+        return write_blocklist(values, lengths, file, **kwargs)
+
+
+@pytest.fixture
+def blocklist(tmp_path):
+    path = str(tmp_path / 'blocklist')
+    _write(path, BLOCKED + BLOCKED[:2])
+    configure_blocklist(path)
+    yield get_blocklist()
+    configure_blocklist(None)
+
+
+def test_contains(blocklist):
+    assert len(blocklist) == 4
+    for number in BLOCKED:
+        assert blocklist.contains(number)
+    # The same digits with another length aren't the same number
+    for number in ['012345678', '000012345678', '4012888888881882', '', 'x']:
+        assert not blocklist.contains(number)
+
+
+def test_contains_many_matches_contains(blocklist):
+    rng = np.random.default_rng(0)
+    numbers = BLOCKED + [
+        str(value) for value in rng.integers(10 ** 15, 10 ** 16, 1000)
+    ]
+    values = np.array([int(number) for number in numbers], dtype=np.uint64)
+    lengths = np.array([len(number) for number in numbers])
+    assert blocklist.contains_many(values, lengths).tolist() == [
+        blocklist.contains(number) for number in numbers
+    ]
+    assert not blocklist.contains_many([12345678], [300]).any()
+
+
+def test_card_numbers_are_flagged(blocklist):
+    assert PaymentCardNumber('4012 8888 8888 1881').is_blocked
+    assert not PaymentCardNumber('4111111111111111').is_blocked
+    array = CardNumberArray.from_strings(
+        ['4012888888881881', '4111111111111111']
+    )
+    assert array.is_blocked.tolist() == [True, False]
+    configure_blocklist(None)
+    assert not PaymentCardNumber('4012888888881881').is_blocked
+
+
+def test_filter_hits_are_confirmed(tmp_path):
+    path = str(tmp_path / 'blocklist')
+    rng = np.random.default_rng(1)
+    values = rng.integers(10 ** 15, 10 ** 16, 20000, dtype=np.uint64)
+    # A filter this small lets a lot of other numbers through
+    _write(path, [str(value) for value in values], bits_per_number=2)
+    blocklist = Blocklist(path)
+    others = np.concatenate([
+        values[:100], rng.integers(10 ** 15, 10 ** 16, 20000, dtype=np.uint64)
+    ])
+    assert blocklist.contains_many(others, np.full(len(others), 16)).tolist() \
+        == np.isin(others, values).tolist()
+
+
+def test_rejects_truncated_files(tmp_path):
+    path = str(tmp_path / 'blocklist')
+    _write(path, BLOCKED)
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 1)
+    with pytest.raises(ValueError):
+        Blocklist(path)
+
+
+def test_bad_file_keeps_last_good_blocklist(tmp_path, caplog, monkeypatch):
+    path = str(tmp_path / 'blocklist')
+    configure_blocklist(path)
+    try:
+        assert get_blocklist() is None
+        assert not PaymentCardNumber('4012888888881881').is_blocked
+        assert "Couldn't open the blocklist" in caplog.text
+        # Only looked at again after a while, not on every check
+        _write(path, BLOCKED)
+        assert get_blocklist() is None
+
+        monkeypatch.setattr(blocklist_module, '_check_at', 0)
+        first = get_blocklist()
+        assert first.contains('4012888888881881')
+        caplog.clear()
+        (tmp_path / 'bad').write_bytes(b'not a blocklist')
+        os.replace(str(tmp_path / 'bad'), path)
+        monkeypatch.setattr(blocklist_module, '_check_at', 0)
+        assert get_blocklist() is first
+        assert "Couldn't open the blocklist" in caplog.text
+
+        # A recompiled list is swapped in
+        _write(str(tmp_path / 'new'), BLOCKED[1:])
+        os.replace(str(tmp_path / 'new'), path)
+        monkeypatch.setattr(blocklist_module, '_check_at', 0)
+        assert not get_blocklist().contains('4012888888881881')
+    finally:
+        configure_blocklist(None)
@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+from common.batch import generate_many
+from common.bin_table import BinRecord, configure_bin_table, write_bin_table
+from common.enums import CardIssuer
+from common.issuers import IssuerRecord, IssuerSnapshot, set_issuer_snapshot
+from common.objects import CardNumberArray, PaymentCardNumber
+
+
+NUMBERS = [
+    "4111 1111 1111 1111",
+    "4111-1111-1111-1112",
+    "0000000000000000",
+    "0123",
+    "378282246310005",
+    "6011111111111117",
+    "6221260000000009",
+    "2221000000000009",
+    "5500000000000004",
+    "9" * 19,
+    "12345678",
+]
+
+
+def _as_strings(array, column, widths):
+    return [
+        f'{value:0{width}d}' if width > 0 else ''
+        for value, width in zip(getattr(array, column).tolist(), widths)
+    ]
+
+
+def test_columns_match_payment_card_number():
+    array = CardNumberArray.from_strings(NUMBERS)
+    cards = [PaymentCardNumber(number) for number in NUMBERS]
+    lengths = [len(card.value) for card in cards]
+
+    assert array.to_strings().tolist() == [card.value for card in cards]
+    assert array.is_valid.tolist() == [card.is_valid for card in cards]
+    assert array.check_digit.tolist() == [int(c.check_digit) for c in cards]
+    assert array.mii.tolist() == [int(card.mii) for card in cards]
+    assert _as_strings(array, 'iin', [min(n, 6) for n in lengths]) == \
+        [card.iin for card in cards]
+    assert _as_strings(array, 'account_number', [n - 7 for n in lengths]) == \
+        [card.account_number for card in cards]
+    assert [
+        array.issuers[code] if code >= 0 else None
+        for code in array.issuer.tolist()
+    ] == [card.issuer for card in cards]
+    assert list(array) == cards
+
+
+def test_filtering_returns_arrays():
+    numbers = generate_many(5000, CardIssuer.AMEX, num_digits=15).tolist() + \
+        generate_many(5000, CardIssuer.VISA).tolist()
+    array = CardNumberArray.from_strings(numbers)
+    assert array.is_valid.all()
+
+    amex = array[array.issuer_is('amex')]
+    assert isinstance(amex, CardNumberArray) and len(amex) == 5000
+    assert amex.to_strings().tolist() == numbers[:5000]
+    assert amex[0] == PaymentCardNumber(numbers[0])
+
+    assert array.values.nbytes + array.lengths.nbytes == 9 * len(numbers)
+    with pytest.raises(ValueError):
+        array.is_valid[0] = False
+
+
+def test_large_arrays_are_processed_in_chunks(monkeypatch):
+    monkeypatch.setattr(CardNumberArray, 'CHUNK_SIZE', 3)
+    array = CardNumberArray.from_strings(iter(NUMBERS))
+    assert array.to_strings().tolist() == [
+        PaymentCardNumber(number).value for number in NUMBERS
+    ]
+    assert array.is_valid.tolist() == [
+        PaymentCardNumber(number).is_valid for number in NUMBERS
+    ]
+
+
+def test_rejects_numbers_it_cannot_hold():
+    with pytest.raises(ValueError):
+        CardNumberArray.from_strings(["4111 x"])
+    with pytest.raises(ValueError):
+        CardNumberArray.from_strings(["1" * 20])
+    with pytest.raises(TypeError):
+        CardNumberArray.from_strings([4111])
+    with pytest.raises(ValueError):
+        CardNumberArray([1234], [3])
+    assert len(CardNumberArray.from_strings([])) == 0
+    assert len(CardNumberArray(np.array([5]), np.array([2]))) == 1
+
+
+def test_issuer_uses_the_bin_table_and_snapshot(tmp_path, monkeypatch):
+    path = tmp_path / 'bins.bin'
+    with open(path, 'wb') as file:
+        write_bin_table([
+            (('22210000', '22219999'), BinRecord('Table Bank', '', (16,), '')),
+            ('5500', BinRecord('Short Bank', '', (), '')),
+        ], file)
+    configure_bin_table(path)
+    set_issuer_snapshot(IssuerSnapshot([
+        IssuerRecord(1, 'Acme Bank', 16, ('41111111', '22210000')),
+    ]))
+    try:
+        monkeypatch.setattr(CardNumberArray, 'CHUNK_SIZE', 4)
+        numbers = NUMBERS + ['222100000000000', '5500000']
+        array = CardNumberArray.from_strings(numbers)
+        cards = [PaymentCardNumber(number) for number in numbers]
+        assert [
+            array.issuers[code] if code >= 0 else None
+            for code in array.issuer.tolist()
+        ] == [card.issuer for card in cards]
+        assert {card.issuer for card in cards} >= {
+            'Table Bank', 'Short Bank', 'Acme Bank', CardIssuer.AMEX.value
+        }
+        # The 15 digit 2221 number isn't a length Table Bank allows
+        assert array.issuer_is('Acme Bank').sum() == 3
+        assert array.issuer_is('Table Bank').sum() == 1
+    finally:
+        configure_bin_table(None)
+        set_issuer_snapshot(None)
@@ -0,0 +1,118 @@
+import string
+import pytest
+from common.algorithms import luhn_check, generate_card_number
+from common.batch import clean_many, luhn_check_many
+from common.check_digits import (
+    CHECK_DIGIT_ALGORITHMS,
+    get_check_digit_algorithm,
+)
+
+
+def test_known_check_digits():
+    '''
+    Reference values from each algorithm's published examples
+    '''
+    assert get_check_digit_algorithm('verhoeff').check_character('236') == '3'
+    assert get_check_digit_algorithm('damm').check_character('572') == '4'
+    assert get_check_digit_algorithm('luhn').check_character('7992739871') \
+        == '3'
+
+
+def test_unknown_algorithm_raises_value_error():
+    with pytest.raises(ValueError):
+        get_check_digit_algorithm('mod97')
+
+    with pytest.raises(ValueError):
+        luhn_check('4111111111111111', algorithm='mod97')
+
+
+def test_default_is_luhn():
+    assert get_check_digit_algorithm() is CHECK_DIGIT_ALGORITHMS['luhn']
+    assert luhn_check('4111111111111111', algorithm='luhn') is True
+    assert luhn_check('4111111111111112', algorithm='luhn') is False
+
+
+def test_every_algorithm_catches_single_substitutions():
+    '''
+    Every scheme here detects all single-character errors, so changing any
+    one character of a generated code must make it invalid
+    '''
+    for name, algorithm in CHECK_DIGIT_ALGORITHMS.items():
+        for length in (8, 15, 16, 19):
+            code = generate_card_number(num_digits=length, algorithm=name)
+            assert luhn_check(code, algorithm=name) is True
+            for idx in range(length):
+                for char in algorithm.alphabet:
+                    if char == code[idx]:
+                        continue
+                    typo = code[:idx] + char + code[idx + 1:]
+                    assert algorithm.is_valid(typo) is False
+
+
+def test_alphanumeric_luhn_mod_36():
+    code = generate_card_number('GIFT', num_digits=12, algorithm='luhn_mod_36')
+    assert code.startswith('GIFT')
+    assert luhn_check(code, algorithm='luhn_mod_36') is True
+    assert luhn_check(code.lower(), algorithm='luhn_mod_36') is True
+    with pytest.raises(ValueError):
+        luhn_check('GIFT', algorithm='luhn')
+
+
+def test_generate_with_full_prefix_checks_algorithm():
+    code = generate_card_number(num_digits=8, algorithm='verhoeff')
+    assert generate_card_number(code, num_digits=8, algorithm='verhoeff') \
+        == code
+    typo = code[:-1] + str((int(code[-1]) + 1) % 10)
+    with pytest.raises(ValueError):
+        generate_card_number(typo, num_digits=8, algorithm='verhoeff')
+    assert generate_card_number('12345671', num_digits=8, algorithm='damm') \
+        == '12345671'
+    with pytest.raises(ValueError):
+        generate_card_number('12345672', num_digits=8, algorithm='damm')
+
+
+def test_batch_matches_scalar_for_every_algorithm():
+    for name, algorithm in CHECK_DIGIT_ALGORITHMS.items():
+        codes = [
+            generate_card_number(num_digits=length, algorithm=name)
+            for length in range(8, 20)
+        ]
+        # Break every other one, and mix in separators + mixed lengths
+        codes = [
+            code if i % 2 else code[:-1] + algorithm.alphabet[
+                (algorithm.alphabet.index(code[-1]) + 1)
+                % len(algorithm.alphabet)
+            ]
+            for i, code in enumerate(codes)
+        ]
+        codes.append(' - '.join([codes[-1][:4], codes[-1][4:]]))
+        valid, errors = luhn_check_many(codes, algorithm=name)
+        assert not errors.any()
+        for code, is_valid in zip(codes, valid):
+            assert bool(is_valid) is luhn_check(code, algorithm=name)
+
+
+def test_batch_check_values_complete_payloads():
+    for name, algorithm in CHECK_DIGIT_ALGORITHMS.items():
+        payloads = [
+            generate_card_number(num_digits=length, algorithm=name)[:-1]
+            for length in range(8, 20)
+        ]
+        values, lengths, _ = clean_many(payloads, algorithm=name)
+        checks = algorithm.check_values_many(values, lengths)
+        for payload, check in zip(payloads, checks):
+            assert algorithm.alphabet[check] == \
+                algorithm.check_character(payload)
+
+
+def test_clean_uses_the_algorithm_alphabet():
+    luhn_36 = get_check_digit_algorithm('luhn_mod_36')
+    assert luhn_36.clean('ab-12 cd') == 'AB12CD'
+    with pytest.raises(TypeError):
+        luhn_36.clean(None)
+    with pytest.raises(ValueError):
+        luhn_36.clean('AB_12')
+    with pytest.raises(ValueError):
+        get_check_digit_algorithm('damm').clean('AB12')
+    assert get_check_digit_algorithm('damm').clean('12 34') == '1234'
+    assert set(luhn_36.alphabet) == set(string.digits + string.ascii_uppercase)
@@ -0,0 +1,79 @@
+import itertools
+import pytest
+from common.algorithms import luhn_check
+from common.completion import (
+    complete_card_number,
+    count_card_number_completions,
+    parse_masked_card_number,
+)
+from common.objects import PaymentCardNumber
+
+
+def _brute_force(pattern, issuer=None):
+    pattern = parse_masked_card_number(pattern)
+    unknowns = pattern.count('*')
+    template = pattern.replace('*', '{}')
+    for digits in itertools.product('0123456789', repeat=unknowns):
+        number = template.format(*digits)
+        if not luhn_check(number):
+            continue
+        if issuer and PaymentCardNumber(number).issuer != issuer:
+            continue
+        yield number
+
+
+def test_matches_brute_force():
+    patterns = [
+        '4111 1111 1111 1111',
+        '4111 1111 1111 1112',
+        '4111 1111 1111 111*',
+        '*111 1111 1111 1111',
+        '4**1 1111 1111 11*1',
+        '3*** 1111 1111 111',
+        '6x?1 0000 0000 00_0',
+        '****0000',
+    ]
+    for pattern in patterns:
+        expected = list(_brute_force(pattern))
+        assert list(complete_card_number(pattern)) == expected
+        assert count_card_number_completions(pattern) == len(expected)
+
+
+def test_matches_brute_force_with_issuer():
+    for issuer in ['Visa', 'American Express', 'Discover Card', 'Master Card']:
+        for pattern in ['6*** 0000 0000 00*0', '**** 1234 5678 9012']:
+            expected = list(_brute_force(pattern, issuer))
+            actual = list(complete_card_number(pattern, issuer=issuer))
+            assert actual == expected
+            assert count_card_number_completions(pattern, issuer=issuer) \
+                == len(expected)
+
+
+def test_is_lazy():
+    '''
+    Taking the first few completions of a huge space must not build the rest
+    '''
+    completions = complete_card_number('4*** **** **** ****')
+    first = list(itertools.islice(completions, 3))
+    assert len(first) == 3 and all(luhn_check(n) for n in first)
+    assert count_card_number_completions('4*** **** **** ****') == 10 ** 14
+
+
+def test_counts_masked_iins_without_enumerating_them():
+    pattern = '*' * 16
+    assert count_card_number_completions(pattern, issuer='Visa') == 10 ** 14
+    assert count_card_number_completions(pattern, issuer='Discover Card') \
+        == 10 ** 11 + 10 ** 13 + 800 * 10 ** 9 + 6 * 10 ** 12
+    first = next(complete_card_number(pattern, issuer='Discover Card'))
+    assert first.startswith('6011') and luhn_check(first)
+
+
+def test_bad_patterns_raise_like_clean_card_number():
+    with pytest.raises(TypeError):
+        list(complete_card_number(None))
+    with pytest.raises(ValueError):
+        list(complete_card_number('4111 abcd'))
+    with pytest.raises(ValueError):
+        list(complete_card_number(''))
+    with pytest.raises(ValueError):
+        list(complete_card_number('4111 ****', issuer='bob hope'))
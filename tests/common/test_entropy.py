@@ -0,0 +1,72 @@
+import string
+import threading
+import pytest
+from collections import Counter
+from common.algorithms import generate_card_number, luhn_check
+from common import entropy
+from common.entropy import EntropyPool, configure_entropy, get_entropy_pool
+
+
+@pytest.fixture
+def seeded():
+    config = dict(entropy._config)
+    configure_entropy(seed='test')
+    yield
+    configure_entropy(**config)
+
+
+def test_characters_are_uniform():
+    for pool in [EntropyPool(), EntropyPool(secure=True)]:
+        counts = Counter(pool.characters(string.digits, 100000))
+        assert set(counts) == set(string.digits)
+        assert all(9000 < count < 11000 for count in counts.values())
+
+        letters = pool.characters(string.ascii_uppercase, 5000)
+        assert len(letters) == 5000
+        assert set(letters) <= set(string.ascii_uppercase)
+
+
+def test_draws_cross_block_boundaries():
+    pool = EntropyPool(block_size=8)
+    assert len(pool.characters(string.digits, 1000)) == 1000
+    assert len(pool.read(100)) == 100
+    assert all(3 <= pool.randint(3, 5) <= 5 for _ in range(1000))
+    assert {pool.choice('ab') for _ in range(100)} == {'a', 'b'}
+
+
+def test_seeded_pools_repeat():
+    first, second = EntropyPool(seed=1), EntropyPool(seed=1)
+    assert first.characters(string.digits, 50) == \
+        second.characters(string.digits, 50)
+    assert first.randint(0, 10 ** 12) == second.randint(0, 10 ** 12)
+
+    with pytest.raises(ValueError):
+        EntropyPool(secure=True, seed=1)
+
+
+def test_configured_seed_makes_generation_repeatable(seeded):
+    numbers = [generate_card_number('4111') for _ in range(5)]
+    configure_entropy(seed='test')
+    assert numbers == [generate_card_number('4111') for _ in range(5)]
+    assert all(luhn_check(number) for number in numbers)
+
+
+def test_each_thread_has_its_own_pool():
+    pools = []
+    thread = threading.Thread(target=lambda: pools.append(get_entropy_pool()))
+    thread.start()
+    thread.join()
+    assert pools[0] is not get_entropy_pool()
+    assert get_entropy_pool() is get_entropy_pool()
+
+
+def test_empty_ranges_raise_like_random():
+    pool = EntropyPool()
+    for n in [0, -1]:
+        with pytest.raises(ValueError):
+            pool.randbelow(n)
+    with pytest.raises(ValueError):
+        pool.randint(5, 4)
+    with pytest.raises(IndexError):
+        pool.choice([])
+    assert pool.randbelow(1) == 0
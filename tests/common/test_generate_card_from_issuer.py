@@ -12,7 +12,10 @@ def gen_issuer():
         'common.algorithms.CardIssuer.from_string',
         MagicMock(return_value=issuer)
     ):
-        with patch('common.algorithms.random', random_mock):
+        with patch(
+            'common.algorithms.get_entropy_pool',
+            MagicMock(return_value=random_mock)
+        ):
             with patch('common.algorithms.generate_card_number', gen_card):
                 yield issuer, random_mock, gen_card
 
@@ -166,3 +166,25 @@ def test_return_passes_luhn_algorithm():
 
     number = generate_card_number('4', num_digits=MAX_LENGTH)
     assert luhn_check(number)
+
+
+def test_keyed_generation_is_repeatable_and_distinct():
+    '''
+    With a key, each index maps to its own number, and the mapping never
+    changes between runs
+    '''
+    numbers = [
+        generate_card_number('4111', key='seed', index=i) for i in range(200)
+    ]
+    assert len(set(numbers)) == 200
+    assert numbers == [
+        generate_card_number('4111', key='seed', index=i) for i in range(200)
+    ]
+    assert numbers != [
+        generate_card_number('4111', key='other', index=i) for i in range(200)
+    ]
+    for number in numbers:
+        assert number.startswith('4111') and luhn_check(number)
+
+    with pytest.raises(ValueError):
+        generate_card_number('4111', key='seed', algorithm='damm')
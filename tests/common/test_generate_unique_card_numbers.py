@@ -0,0 +1,55 @@
+import pytest
+from common.algorithms import (
+    FeistelPermutation,
+    generate_unique_card_numbers,
+    luhn_check,
+)
+from common.enums import CardIssuer
+
+
+def test_feistel_permutation_is_a_bijection():
+    for size in [1, 2, 3, 10, 1000, 1023, 1024, 1025]:
+        permute = FeistelPermutation(size, 'key')
+        assert sorted(permute(i) for i in range(size)) == list(range(size))
+
+
+def test_feistel_permutation_depends_on_key():
+    first = [FeistelPermutation(10 ** 6, 'a')(i) for i in range(10)]
+    second = [FeistelPermutation(10 ** 6, 'b')(i) for i in range(10)]
+    assert first != second
+    assert first == [FeistelPermutation(10 ** 6, b'a')(i) for i in range(10)]
+
+
+def test_fills_a_small_space_without_repeats():
+    '''
+    Even when every valid number in the space is requested, no number repeats
+    and nothing needs to be retried
+    '''
+    numbers = list(generate_unique_card_numbers(
+        1000, '4111 1111 1111', num_digits=16, key='k'
+    ))
+    assert len(set(numbers)) == 1000
+    assert all(luhn_check(n) for n in numbers)
+
+    with pytest.raises(ValueError):
+        list(generate_unique_card_numbers(1001, '4111 1111 1111', key='k'))
+    with pytest.raises(ValueError):
+        list(generate_unique_card_numbers(1, '4111 1111 1111', key='k',
+                                          offset=1000))
+
+
+def test_offsets_continue_the_same_sequence():
+    whole = list(generate_unique_card_numbers(30, '4', key='k'))
+    parts = (
+        list(generate_unique_card_numbers(10, '4', key='k'))
+        + list(generate_unique_card_numbers(20, '4', key='k', offset=10))
+    )
+    assert whole == parts
+
+
+def test_without_a_key_numbers_are_still_distinct():
+    numbers = list(generate_unique_card_numbers(
+        500, CardIssuer.AMEX, num_digits=15
+    ))
+    assert len(set(numbers)) == 500
+    assert all(n[:2] in ('34', '37') for n in numbers)
@@ -0,0 +1,63 @@
+import pytest
+from collections import Counter
+from common.algorithms import (
+    IssuerMix,
+    generate_card_number_from_mix,
+    luhn_check,
+)
+from common.enums import CardIssuer
+from common.objects import COMMON_BIN_TESTS
+
+
+def test_samples_follow_the_weights():
+    mix = IssuerMix.from_string('visa:55,mastercard:25,amex:15,discover:5')
+    counts = Counter(mix.sample()[0] for _ in range(20000))
+    for issuer, share in [(CardIssuer.VISA, .55), (CardIssuer.MASTER_CARD, .25),
+                          (CardIssuer.AMEX, .15), (CardIssuer.DISCOVER, .05)]:
+        assert abs(counts[issuer] / 20000 - share) < .02
+
+
+def test_bin_weights_split_an_issuer():
+    mix = IssuerMix(
+        {'discover': 1}, bin_weights={CardIssuer.DISCOVER: [1, 0, 0, 3]}
+    )
+    counts = Counter(mix.sample()[1] for _ in range(8000))
+    assert set(counts) == {'6011', ('644', '649')}
+    assert abs(counts['6011'] / 8000 - .25) < .03
+
+
+def test_generate_card_number_from_mix():
+    for _ in range(50):
+        number = generate_card_number_from_mix({'amex': 3, 'visa': 1})
+        assert luhn_check(number)
+        assert COMMON_BIN_TESTS[CardIssuer.AMEX](number) or \
+            COMMON_BIN_TESTS[CardIssuer.VISA](number)
+
+    number = generate_card_number_from_mix({'visa': 1, 'amex': 0})
+    assert number.startswith('4')
+
+
+@pytest.mark.parametrize('weights, bin_weights', [
+    ({}, None),
+    ({'visa': 0}, None),
+    ({'visa': -1, 'amex': 2}, None),
+    ({'bob hope': 1}, None),
+    ({'visa': 1}, {'amex': [1, 1]}),
+    ({'amex': 1}, {'amex': [1]}),
+    ({'amex': 1}, {'amex': [0, 0]}),
+    ({'visa': float('nan')}, None),
+    ({'visa': float('inf'), 'amex': 1}, None),
+    ({'amex': 1}, {'amex': [1, float('nan')]}),
+    ({'visa': 1, 'VISA': 2}, None),
+    ({'visa': 1e308, 'amex': 1e308}, None),
+])
+def test_invalid_mixes_raise(weights, bin_weights):
+    with pytest.raises(ValueError):
+        IssuerMix(weights, bin_weights=bin_weights)
+
+
+def test_from_string_rejects_bad_pairs():
+    for value in ['visa', 'visa:lots', 'visa:1,', ':1', 'visa:nan',
+                  'visa:1,Visa:2']:
+        with pytest.raises(ValueError):
+            IssuerMix.from_string(value)
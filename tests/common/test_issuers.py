@@ -0,0 +1,145 @@
+import gc
+import itertools
+import weakref
+import pytest
+from common.algorithms import generate_card_number_from_issuer
+from common.completion import (
+    complete_card_number,
+    count_card_number_completions,
+)
+from common.enums import CardIssuer, UnknownIssuerError
+from common.issuers import (
+    IssuerNameIndex,
+    IssuerRecord,
+    IssuerSnapshot,
+    get_issuer_snapshot,
+    set_issuer_snapshot,
+)
+from common.objects import PaymentCardNumber
+from common.pools import take_card_number
+
+
+ACME = IssuerRecord(1, 'Acme Bank', 16, (('41111100', '41111199'), '5019'))
+
+
+@pytest.fixture
+def snapshot():
+    snapshot = IssuerSnapshot([ACME], version=1)
+    set_issuer_snapshot(snapshot)
+    yield snapshot
+    set_issuer_snapshot(None)
+
+
+def test_from_string_finds_snapshot_issuers(snapshot):
+    assert CardIssuer.from_string('acme_bank') is ACME
+    assert CardIssuer.from_string(ACME) is ACME
+    assert CardIssuer.from_string('visa') is CardIssuer.VISA
+    set_issuer_snapshot(None)
+    assert CardIssuer.from_string('acme_bank') is None
+
+
+def test_snapshot_ranges_take_precedence(snapshot):
+    assert PaymentCardNumber('4111111150000001').issuer == 'Acme Bank'
+    assert PaymentCardNumber('5019000000000008').issuer == 'Acme Bank'
+    assert PaymentCardNumber('4012888888881881').issuer == 'Visa'
+    typo = PaymentCardNumber('5019000000000080')
+    assert '5019000000000008' in typo.suggest_corrections()
+    set_issuer_snapshot(None)
+    assert PaymentCardNumber('4111111150000001').issuer == 'Visa'
+    assert PaymentCardNumber('5019000000000008').issuer is None
+    assert '5019000000000008' not in typo.suggest_corrections()
+
+
+def test_generates_from_snapshot_issuers(snapshot):
+    for number in [
+        generate_card_number_from_issuer('Acme Bank'),
+        take_card_number('acme bank'),
+    ]:
+        card = PaymentCardNumber(number)
+        assert card.is_valid and card.issuer == 'Acme Bank'
+    numbers = list(
+        complete_card_number('5019*0000000000*', issuer='Acme Bank')
+    )
+    assert numbers and all(
+        PaymentCardNumber(number).issuer == 'Acme Bank' for number in numbers
+    )
+
+
+def test_replaced_snapshots_are_released():
+    set_issuer_snapshot(IssuerSnapshot([ACME], version=1))
+    snapshot = weakref.ref(get_issuer_snapshot())
+    try:
+        take_card_number('acme bank')
+        set_issuer_snapshot(IssuerSnapshot([ACME], version=2))
+        take_card_number('acme bank')
+        gc.collect()
+        assert snapshot() is None
+    finally:
+        set_issuer_snapshot(None)
+
+
+def test_empty_snapshot():
+    assert len(get_issuer_snapshot()) == 0
+    assert get_issuer_snapshot().lookup('4111111111111111') is None
+
+
+def test_suggests_close_names(snapshot):
+    assert CardIssuer.suggest('viza') == [CardIssuer.VISA]
+    assert CardIssuer.suggest('Dicsover') == [CardIssuer.DISCOVER]
+    assert CardIssuer.suggest('amer') == [CardIssuer.AMEX]
+    assert CardIssuer.suggest('acme bnak') == [ACME]
+    assert CardIssuer.suggest('bob hope') == []
+    assert CardIssuer.suggest(None) == []
+
+    error = UnknownIssuerError('mastercrad')
+    assert isinstance(error, ValueError)
+    assert error.suggestions == ['Master Card']
+    assert str(error) == (
+        "Unable to find CardIssuer matching 'mastercrad'. "
+        "Did you mean 'Master Card'?"
+    )
+    with pytest.raises(UnknownIssuerError):
+        generate_card_number_from_issuer('viza')
+
+
+def test_name_index_finds_typos_among_many_aliases():
+    names = [f'bank {n:04d} of {word}' for n, word in enumerate(
+        ['north', 'south', 'east', 'west'] * 1000
+    )]
+    index = IssuerNameIndex((name, position) for position, name in enumerate(
+        names
+    ))
+    assert index.find('BANK_0042_OF_EAST') == 42
+    for typo, expected in [
+        ('bank 0042 of eats', 42),
+        ('bank 042 of east', 42),
+        ('bank 0024 of noth', 24),
+    ]:
+        assert [issuer for *_, issuer in index.scored(typo)][0] == expected
+    assert index.scored('') == []
+
+
+def test_completes_8_digit_bins():
+    set_issuer_snapshot(IssuerSnapshot([
+        IssuerRecord(2, 'Acme', 16, ('41111111',)),
+    ]))
+    try:
+        for pattern, count in [
+            ('4111 1111 1111 11**', 10),
+            ('4111 11** 1111 1111', 1),
+            ('4111 1*** **** 1111', 1000),
+            ('**** **** **** ****', 10 ** 7),
+        ]:
+            assert count_card_number_completions(
+                pattern, issuer='Acme'
+            ) == count
+            numbers = list(itertools.islice(
+                complete_card_number(pattern, issuer='Acme'), 1000
+            ))
+            assert len(numbers) == min(count, 1000)
+            assert all(
+                PaymentCardNumber(number).issuer == 'Acme'
+                for number in numbers
+            )
+    finally:
+        set_issuer_snapshot(None)
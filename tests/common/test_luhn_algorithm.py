@@ -3,7 +3,7 @@
 """
 import pytest
 import string
-from common.algorithms import luhn_check
+from common.algorithms import luhn_check, is_luhn_valid
 
 
 def test_requires_string_input():
@@ -96,3 +96,23 @@ def test_passes_with_generated_card_numbers():
             if digit != card_num[-1:]:
                 # assert every other value for the check digit fails
                 assert luhn_check(f"{card_num[:-1]}{digit}") is False
+
+
+def test_is_luhn_valid_works_on_clean_digits_of_either_parity():
+    '''
+    The single-pass core skips cleaning, and must handle both odd and even
+    lengths since the doubling starts from the right
+    '''
+    valid = [
+        "00000000",
+        "4111111111111111",     # 16 digits
+        "373941476764901",      # 15 digits
+        "6011111111111117",
+        "4222222222222",        # 13 digits
+        "79927398713",
+    ]
+    for card_num in valid:
+        assert is_luhn_valid(card_num) is True
+        for digit in string.digits:
+            if digit != card_num[-1:]:
+                assert is_luhn_valid(f"{card_num[:-1]}{digit}") is False
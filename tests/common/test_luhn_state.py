@@ -0,0 +1,55 @@
+import pytest
+from common.algorithms import (
+    LuhnState,
+    _get_luhn_check_digit,
+    generate_card_number,
+    luhn_check,
+)
+
+
+def test_check_digit_matches_full_rescan():
+    '''
+    Building the state digit by digit must give the same check digit as
+    scanning the whole payload, for payloads of either parity
+    '''
+    for payload in ['4', '41', '411111', '411111111111111', '3782822463100',
+                    '0' * 18, '7992739871']:
+        state = LuhnState()
+        for digit in payload:
+            state = state.append(digit)
+        expected = _get_luhn_check_digit(payload, is_incomplete=True)
+        assert state.check_digit() == expected
+        assert LuhnState.from_digits(payload).check_digit() == expected
+
+
+def test_extend_in_chunks_matches_append():
+    number = generate_card_number(num_digits=19)
+    by_digit = LuhnState()
+    for digit in number:
+        by_digit = by_digit.append(int(digit))
+
+    for split in range(len(number) + 1):
+        chunked = LuhnState().extend(number[:split]).extend(number[split:])
+        assert chunked == by_digit
+    assert by_digit.is_valid is True
+
+
+def test_is_valid_tracks_luhn_check():
+    state = LuhnState.from_digits('411111111111111')
+    for digit in '0123456789':
+        assert state.append(digit).is_valid is luhn_check(
+            '411111111111111' + digit
+        )
+
+
+def test_is_immutable_and_reusable():
+    '''
+    A BIN's state should be safe to share between generated numbers
+    '''
+    bin_state = LuhnState.from_digits('411111')
+    first = bin_state.extend('000000001')
+    second = bin_state.extend('000000002')
+    assert bin_state == LuhnState.from_digits('411111')
+    assert first != second
+    with pytest.raises(AttributeError):
+        bin_state.if_last_kept = 0
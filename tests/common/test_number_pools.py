@@ -0,0 +1,47 @@
+import pytest
+import time
+from common.algorithms import luhn_check
+from common.enums import CardIssuer
+from common.objects import COMMON_BIN_TESTS
+from common.pools import IssuerNumberPool, get_issuer_pool
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_empty_pool_starves_then_refills_in_background():
+    pool = IssuerNumberPool(CardIssuer.AMEX, capacity=100, batch_size=30)
+    number = pool.take()
+    assert luhn_check(number) and COMMON_BIN_TESTS[CardIssuer.AMEX](number)
+    assert (pool.hits, pool.starved) == (0, 1)
+
+    _wait_for(lambda: len(pool) == 100)
+    assert pool.refills == 4
+
+    numbers = [pool.take() for _ in range(80)]
+    assert all(COMMON_BIN_TESTS[CardIssuer.AMEX](n) for n in numbers)
+    assert (pool.hits, pool.starved) == (80, 1)
+    assert pool.hit_rate == 80 / 81
+
+    # falling under the low-water mark (25) wakes the refill thread
+    _wait_for(lambda: len(pool) == 100)
+
+
+def test_fill_respects_capacity():
+    pool = IssuerNumberPool(CardIssuer.MASTER_CARD, capacity=25)
+    pool.fill()
+    assert len(pool) == 25
+    assert all(len(pool.take()) == 15 for _ in range(25))
+    metrics = pool.metrics()
+    assert metrics['issuer'] == 'Master Card'
+    assert metrics['hits'] == 25 and metrics['starved'] == 0
+
+
+def test_get_issuer_pool():
+    assert get_issuer_pool('am ex') is get_issuer_pool(CardIssuer.AMEX)
+    with pytest.raises(ValueError):
+        get_issuer_pool('bob hope')
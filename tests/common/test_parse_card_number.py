@@ -0,0 +1,33 @@
+import pytest
+from common.algorithms import clean_card_number
+from common.check_digits import get_check_digit_algorithm
+from common.constants import COMMON_SEPARATORS
+from common.objects import PaymentCardNumber
+from common.parsing import ParsedCardNumber, parse_card_number
+
+
+def test_strips_every_separator():
+    raw = '4111' + ''.join(COMMON_SEPARATORS) + '1111 1111-1111'
+    parsed = parse_card_number(raw)
+    assert parsed == ParsedCardNumber(raw, '4111111111111111')
+    assert str(parsed) == raw
+    assert parse_card_number(parsed) is parsed
+
+    with pytest.raises(TypeError):
+        parse_card_number(4111111111111111)
+
+
+def test_parsed_numbers_are_not_stripped_again():
+    '''
+    Later layers trust `stripped`, so a parsed number only has its
+    characters checked, not its separators removed
+    '''
+    parsed = ParsedCardNumber('4111 1111 1111 1111', '4111111111111111')
+    assert clean_card_number(parsed) == '4111111111111111'
+    assert PaymentCardNumber(parsed).value == '4111111111111111'
+    assert get_check_digit_algorithm('luhn_mod_36').clean(
+        ParsedCardNumber('a1-b2', 'a1b2')
+    ) == 'A1B2'
+
+    with pytest.raises(ValueError):
+        clean_card_number(ParsedCardNumber('4111 1111', '4111 1111'))
@@ -3,8 +3,10 @@ Many of the tests refer to the ISO specification for a payment card number.
 An easy-to-read version can be found on Wikipedia:
     https://en.wikipedia.org/wiki/Payment_card_number
 '''
+import pytest
 from common.enums import CardIssuer
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
+from common.bin_index import BinIndex
 from common.objects import PaymentCardNumber
 
 
@@ -78,7 +80,7 @@ def test_is_valid_checks_number_length():
     assert PaymentCardNumber("0" * 19).is_valid is True
 
 
-@patch('common.objects.luhn_check')
+@patch('common.objects.is_luhn_valid')
 def test_is_valid_uses_luhn_algorithm(luhn_check_mock):
     '''
     For a card to be valid, it must pass the Luhn algorithm, which checks
@@ -91,6 +93,7 @@ def test_is_valid_uses_luhn_algorithm(luhn_check_mock):
 
     luhn_check_mock.reset_mock()
     luhn_check_mock.return_value = True
+    obj = PaymentCardNumber("4444 4444 4444 4448")
     assert obj.is_valid is True
     luhn_check_mock.assert_called_once_with("4444444444444448")
 
@@ -103,19 +106,10 @@ def test_failing_issuer_returns_None():
     assert PaymentCardNumber("9236 4763 8920 3974").issuer is None
 
 
-@patch('common.objects.COMMON_BIN_TESTS')
-def test_issuer_returns_issuer_matching_passing_test(bin_test_mocks):
+def test_issuer_returns_issuer_matching_bin_range():
     '''
-    If the corresponding BIN test is passed, the issuer's name is returned
+    If the number falls in one of an issuer's BIN ranges, its name is returned
     '''
-    amex_mock, disc_mock, mc_mock, v_mock = [MagicMock() for i in range(4)]
-    bin_test_mocks.items.return_value = {
-        CardIssuer.VISA: v_mock,
-        CardIssuer.AMEX: amex_mock,
-        CardIssuer.DISCOVER: disc_mock,
-        CardIssuer.MASTER_CARD: mc_mock,
-    }.items()
-
     def _test(obj):
         issuer = obj.issuer
         if not issuer:
@@ -125,23 +119,53 @@ def test_issuer_returns_issuer_matching_passing_test(bin_test_mocks):
         # minor string change occurs
         return issuer.lower().replace(' ', '')
 
-    def _reset():
-        for mock in [amex_mock, disc_mock, mc_mock, v_mock]:
-            mock.return_value = False
-
-    _reset()
-    card = PaymentCardNumber("0" * 16)
-    v_mock.return_value = True
-    assert _test(card) == 'visa'
-
-    _reset()
-    amex_mock.return_value = True
-    assert _test(card) == 'americanexpress'
-
-    _reset()
-    disc_mock.return_value = True
-    assert _test(card) == 'discovercard'
-
-    _reset()
-    mc_mock.return_value = True
-    assert _test(card) == 'mastercard'
+    expected = {
+        CardIssuer.VISA: 'visa',
+        CardIssuer.AMEX: 'americanexpress',
+        CardIssuer.DISCOVER: 'discovercard',
+        CardIssuer.MASTER_CARD: 'mastercard',
+    }
+    for issuer, name in expected.items():
+        with patch('common.objects.BIN_INDEX', BinIndex([(issuer, '00')])):
+            assert _test(PaymentCardNumber("0" * 16)) == name
+            assert _test(PaymentCardNumber("1" + "0" * 15)) is None
+
+
+def test_suggest_corrections_only_returns_valid_known_issuer_numbers():
+    card = PaymentCardNumber("4111 1111 1111 1112")
+    suggestions = card.suggest_corrections()
+    assert "4111111111111111" in suggestions
+    assert suggestions == sorted(suggestions)
+    for number in suggestions:
+        fixed = PaymentCardNumber(number)
+        assert fixed.is_valid and fixed.issuer is not None
+
+    assert PaymentCardNumber("4111111111111111").suggest_corrections() == []
+    assert PaymentCardNumber("1234567").suggest_corrections() == []
+
+
+@patch('common.objects.is_luhn_valid')
+@patch('common.objects._find_issuer')
+def test_derived_fields_are_computed_once(find_issuer_mock, luhn_check_mock):
+    luhn_check_mock.return_value = True
+    find_issuer_mock.return_value = CardIssuer.VISA.value
+    card = PaymentCardNumber("4111 1111 1111 1111")
+    for _ in range(3):
+        assert card.is_valid is True
+        assert card.issuer == 'Visa'
+    luhn_check_mock.assert_called_once_with("4111111111111111")
+    find_issuer_mock.assert_called_once_with("4111111111111111")
+
+
+def test_is_immutable_and_hashable():
+    card = PaymentCardNumber("4111 1111 1111 1111")
+    with pytest.raises(AttributeError):
+        card.value = "4111111111111112"
+    with pytest.raises(AttributeError):
+        card.extra = True
+    assert not hasattr(card, '__dict__')
+
+    same = PaymentCardNumber.from_digits("4111111111111111")
+    assert same == card and hash(same) == hash(card)
+    assert same != PaymentCardNumber("4111111111111111", algorithm='damm')
+    assert same.is_valid and same.issuer == 'Visa'
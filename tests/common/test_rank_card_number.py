@@ -0,0 +1,88 @@
+import itertools
+import random
+import pytest
+from common.algorithms import (
+    count_card_numbers,
+    iter_card_numbers,
+    rank_card_number,
+    unrank_card_number,
+    luhn_check,
+)
+from common.enums import CardIssuer
+
+
+def test_count_is_one_valid_number_per_account_number():
+    assert count_card_numbers(num_digits=8) == 10 ** 7
+    assert count_card_numbers('4111 11', num_digits=16) == 10 ** 9
+    assert count_card_numbers(('2221', '2720'), num_digits=16) == 500 * 10 ** 11
+    assert count_card_numbers(CardIssuer.AMEX, num_digits=15) == 2 * 10 ** 12
+    assert count_card_numbers(['34', '37'], num_digits=15) == 2 * 10 ** 12
+
+
+def test_small_space_is_enumerated_in_order():
+    '''
+    Unranking every position of a small space yields exactly the valid
+    numbers, ascending
+    '''
+    prefix = '4111 1111 1111'
+    expected = [
+        f'411111111111{n:03d}' for n in range(1000)
+        if luhn_check(f'411111111111{n:03d}')
+    ]
+    count = count_card_numbers(prefix, num_digits=15)
+    assert [unrank_card_number(k, prefix, num_digits=15)
+            for k in range(count)] == expected
+    for k, number in enumerate(expected):
+        assert rank_card_number(number, prefix) == k
+
+
+def test_rank_inverts_unrank():
+    for prefixes in ['', '4', ('622126', '622925'), CardIssuer.DISCOVER,
+                     ['1', ('00', '09')]]:
+        for num_digits in (8, 16, 19):
+            count = count_card_numbers(prefixes, num_digits=num_digits)
+            for rank in [0, count - 1] + random.sample(range(count), 50):
+                number = unrank_card_number(
+                    rank, prefixes, num_digits=num_digits
+                )
+                assert len(number) == num_digits
+                assert luhn_check(number)
+                assert rank_card_number(number, prefixes) == rank
+
+
+def test_leading_zeros_are_kept():
+    assert unrank_card_number(0, ('0000', '0009'), num_digits=8) == '00000000'
+    assert rank_card_number('00001008', ('0000', '0009')) == 100
+    assert rank_card_number('00010009', ('0000', '0009')) == 1000
+
+
+def test_invalid_inputs():
+    with pytest.raises(ValueError):
+        unrank_card_number(10 ** 9, '4111 11', num_digits=16)
+    with pytest.raises(ValueError):
+        unrank_card_number(-1, '4111 11')
+    with pytest.raises(ValueError):
+        count_card_numbers('4' * 16, num_digits=16)
+    with pytest.raises(ValueError):
+        count_card_numbers(('51', '5'))
+    with pytest.raises(ValueError):
+        rank_card_number('4111111111111112', '4')
+    with pytest.raises(ValueError):
+        rank_card_number('4111111111111111', '5')
+
+
+def test_iter_card_numbers_matches_unrank():
+    for prefixes, num_digits in [('4111111111', 13), (('0000', '0002'), 8),
+                                 (['1234567', ('200000', '200001')], 9)]:
+        count = count_card_numbers(prefixes, num_digits=num_digits)
+        every = list(iter_card_numbers(prefixes, num_digits=num_digits))
+        assert every == [
+            unrank_card_number(k, prefixes, num_digits=num_digits)
+            for k in range(count)
+        ]
+        for start in [0, 1, 9, 10, 11, count - 1, count]:
+            resumed = iter_card_numbers(
+                prefixes, num_digits=num_digits, start=start
+            )
+            assert list(itertools.islice(resumed, 25)) \
+                == every[start:start + 25]